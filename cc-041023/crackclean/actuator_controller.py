@@ -1,5 +1,9 @@
 # coding=utf-8
 
+import time
+
+from .actuator_stats import ActuatorStats
+from .const import Const
 from .controller import Controller
 from .exceptions import ActuatorException
 from .exceptions import JrkG2Exception
@@ -7,64 +11,141 @@ from .ipc.actuator_cmd import ActuatorCmd
 from .ipc.actuator_resp import ActuatorResp
 from .ipc.endpoint import Endpoint
 from .jrkg2 import JrkG2
+from .jrkg2_error_check import JrkG2ErrorCheck
+from .jrkg2_sim import JrkG2Sim
 
 
 class ActuatorController(Controller):
 
+    # SET_TARGET_MM is acknowledged as soon as it is accepted into a latest-wins mailbox (target_pending):
+    # a newer target replaces one not yet written, a target within ACTUATOR_TARGET_DEADBAND_MM of the last
+    # written one is not written at all, and writes are spaced at least 1/ACTUATOR_MAX_UPDATE_HZ apart.
+    # any other command first writes the pending target, so commands still take effect in order
     def __init__(self, endpoint, params):
         super().__init__(endpoint, params)
         self.jrkg2 = None
+        self.jrkg2_sim = None
+        self.target_pending = None
+        self.target_written = None
+        self.min_write_interval_s = 0 if (Const.ACTUATOR_MAX_UPDATE_HZ is None) else (1 / Const.ACTUATOR_MAX_UPDATE_HZ)
+        self.next_write_ts = 0
+        self.ts_first_target = None
+        self.ts_last_target = None
+        self.num_targets_received = 0
+        self.num_targets_coalesced = 0
+        self.num_targets_suppressed = 0
+        self.num_targets_written = 0
 
     def init(self):
-        self.jrkg2 = JrkG2()
         try:
+            if Const.JRKG2_SIMULATED:
+                self.jrkg2_sim = JrkG2Sim()
+                self.jrkg2_sim.start()
+                self.jrkg2 = JrkG2(self.jrkg2_sim.port)
+            else:
+                self.jrkg2 = JrkG2()
             self.jrkg2.init()
             self.jrkg2.get_and_clear_error_flags_halting()
             self.jrkg2.stop_motor()
+            if (Const.JRKG2_ERROR_CHECK == JrkG2ErrorCheck.POLLED):
+                self.jrkg2.start_health_poll()
         except JrkG2Exception as e:
             # TODO: attempt to deinit?  or can this trigger a pyserial exception if not already open?
             raise ActuatorException('JrkG2Exception: %s' % e)
 
     def deinit(self):
+        print('ActuatorController targets: ' + str(self.get_stats()))
+        if (Const.JRKG2_ERROR_CHECK == JrkG2ErrorCheck.POLLED):
+            print('ActuatorController health polls: ' + str(self.jrkg2.num_health_polls) + ' ok, ' +
+                str(self.jrkg2.num_health_poll_failures) + ' failed; last: ' + str(self.jrkg2.get_health()))
         try:
             self.jrkg2.deinit()
         except JrkG2Exception as e:
             raise ActuatorException('JrkG2Exception: %s' % e)
+        if self.jrkg2_sim is not None:
+            self.jrkg2_sim.stop()
         # shutdown all queues that we write to
         Endpoint.shutdown_queue(self.endpoint.txq)
         # delete refs
         del self.jrkg2
+        del self.jrkg2_sim
 
     # TODO: catch JrkG2Exception in various places below
     def start(self):
         while True:
-            tup = self.endpoint.get_cmd(True)
+            # with a target pending, wait for a command only until its write is allowed
+            timeout_s = None
+            if self.target_pending is not None:
+                timeout_s = max(0, (self.next_write_ts - time.monotonic()))
+            tup = self.endpoint.get_cmd(True, timeout_s)
+            if tup is None:
+                self.__write_pending_target()
+                continue
             (cmd_op_id, cmd) = tup
             if not isinstance(cmd, ActuatorCmd):
                 self.endpoint.send_resp(cmd_op_id, ActuatorResp(ActuatorResp.Token.ERROR, ()))
                 raise ActuatorException('ActuatorController received unexpected OpObj')
             if (cmd.token == ActuatorCmd.Token.TERMINATE):
+                self.__write_pending_target()
                 self.endpoint.send_resp(cmd_op_id, ActuatorResp(ActuatorResp.Token.OK, ()))
                 break
             elif (cmd.token == ActuatorCmd.Token.IS_READY):
                 self.endpoint.send_resp(cmd_op_id, ActuatorResp(ActuatorResp.Token.TRUE, ()))
             elif (cmd.token == ActuatorCmd.Token.GET_TARGET_MM):
+                self.__write_pending_target()
                 target_current = self.jrkg2.get_target_mm()
                 self.endpoint.send_resp(cmd_op_id, ActuatorResp(ActuatorResp.Token.TARGET_VALUE, (target_current,)))
             elif (cmd.token == ActuatorCmd.Token.SET_TARGET_MM):
                 target_new = cmd.params[0]
-                result = self.jrkg2.set_target_mm(target_new)
+                result = self.__accept_target(target_new)
                 if result:
                     self.endpoint.send_resp(cmd_op_id, ActuatorResp(ActuatorResp.Token.OK, ()))
                 else:
                     self.endpoint.send_resp(cmd_op_id, ActuatorResp(ActuatorResp.Token.ERROR, ()))
             elif (cmd.token == ActuatorCmd.Token.STOP_MOTOR):
+                self.__write_pending_target()
                 self.jrkg2.stop_motor()
+                self.target_written = None
                 self.endpoint.send_resp(cmd_op_id, ActuatorResp(ActuatorResp.Token.OK, ()))
             else:
                 self.endpoint.send_resp(cmd_op_id, ActuatorResp(ActuatorResp.Token.ERROR, ()))
                 raise ActuatorException('ActuatorController received unexpected command')
 
+    def get_stats(self):
+        span_s = 0
+        if self.ts_first_target is not None:
+            span_s = self.ts_last_target - self.ts_first_target
+        return ActuatorStats(self.num_targets_received, self.num_targets_coalesced, self.num_targets_suppressed,
+            self.num_targets_written, span_s)
+
+    # puts a new target in the mailbox (or drops it if within the deadband of the last written target)
+    # returns True if mm is valid, else False
+    def __accept_target(self, mm):
+        if ((mm < 0) or (mm > Const.ACTUATOR_STROKE_MM)):
+            return False
+        now = time.monotonic()
+        if self.ts_first_target is None:
+            self.ts_first_target = now
+        self.ts_last_target = now
+        self.num_targets_received += 1
+        if self.target_pending is not None:
+            self.target_pending = None
+            self.num_targets_coalesced += 1
+        if ((self.target_written is not None) and (abs(mm - self.target_written) < Const.ACTUATOR_TARGET_DEADBAND_MM)):
+            self.num_targets_suppressed += 1
+        else:
+            self.target_pending = mm
+        return True
+
+    def __write_pending_target(self):
+        if self.target_pending is None:
+            return
+        self.next_write_ts = time.monotonic() + self.min_write_interval_s
+        self.jrkg2.set_target_mm(self.target_pending)
+        self.target_written = self.target_pending
+        self.target_pending = None
+        self.num_targets_written += 1
+
     # for use in a ControllerProcess
     @staticmethod
     def worker(endpoint, params):
@@ -0,0 +1,23 @@
+# coding=utf-8
+
+
+class ActuatorStats(object):
+
+    def __init__(self, received, coalesced, suppressed, written, span_s):
+        self.received = received		# valid SET_TARGET_MM commands
+        self.coalesced = coalesced		# pending targets replaced by a newer one before being written
+        self.suppressed = suppressed		# targets within the deadband of the last written target
+        self.written = written			# targets written to the JrkG2
+        self.span_s = span_s			# time from the first to the last target received
+
+    # returns (received per second, written per second) over span_s, or (0, 0) if span_s is 0
+    def rates(self):
+        if (self.span_s <= 0):
+            return (0, 0)
+        return ((self.received / self.span_s), (self.written / self.span_s))
+
+    def __str__(self):
+        (rate_received, rate_written) = self.rates()
+        return ('received ' + str(self.received) + ' (' + '{:.1f}'.format(rate_received) + '/s), written ' +
+            str(self.written) + ' (' + '{:.1f}'.format(rate_written) + '/s), coalesced ' + str(self.coalesced) +
+            ', suppressed ' + str(self.suppressed))
@@ -0,0 +1,54 @@
+# coding=utf-8
+
+from abc import ABC, abstractmethod
+import PIL.Image
+
+from .const import Const
+from .exceptions import ContractViolation
+
+
+# camera backend interface used by VideoController (see CameraBackend)
+#
+# a backend supplies raw Mono8 frames; the conversion to the resized PIL image that detection uses is
+# common to all backends
+class Camera(ABC):
+
+    @abstractmethod
+    def init(self):
+        raise ContractViolation('abstract method invoked')
+
+    @abstractmethod
+    def deinit(self):
+        raise ContractViolation('abstract method invoked')
+
+    @abstractmethod
+    def begin_acquisition(self):
+        raise ContractViolation('abstract method invoked')
+
+    @abstractmethod
+    def end_acquisition(self):
+        raise ContractViolation('abstract method invoked')
+
+    # blocks until the next frame arrives
+    # returns it as a CAMERA_HEIGHT x CAMERA_WIDTH uint8 ndarray, or None if it is incomplete
+    @abstractmethod
+    def get_next_raw_image(self):
+        raise ContractViolation('abstract method invoked')
+
+    # returns next image as a processed PIL image
+    # returns None if image is incomplete
+    def get_next_image(self):
+        imgs = self.get_next_images()
+        if imgs is None:
+            return None
+        return imgs[1]
+
+    # returns next image as (raw ndarray, processed PIL image)
+    # returns None if image is incomplete
+    def get_next_images(self):
+        img_ndarray = self.get_next_raw_image()
+        if img_ndarray is None:
+            return None
+        img_pil = PIL.Image.fromarray(img_ndarray, mode=Const.DETECTION_PIL_IMG_MODE)
+        img_pil_resized = img_pil.resize((Const.DETECTION_IMG_DIM, Const.DETECTION_IMG_DIM), Const.DETECTION_PIL_RESAMP)
+        return (img_ndarray, img_pil_resized)
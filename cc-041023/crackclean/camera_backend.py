@@ -0,0 +1,12 @@
+# coding=utf-8
+
+from enum import Enum, unique
+
+
+@unique
+class CameraBackend(Enum):
+    SPINNAKER = 0	# FLIR camera via PySpin (SpinCam)
+    PLAYBACK  = 1	# recorded frames from CAMERA_PLAYBACK_PATH (PlaybackCam)
+
+    def __str__(self):
+        return self.name
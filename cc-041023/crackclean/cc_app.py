@@ -1,5 +1,6 @@
 # coding=utf-8
 
+import concurrent.futures
 import time
 
 from .cc_mode import CcMode
@@ -9,33 +10,43 @@ from .actuator_controller import ActuatorController
 from .detection_controller import DetectionController
 from .exceptions import CcException
 from .filter_mode import FilterMode
+from .frame_ref import FrameRef
+from .frame_ring import FrameRing
 from .main_controller import MainController
 from .joystick_controller import JoystickController
 from .video_controller import VideoController
 from .ipc.endpoint import Endpoint
 from .ipc.event_producer_endpoint import EventProducerEndpoint
 from .ipc.event_consumer_endpoint import EventConsumerEndpoint
+from .ipc.frame_signal import FrameSignal
 from .ipc.main_cmd import MainCmd
 from .ipc.main_resp import MainResp
 from .ipc.master_endpoint import MasterEndpoint
+from .ipc.pipe_channel import PipeChannel
 from .ipc.slave_endpoint import SlaveEndpoint
 
 
 class CcApp(object):
 
-    def __init__(self, context):
+    # overlay: whether DetectionController should render annotated images (only needed if they are displayed)
+    def __init__(self, context, overlay):
         self.context = context
+        self.overlay = overlay
         self.q_main_cmd       = None
         self.q_main_resp      = None
         self.q_actuator_cmd   = None
         self.q_actuator_resp  = None
         self.q_detection_cmd  = None
         self.q_detection_resp = None
+        self.q_detection_event = None
         self.q_joystick_cmd   = None
         self.q_joystick_resp  = None
         self.q_joystick_event = None
         self.q_video_cmd      = None
         self.q_video_resp     = None
+        self.frame_ring       = None
+        self.overlay_ring     = None
+        self.frame_signal     = None
         self.ep_main_master   = None
         self.cp_main          = None
         self.cp_actuator      = None
@@ -44,18 +55,29 @@ class CcApp(object):
         self.cp_video         = None
 
     def start(self):
-        # create queues
+        # create shared-memory frame rings (video frames, annotated images)
+        if (Const.FRAME_RING_ENABLED and FrameRing.is_supported()):
+            dim = Const.DETECTION_IMG_DIM
+            raw_shape = (Const.CAMERA_HEIGHT, Const.CAMERA_WIDTH) if Const.FRAME_RING_RAW else None
+            self.frame_ring = FrameRing(Const.FRAME_RING_SLOTS, (dim, dim), raw_shape)
+            if self.overlay:
+                self.overlay_ring = FrameRing(Const.OVERLAY_RING_SLOTS, (dim, dim, 3))
+        # create queues; the per-frame actuator/detection/video channels use PipeChannel where enabled (for
+        # detection/video only with the frame ring, so that no images are pickled through a raw pipe)
+        pipe_hot = Const.IPC_PIPE_CHANNELS
+        pipe_img = (Const.IPC_PIPE_CHANNELS and (self.frame_ring is not None))
         self.q_main_cmd       = self.context.Queue(Const.CMD_QUEUE_MAXSIZE)
         self.q_main_resp      = self.context.Queue(Const.RESP_QUEUE_MAXSIZE)
-        self.q_actuator_cmd   = self.context.Queue(Const.CMD_QUEUE_MAXSIZE)
-        self.q_actuator_resp  = self.context.Queue(Const.RESP_QUEUE_MAXSIZE)
-        self.q_detection_cmd  = self.context.Queue(Const.CMD_QUEUE_MAXSIZE)
-        self.q_detection_resp = self.context.Queue(Const.RESP_QUEUE_MAXSIZE)
+        self.q_actuator_cmd   = PipeChannel(self.context, Const.CMD_QUEUE_MAXSIZE) if pipe_hot else self.context.Queue(Const.CMD_QUEUE_MAXSIZE)
+        self.q_actuator_resp  = PipeChannel(self.context, Const.RESP_QUEUE_MAXSIZE) if pipe_hot else self.context.Queue(Const.RESP_QUEUE_MAXSIZE)
+        self.q_detection_cmd  = PipeChannel(self.context, Const.CMD_QUEUE_MAXSIZE) if pipe_img else self.context.Queue(Const.CMD_QUEUE_MAXSIZE)
+        self.q_detection_resp = PipeChannel(self.context, Const.RESP_QUEUE_MAXSIZE) if pipe_img else self.context.Queue(Const.RESP_QUEUE_MAXSIZE)
+        self.q_detection_event = self.context.Queue(Const.EVENT_QUEUE_MAXSIZE)
         self.q_joystick_cmd   = self.context.Queue(Const.CMD_QUEUE_MAXSIZE)
         self.q_joystick_resp  = self.context.Queue(Const.RESP_QUEUE_MAXSIZE)
         self.q_joystick_event = self.context.Queue(Const.EVENT_QUEUE_MAXSIZE)
-        self.q_video_cmd      = self.context.Queue(Const.CMD_QUEUE_MAXSIZE)
-        self.q_video_resp     = self.context.Queue(Const.RESP_QUEUE_MAXSIZE)
+        self.q_video_cmd      = PipeChannel(self.context, Const.CMD_QUEUE_MAXSIZE) if pipe_img else self.context.Queue(Const.CMD_QUEUE_MAXSIZE)
+        self.q_video_resp     = PipeChannel(self.context, Const.RESP_QUEUE_MAXSIZE) if pipe_img else self.context.Queue(Const.RESP_QUEUE_MAXSIZE)
         # create endpoints
         self.ep_main_master         = MasterEndpoint(        self.q_main_cmd,       self.q_main_resp)
         ep_main_slave               = SlaveEndpoint(         self.q_main_resp,      self.q_main_cmd)
@@ -63,18 +85,26 @@ class CcApp(object):
         ep_actuator_slave           = SlaveEndpoint(         self.q_actuator_resp,  self.q_actuator_cmd)
         ep_detection_master         = MasterEndpoint(        self.q_detection_cmd,  self.q_detection_resp)
         ep_detection_slave          = SlaveEndpoint(         self.q_detection_resp, self.q_detection_cmd)
+        ep_detection_event_producer = EventProducerEndpoint( self.q_detection_event)
+        ep_detection_event_consumer = EventConsumerEndpoint( self.q_detection_event)
         ep_joystick_master          = MasterEndpoint(        self.q_joystick_cmd,   self.q_joystick_resp)
         ep_joystick_slave           = SlaveEndpoint(         self.q_joystick_resp,  self.q_joystick_cmd)
-        ep_joystick_event_producer  = EventProducerEndpoint( self.q_joystick_event)
+        ep_joystick_event_producer  = EventProducerEndpoint( self.q_joystick_event, Const.SEND_POLICY_JOYSTICK_EVENT)
         ep_joystick_event_consumer  = EventConsumerEndpoint( self.q_joystick_event)
         ep_video_master             = MasterEndpoint(        self.q_video_cmd,      self.q_video_resp)
-        ep_video_slave              = SlaveEndpoint(         self.q_video_resp,     self.q_video_cmd)
+        ep_video_slave              = SlaveEndpoint(         self.q_video_resp,     self.q_video_cmd, Const.SEND_POLICY_VIDEO_RESP)
+        # pipeline mode: MainController consumes streamed detection results
+        # (and VideoController wakes DetectionController for each frame)
+        if (Const.DETECTION_PIPELINE_ENABLED and (self.frame_ring is not None)):
+            self.frame_signal = FrameSignal(self.context)
+        else:
+            ep_detection_event_consumer = None
         # build controller arguments
-        main_controller_args      = (ep_actuator_master, ep_detection_master, ep_joystick_master, ep_joystick_event_consumer, ep_video_master)
+        main_controller_args      = (ep_actuator_master, ep_detection_master, ep_joystick_master, ep_joystick_event_consumer, ep_video_master, self.overlay, ep_detection_event_consumer)
         actuator_controller_args  = ()
-        detection_controller_args = (Const.LABEL_PATH, Const.MODEL_PATH)
+        detection_controller_args = (Const.LABEL_PATH, Const.MODEL_PATH, self.frame_ring, self.overlay_ring, ep_detection_event_producer, self.frame_signal)
         joystick_controller_args  = (ep_joystick_event_producer,)
-        video_controller_args     = ()
+        video_controller_args     = (self.frame_ring, self.frame_signal)
         # build worker arguments
         main_worker_args      = (ep_main_slave,      main_controller_args)
         actuator_worker_args  = (ep_actuator_slave,  actuator_controller_args)
@@ -138,6 +168,7 @@ class CcApp(object):
         else:
             if ((not isinstance(resp, MainResp)) or (resp.token != MainResp.Token.OK)):
                 raise CcException('CcApp received unexpected response from MainController to TERMINATE command')
+        self.ep_main_master.stop_receiver()
         # shutdown all queues that we write to
         Endpoint.shutdown_queue(self.q_main_cmd)
 
@@ -151,15 +182,45 @@ class CcApp(object):
         self.cp_joystick.shutdown()
         # wait for video worker to terminate
         self.cp_video.shutdown()
+        # release frame rings (only once no worker can touch them)
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+            self.frame_ring = None
+        if self.overlay_ring is not None:
+            self.overlay_ring.close()
+            self.overlay_ring = None
+        if self.frame_signal is not None:
+            self.frame_signal.close()
+            self.frame_signal = None
 
     def get_status(self):
         resp = self.ep_main_master.send_cmd_sync(MainCmd(MainCmd.Token.GET_STATUS, ()), Const.CMD_SYNC_TIMEOUT_MS)
+        return self.__status_from_resp(resp)
+
+    # non-blocking get_status(): returns a Future for the GET_STATUS response; once it is done(), pass it to
+    # status_from_future()
+    def get_status_future(self):
+        return self.ep_main_master.send_cmd_future(MainCmd(MainCmd.Token.GET_STATUS, ()), (Const.CMD_SYNC_TIMEOUT_MS / 1000))
+
+    # returns the CcStatus from a completed get_status_future() Future (raises as get_status() does)
+    def status_from_future(self, fut):
+        try:
+            resp = fut.result(timeout=0)
+        except concurrent.futures.TimeoutError:
+            resp = None
+        return self.__status_from_resp(resp)
+
+    def __status_from_resp(self, resp):
         if resp is None:
             raise CcException('CcApp received no response from MainController to GET_STATUS command')		# WARN?
         if not isinstance(resp, MainResp):
             raise CcException('CcApp received unexpected response from MainController to GET_STATUS command')
         if (resp.token == MainResp.Token.STATUS):
-            return resp.params[0]
+            cc_status = resp.params[0]
+            if ((cc_status is not None) and isinstance(cc_status.img, FrameRef)):
+                # copy out of the overlay ring (None if the slot has already been recycled)
+                cc_status.img = self.overlay_ring.get_image(cc_status.img, copy=True)
+            return cc_status
         else:
             raise CcException('CcApp received unexpected response from MainController to GET_STATUS command')
 
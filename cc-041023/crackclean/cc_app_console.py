@@ -10,7 +10,7 @@ from .const import Const
 class CcAppConsole(object):
 
     def __init__(self, context, update_period_ms):
-        self.cc_app = CcApp(context)
+        self.cc_app = CcApp(context, False)
         self.update_period_s = (update_period_ms / 1000)
         self.tm_last_proc_check = None
 
@@ -9,7 +9,7 @@ from .cc_gui import CcGui
 class CcAppGui(object):
 
     def __init__(self, context, show_images, update_period_ms):
-        self.cc_app = CcApp(context)
+        self.cc_app = CcApp(context, show_images)
         self.show_images = show_images
         self.update_period_ms = update_period_ms
 
@@ -46,6 +46,7 @@ class CcGui(object):
         self.sv_adaptfilter_radius    = None
         self.entry_adaptfilter_radius = None
         self.tm_last_proc_check       = None
+        self.status_future            = None	# in-flight GET_STATUS request
 
         self.iv_filtermode = None
         self.radio_filtermode_simple = None
@@ -130,12 +131,20 @@ class CcGui(object):
                 return False
         return True
 
+    # the GET_STATUS round trip runs in the background (so the mainloop never blocks on MainController); each
+    # call shows the status requested on the previous call, if it has arrived, and requests the next one
     def update_status(self):
-        cc_status = self.cc_app.get_status()
+        if self.status_future is None:
+            self.status_future = self.cc_app.get_status_future()
+        if not self.status_future.done():
+            return
+        cc_status = self.cc_app.status_from_future(self.status_future)
+        self.status_future = self.cc_app.get_status_future()
         if cc_status is not False:
             if cc_status is not None:
-                self.pi_latest = ImageTk.PhotoImage(cc_status.img)
                 if self.show_images:
+                    img = self.img_empty if (cc_status.img is None) else cc_status.img
+                    self.pi_latest = ImageTk.PhotoImage(img)
                     self.label_img.configure(image=self.pi_latest)
                 self.label_mode.configure(text=str(cc_status.cc_mode))
                 self.label_detect_thresh.configure(text=str(cc_status.detect_thresh))
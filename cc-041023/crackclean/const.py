@@ -2,6 +2,10 @@
 
 import PIL.Image
 
+from .camera_backend import CameraBackend
+from .ipc.send_policy import SendPolicy
+from .jrkg2_error_check import JrkG2ErrorCheck
+
 
 class Const(object):
 
@@ -16,10 +20,36 @@ class Const(object):
     CMD_QUEUE_MAXSIZE = 8
     RESP_QUEUE_MAXSIZE = 8
     EVENT_QUEUE_MAXSIZE = 8
-    QUEUE_TIMEOUT_S = 2
     ENDPOINT_QUEUE_SHUTDOWN_DELAY_S = 0.5
-
-    MAIN_CONTROLLER_MIN_PERIOD_S = (5 / 1000)
+    # send-side backpressure: what an endpoint does when the queue it sends on is full (see SendPolicy)
+    SEND_POLICY_CMD = SendPolicy.REJECT_NEW		# MasterEndpoint; the FSM retries a rejected send (and resends an expired op)
+    SEND_POLICY_RESP = SendPolicy.BLOCK_DEADLINE	# SlaveEndpoint
+    SEND_POLICY_VIDEO_RESP = SendPolicy.DROP_OLDEST	# frames: a stale LATEST_IMG is worth less than a fresh one
+    SEND_POLICY_EVENT = SendPolicy.DROP_OLDEST		# EventProducerEndpoint (detection results)
+    SEND_POLICY_JOYSTICK_EVENT = SendPolicy.BLOCK_DEADLINE	# BUTTON_DOWN edges must not be dropped; positions are coalesced by the producer
+    ENDPOINT_SEND_DEADLINE_S = 2			# BLOCK_DEADLINE wait
+    ENDPOINT_DROP_RETRY_S = (1 / 1000)			# DROP_OLDEST wait when nothing can be taken back
+    MASTER_ENDPOINT_OP_TTL_S = 10		# async ops without a response expire after this long (MainController resends them)
+    MASTER_ENDPOINT_MAX_OPS = 32		# bound on tracked (in-flight + unclaimed) ops per MasterEndpoint
+    MASTER_ENDPOINT_EXPIRY_CHECK_S = (100 / 1000)
+    MASTER_ENDPOINT_RECEIVER_POLL_S = (100 / 1000)	# receiver thread / sync wait re-check interval
+    IPC_PIPE_CHANNELS = True			# carry the per-frame actuator/detection/video messages over PipeChannel
+
+    MAIN_CONTROLLER_MAX_WAIT_S = (50 / 1000)	# longest idle wait for a message before re-checking timeouts
+    # overlapped mode: frame requests, detection and actuator writes run concurrently rather than in strict
+    # sequence; only the newest target is written to the actuator
+    MAIN_CONTROLLER_OVERLAPPED = False
+
+    # shared-memory frame rings (requires Python >= 3.8; falls back to pickling images through the queues)
+    FRAME_RING_ENABLED = True
+    FRAME_RING_SLOTS = 8			# video frames; must exceed the number of frames in flight
+    FRAME_RING_RAW = False			# also keep the raw CAMERA_WIDTH x CAMERA_HEIGHT frame in each slot
+    OVERLAY_RING_SLOTS = 4			# annotated detection images
+
+    # pipeline mode: DetectionController pulls frames straight from the frame ring and streams results to
+    # MainController (requires the frame ring)
+    DETECTION_PIPELINE_ENABLED = False
+    DETECTION_STREAM_MAX_WAIT_S = (100 / 1000)	# longest wait for a frame-ready signal before re-checking the ring
 
     LABEL_PATH = 'etc/crack_labels.txt'
     MODEL_PATH = 'etc/optimizedQ_123214_tpu.tflite'
@@ -54,6 +84,12 @@ class Const(object):
     CAMERA_HEIGHT = 480				# depends on CAMERA_VIDEO_MODE
     CAMERA_OFFSET_X = 0				# depends on CAMERA_VIDEO_MODE and CAMERA_WIDTH
     CAMERA_OFFSET_Y = 0				# depends on CAMERA_VIDEO_MODE and CAMERA_HEIGHT
+    CAMERA_BACKEND = CameraBackend.SPINNAKER
+    CAMERA_PLAYBACK_PATH = None			# .npy/.npz file or directory of frames (CameraBackend.PLAYBACK)
+    CAMERA_PLAYBACK_FPS = 60			# used when the recording has no timestamps
+    CAMERA_PLAYBACK_JITTER_MS = 1.0		# std dev of the frame interval (when the recording has no timestamps)
+    CAMERA_PLAYBACK_INCOMPLETE_PROB = 0.01
+    CAMERA_PLAYBACK_SEED = None			# for a repeatable jitter/incomplete-frame sequence
     VIDEO_MAX_IMG_REQ_DELAY_S = 1.0
 
     JOYSTICK_COOKED_DEV = '/dev/input/by-id/usb-CH_Products_MEGATRON_USB_Joystick-joystick'
@@ -64,7 +100,8 @@ class Const(object):
     JOYSTICK_BUTTON_NUM = 0
     JOYSTICK_POSITIVE_IS_EXTEND = True
     JOYSTICK_INITIAL_IGNORE_TIME_S = (500 / 1000)	# to ignore the initial flurry of non-init events that the kernel/device occasionally emits
-    JOYSTICK_CONTROLLER_LOOP_SLEEP_S = (5 / 1000)
+    JOYSTICK_CONTROLLER_MAX_WAIT_S = (500 / 1000)	# longest wait for joystick input or a command
+    JOYSTICK_MAX_PACKETS_PER_READ = 64
     JOYSTICK_ZERO_MAX_NORM = 0.02
 
     JRKG2_DEV = '/dev/serial/by-id/usb-Pololu_Corporation_Pololu_Jrk_G2_18v19_00259610-if01'
@@ -72,6 +109,13 @@ class Const(object):
     JRKG2_READ_TIMEOUT_MS = 250
     JRKG2_WRITE_TIMEOUT_MS = 250
     JRKG2_CRC_ENABLED = True
-    JRKG2_CHECK_ERRFLAGS_AFTER_CMDS = True
+    JRKG2_ERROR_CHECK = JrkG2ErrorCheck.POLLED
+    JRKG2_HEALTH_POLL_PERIOD_S = (100 / 1000)	# for JrkG2ErrorCheck.POLLED
+    JRKG2_SIMULATED = False			# use a JrkG2Sim on a pty instead of JRKG2_DEV
+    JRKG2_SIM_TIME_CONSTANT_MS = 150
+    JRKG2_SIM_DEAD_TIME_MS = 10
+    JRKG2_SIM_RESPONSE_LATENCY_MS = 1
     ACTUATOR_STROKE_MM = 12 * 25.4
+    ACTUATOR_TARGET_DEADBAND_MM = 0.25		# targets closer than this to the last written target are not written
+    ACTUATOR_MAX_UPDATE_HZ = 50			# most target writes per second (None for no limit)
 
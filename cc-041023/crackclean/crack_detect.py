@@ -4,6 +4,7 @@ import math
 import time
 import numpy
 from PIL import Image
+from PIL import ImageColor
 from PIL import ImageDraw
 
 import crackthresh
@@ -31,10 +32,12 @@ class CrackDetect(object):
         self.scaling_factor = scaling_factor
         #
         self.lx_mm = lg_mm - (guid_center_x_px * self.scaling_factor)
+        # reused from frame to frame, so the adaptive filter doesn't reallocate its integral image
+        self.integral_img = crackthresh.IntegralImage()
 
-    def process_image(self, engine, img_l, cbox_prev, detect_thresh, simpfilter_thresh, adaptfilter_thresh, adaptfilter_radius, adaptive):
+    # when overlay is False, no annotated image is produced (None is returned in its place)
+    def process_image(self, engine, img_l, cbox_prev, detect_thresh, simpfilter_thresh, adaptfilter_thresh, adaptfilter_radius, adaptive, overlay=True):
         img_rgb = img_l.convert('RGB')
-        draw_rgb = ImageDraw.Draw(img_rgb)
         # perform detection
         ts_begin = time.monotonic()
         cands = engine.DetectWithImage(img_rgb, threshold=detect_thresh, keep_aspect_ratio=True, relative_coord=False, top_k=CrackDetect.DETECTION_MAX_OBJECTS)
@@ -71,14 +74,29 @@ class CrackDetect(object):
             else:
                 # use previous cbox as-is
                 (x0, y0, x1, y1) = cbox_prev
+        cbox = [x0, y0, x1, y1]
         # execute filter
-        imgbytes = CrackDetect.__crop_to_bytes(img_l, x0, y0, x1, y1)
+        imgcrop = CrackDetect.__crop(img_l, x0, y0, x1, y1)
+        if adaptive:
+            self.integral_img.build(imgcrop, x1-x0+1, y1-y0+1)
+        if not overlay:
+            # no overlay to draw, so fit the line without materializing the filter points
+            if adaptive:
+                (m, b_px, num_pts) = self.integral_img.fit_line_adaptive(x0, y0, adaptfilter_thresh, adaptfilter_radius)
+            else:
+                (m, b_px, num_pts) = crackthresh.fit_line_simple(imgcrop, x1-x0+1, y1-y0+1, x0, y0, simpfilter_thresh)
+            if ((num_pts > CrackDetect.LSTSQ_MIN_PTS) and (m is not None)):
+                y_mm = -m * self.lx_mm + (b_px - (self.img_dim / 2)) * self.scaling_factor
+            else:
+                y_mm = None
+            return (y_mm, None, crack_det_cnt, infer_time, cbox)
         if adaptive:
-            (x_vals, y_vals, xy_vals) = crackthresh.filter_adaptive(imgbytes, x1-x0+1, y1-y0+1, x0, y0, adaptfilter_thresh, adaptfilter_radius)
+            (x_vals, y_vals, xy_vals) = self.integral_img.filter_adaptive(x0, y0, adaptfilter_thresh, adaptfilter_radius)
         else:
-            (x_vals, y_vals, xy_vals) = crackthresh.filter_simple(imgbytes, x1-x0+1, y1-y0+1, x0, y0, simpfilter_thresh)
+            (x_vals, y_vals, xy_vals) = crackthresh.filter_simple_array(imgcrop, x1-x0+1, y1-y0+1, x0, y0, simpfilter_thresh)
         # draw filter points
-        draw_rgb.point(xy_vals, fill=CrackDetect.COLOR_FILTER_PTS)
+        img_rgb = CrackDetect.__draw_points(img_rgb, x_vals, y_vals, CrackDetect.COLOR_FILTER_PTS)
+        draw_rgb = ImageDraw.Draw(img_rgb)
         # conditionally calculate y_mm
         if (len(xy_vals) > CrackDetect.LSTSQ_MIN_PTS):
             (m, b_px) = CrackDetect.__least_squares(x_vals, y_vals)
@@ -92,7 +110,6 @@ class CrackDetect(object):
             rect_color = CrackDetect.COLOR_BBOX_DETECTED
         else:
             rect_color = CrackDetect.COLOR_BBOX_NOT_DETECTED
-        cbox = [x0, y0, x1, y1]
         # PIL rectangle() docs seem to indicate that it follows the usual PIL convention in which
         # the second point of a bounding box addresses the column/row just beyond the box ("The
         # second point is just outside the drawn rectangle.".  However, rectangle() doesn't behave
@@ -108,10 +125,18 @@ class CrackDetect(object):
         (m, b_px) = numpy.linalg.lstsq(a, y_vals, rcond=None)[0]
         return (m, b_px)
 
-    # convert a cropped region of a PIL mode-L image to a Python bytes object
+    # color the given points of a PIL mode-RGB image in a single vectorized assignment (ImageDraw.point()
+    # would need a Python sequence of coordinates); returns a new image
+    @staticmethod
+    def __draw_points(img_rgb, x_vals, y_vals, color):
+        rgbarr = numpy.array(img_rgb)
+        rgbarr[y_vals, x_vals] = ImageColor.getrgb(color)[:3]
+        return Image.fromarray(rgbarr)
+
+    # return a cropped region of a PIL mode-L image as a 2-D NumPy view (crackthresh accepts strided
+    # buffers, so the crop is not copied)
     @staticmethod
-    def __crop_to_bytes(img_l, x0, y0, x1, y1):
+    def __crop(img_l, x0, y0, x1, y1):
         imgarr = numpy.asarray(img_l)
-        crop = imgarr[y0:(y1+1), x0:(x1+1)]
-        return crop.tobytes(order='C')
+        return imgarr[y0:(y1+1), x0:(x1+1)]
 
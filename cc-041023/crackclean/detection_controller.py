@@ -1,5 +1,8 @@
 # coding=utf-8
 
+import multiprocessing.connection
+import time
+
 from edgetpu.detection.engine import DetectionEngine
 
 from .const import Const
@@ -8,17 +11,28 @@ from .crack_detect import CrackDetect
 from .detection_result import DetectionResult
 from .exceptions import DetectionException
 from .filter_mode import FilterMode
+from .frame_ref import FrameRef
 from .ipc.detection_cmd import DetectionCmd
+from .ipc.detection_event import DetectionEvent
 from .ipc.detection_resp import DetectionResp
 from .ipc.endpoint import Endpoint
 
 
 class DetectionController(Controller):
 
+    # params: (label_path, model_path, frame_ring, overlay_ring, ep_event_producer, frame_signal); the rings
+    # and frame_signal may be None
+    # ep_event_producer carries streamed results and frame_signal wakes streaming for each new frame
+    # (pipeline mode, see START_STREAM)
     def __init__(self, endpoint, params):
         super().__init__(endpoint, params)
         self.label_path = self.params[0]
         self.model_path = self.params[1]
+        self.frame_ring = self.params[2]
+        self.overlay_ring = self.params[3]
+        self.ep_event_producer = self.params[4]
+        self.frame_signal = self.params[5]
+        self.crack_box = None
         self.labels = None
         self.engine = None
 
@@ -42,53 +56,125 @@ class DetectionController(Controller):
         )
 
     def deinit(self):
+        print('DetectionController events: ' + str(self.ep_event_producer.get_send_stats()))
         # shutdown all queues that we write to
         Endpoint.shutdown_queue(self.endpoint.txq)
+        Endpoint.shutdown_queue(self.ep_event_producer.txq)
         # delete refs
         del self.labels
         del self.engine
         del self.crackdetect
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+        if self.overlay_ring is not None:
+            self.overlay_ring.close()
+        if self.frame_signal is not None:
+            self.frame_signal.close()
+        del self.frame_ring
+        del self.overlay_ring
+        del self.frame_signal
+        del self.ep_event_producer
 
+    # two modes of operation:
+    #   - request/response: each DETECT command carries a frame (VideoImage or FrameRef) and gets a DETECTION_RESULT
+    #   - pipeline (START_STREAM .. STOP_STREAM): the newest frame is pulled straight from the video FrameRing and
+    #     each result is sent as a DetectionEvent.RESULT; SET_PARAMS updates the detection parameters.  between
+    #     frames the controller sleeps until the FrameSignal or a command wakes it
+    # detection parameters (in order): detect_thresh, simpfilter_thresh, adaptfilter_thresh, adaptfilter_radius,
+    # filter_mode, overlay
     def start(self):
-        crack_box = Const.DETECTION_CRACK_BOX_DEFAULT
+        self.crack_box = Const.DETECTION_CRACK_BOX_DEFAULT
+        stream_params = None
+        stream_ref_last = None
         while True:
-            tup = self.endpoint.get_cmd(True)
-            (cmd_op_id, cmd) = tup
-            if not isinstance(cmd, DetectionCmd):
-                self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.ERROR, ()))
-                raise DetectionException('DetectionController received unexpected OpObj')
-            if (cmd.token == DetectionCmd.Token.TERMINATE):
-                self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.OK, ()))
-                break
-            elif (cmd.token == DetectionCmd.Token.IS_READY):
-                self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.TRUE, ()))
-            elif (cmd.token == DetectionCmd.Token.DETECT):				# TODO: validate # args/types?/vals?/etc.
-                img_latest = cmd.params[0]
-                detect_thresh = cmd.params[1]
-                simpfilter_thresh = cmd.params[2]
-                adaptfilter_thresh = cmd.params[3]
-                adaptfilter_radius = cmd.params[4]
-                filter_mode = cmd.params[5]
-                # TODO: use crack_det_cnt, ultimately in CcStatus
-                (y_mm, img, crack_det_cnt, inferencing_time, crack_box) = self.crackdetect.process_image(
-                    self.engine,
-                    img_latest.img,
-                    crack_box,
-                    detect_thresh,
-                    simpfilter_thresh,
-                    adaptfilter_thresh,
-                    adaptfilter_radius,
-                    (filter_mode == FilterMode.ADAPTIVE)
-                )
-                #print('0:\t' + str(crack_detected) + '\t' + str(crack_box))
-                # FIXME: crackdetect is currently returning type numpy.float64, not float
-                # TODO: can it ever return None for y_mm?
-                y_mm = None if (y_mm is None) else float(y_mm)
-                result = DetectionResult(y_mm, img)
-                self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.DETECTION_RESULT, (result,)))
-            else:
-                self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.ERROR, ()))
-                raise DetectionException('DetectionController received unexpected command')
+            # only block waiting for commands when not streaming
+            tup = self.endpoint.get_cmd(stream_params is None)
+            if tup is not None:
+                (cmd_op_id, cmd) = tup
+                if not isinstance(cmd, DetectionCmd):
+                    self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.ERROR, ()))
+                    raise DetectionException('DetectionController received unexpected OpObj')
+                if (cmd.token == DetectionCmd.Token.TERMINATE):
+                    self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.OK, ()))
+                    break
+                elif (cmd.token == DetectionCmd.Token.IS_READY):
+                    self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.TRUE, ()))
+                elif (cmd.token == DetectionCmd.Token.DETECT):				# TODO: validate # args/types?/vals?/etc.
+                    img_latest = cmd.params[0]
+                    result = self.detect(img_latest, cmd.params[1:])
+                    self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.DETECTION_RESULT, (result,)))
+                elif (cmd.token == DetectionCmd.Token.START_STREAM):
+                    if ((self.frame_ring is None) or (self.frame_signal is None)):
+                        self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.ERROR, ()))
+                        raise DetectionException('DetectionController cannot stream without a FrameRing and FrameSignal')
+                    stream_params = cmd.params
+                    stream_ref_last = None
+                    self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.OK, ()))
+                elif (cmd.token == DetectionCmd.Token.SET_PARAMS):
+                    if stream_params is not None:
+                        stream_params = cmd.params
+                    self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.OK, ()))
+                elif (cmd.token == DetectionCmd.Token.STOP_STREAM):
+                    stream_params = None
+                    self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.OK, ()))
+                else:
+                    self.endpoint.send_resp(cmd_op_id, DetectionResp(DetectionResp.Token.ERROR, ()))
+                    raise DetectionException('DetectionController received unexpected command')
+            if stream_params is not None:
+                # cleared before the check, so that a frame written after it wakes the wait below
+                self.frame_signal.clear()
+                ref = self.frame_ring.latest()
+                if ((ref is None) or ((stream_ref_last is not None) and (ref.slot == stream_ref_last.slot) and (ref.generation == stream_ref_last.generation))):
+                    # no new frame yet; sleep until one is written or a command arrives
+                    multiprocessing.connection.wait([self.endpoint.rx_waitable(), self.frame_signal.reader], Const.DETECTION_STREAM_MAX_WAIT_S)
+                    continue
+                stream_ref_last = ref
+                ts_begin = time.monotonic()
+                result = self.detect(ref, stream_params)
+                dc_ms = (time.monotonic() - ts_begin) * 1000
+                self.ep_event_producer.send_event(DetectionEvent(DetectionEvent.Token.RESULT, (result, ref.timestamp, dc_ms)))
+
+    # img_latest: VideoImage or FrameRef
+    # params: detection parameters, as documented at start()
+    # returns a DetectionResult
+    def detect(self, img_latest, params):
+        detect_thresh = params[0]
+        simpfilter_thresh = params[1]
+        adaptfilter_thresh = params[2]
+        adaptfilter_radius = params[3]
+        filter_mode = params[4]
+        overlay = params[5]
+        if isinstance(img_latest, FrameRef):
+            # zero-copy view of the shared frame slot
+            img_l = self.frame_ring.get_image(img_latest)
+            if img_l is None:
+                print('warning: DetectionController frame overwritten before use (FRAME_RING_SLOTS too small?)')
+                return DetectionResult(None, None)
+        else:
+            img_l = img_latest.img
+        # TODO: use crack_det_cnt, ultimately in CcStatus
+        (y_mm, img, crack_det_cnt, inferencing_time, self.crack_box) = self.crackdetect.process_image(
+            self.engine,
+            img_l,
+            self.crack_box,
+            detect_thresh,
+            simpfilter_thresh,
+            adaptfilter_thresh,
+            adaptfilter_radius,
+            (filter_mode == FilterMode.ADAPTIVE),
+            overlay
+        )
+        #print('0:\t' + str(crack_detected) + '\t' + str(crack_box))
+        # FIXME: crackdetect is currently returning type numpy.float64, not float
+        # TODO: can it ever return None for y_mm?
+        y_mm = None if (y_mm is None) else float(y_mm)
+        if (isinstance(img_latest, FrameRef) and (not self.frame_ring.is_current(img_latest))):
+            # slot was recycled while it was being processed; the result may be torn
+            print('warning: DetectionController frame overwritten during use (FRAME_RING_SLOTS too small?)')
+            (y_mm, img) = (None, None)
+        if ((img is not None) and (self.overlay_ring is not None)):
+            img = self.overlay_ring.write(img, img_latest.timestamp)
+        return DetectionResult(y_mm, img)
 
     @staticmethod
     def lookup_labels(lmap, labels):
@@ -3,6 +3,7 @@
 
 class DetectionResult(object):
 
+    # img: annotated PIL image, a FrameRef into the overlay FrameRing, or None
     def __init__(self, y_mm, img):
         self.y_mm = y_mm
         self.img = img
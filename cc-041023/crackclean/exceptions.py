@@ -5,6 +5,11 @@ class ActuatorException(Exception):
         super(ActuatorException, self).__init__(msg)
         self.msg = msg
 
+class CameraException(Exception):
+    def __init__(self, msg):
+        super(CameraException, self).__init__(msg)
+        self.msg = msg
+
 class CcException(Exception):
     def __init__(self, msg):
         super(CcException, self).__init__(msg)
@@ -30,7 +35,7 @@ class JrkG2Exception(Exception):
         super(JrkG2Exception, self).__init__(msg)
         self.msg = msg
 
-class SpinCamException(Exception):
+class SpinCamException(CameraException):
     def __init__(self, msg):
         super(SpinCamException, self).__init__(msg)
         self.msg = msg
@@ -0,0 +1,19 @@
+# coding=utf-8
+
+from .exceptions import ContractViolation
+
+
+# lightweight handle to a frame held in a FrameRing slot; this (not the pixels) is what crosses process
+# boundaries.  timestamp mirrors the slot header so consumers can compute image age without touching the
+# ring.  duck-types VideoImage's is_empty()/timestamp so it can travel the same IPC paths.
+class FrameRef(object):
+
+    def __init__(self, slot, generation, timestamp):
+        if ((slot is None) or (generation is None) or (timestamp is None)):
+            raise ContractViolation('invalid argument: slot/generation/timestamp')
+        self.slot = slot
+        self.generation = generation
+        self.timestamp = timestamp
+
+    def is_empty(self):
+        return False
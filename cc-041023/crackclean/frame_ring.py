@@ -0,0 +1,165 @@
+# coding=utf-8
+
+import os
+
+import numpy
+import PIL.Image
+
+from .exceptions import ContractViolation
+from .frame_ref import FrameRef
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:		# < 3.8
+    shared_memory = None
+
+
+# fixed-size ring of frame slots in a multiprocessing.shared_memory block
+#
+# a single producer writes frames round-robin and hands out FrameRefs (slot index + generation); consumers
+# in other processes resolve a FrameRef to a zero-copy view of the slot.  each slot has a generation counter
+# that is odd while the slot is being written (seqlock style), so a consumer can tell whether the frame it
+# was handed has since been overwritten: check is_current() after using a view.
+#
+# optionally, each slot also carries a raw (full-sensor) frame alongside the main frame.
+#
+# FrameRing objects are picklable: unpickling attaches to the existing block.  only the creating process
+# unlinks the block (a copy inherited through fork only closes it)
+class FrameRing(object):
+
+    COUNTER_DTYPE = numpy.uint64
+    TIMESTAMP_DTYPE = numpy.float64
+    PIXEL_DTYPE = numpy.uint8
+
+    # frame_shape/raw_shape: (height, width) or (height, width, channels); raw_shape may be None
+    def __init__(self, num_slots, frame_shape, raw_shape=None, name=None):
+        if shared_memory is None:
+            raise ContractViolation('FrameRing requires multiprocessing.shared_memory (Python >= 3.8)')
+        if (num_slots < 2):
+            raise ContractViolation('invalid argument: num_slots')
+        self.num_slots = num_slots
+        self.frame_shape = tuple(frame_shape)
+        self.raw_shape = None if (raw_shape is None) else tuple(raw_shape)
+        self.owner_pid = os.getpid() if (name is None) else None
+        (offsets, size) = FrameRing.layout(num_slots, self.frame_shape, self.raw_shape)
+        if (name is None):
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        self.head = numpy.ndarray((1,), dtype=FrameRing.COUNTER_DTYPE, buffer=buf, offset=offsets[0])
+        self.generations = numpy.ndarray((num_slots,), dtype=FrameRing.COUNTER_DTYPE, buffer=buf, offset=offsets[1])
+        self.seqs = numpy.ndarray((num_slots,), dtype=FrameRing.COUNTER_DTYPE, buffer=buf, offset=offsets[2])
+        self.timestamps = numpy.ndarray((num_slots,), dtype=FrameRing.TIMESTAMP_DTYPE, buffer=buf, offset=offsets[3])
+        self.frames = numpy.ndarray(((num_slots,) + self.frame_shape), dtype=FrameRing.PIXEL_DTYPE, buffer=buf, offset=offsets[4])
+        self.raws = None
+        if self.raw_shape is not None:
+            self.raws = numpy.ndarray(((num_slots,) + self.raw_shape), dtype=FrameRing.PIXEL_DTYPE, buffer=buf, offset=offsets[5])
+        if (name is None):
+            self.head[0] = 0
+            self.generations[:] = 0
+            self.seqs[:] = 0
+            self.timestamps[:] = 0
+
+    @staticmethod
+    def is_supported():
+        return (shared_memory is not None)
+
+    # returns ([head, generations, seqs, timestamps, frames, raws] byte offsets, total size)
+    @staticmethod
+    def layout(num_slots, frame_shape, raw_shape):
+        def align(n):
+            return ((n + 63) // 64) * 64
+        sizes = [
+            numpy.dtype(FrameRing.COUNTER_DTYPE).itemsize,
+            num_slots * numpy.dtype(FrameRing.COUNTER_DTYPE).itemsize,
+            num_slots * numpy.dtype(FrameRing.COUNTER_DTYPE).itemsize,
+            num_slots * numpy.dtype(FrameRing.TIMESTAMP_DTYPE).itemsize,
+            num_slots * int(numpy.prod(frame_shape)),
+            0 if (raw_shape is None) else (num_slots * int(numpy.prod(raw_shape)))
+        ]
+        offsets = []
+        pos = 0
+        for sz in sizes:
+            offsets.append(pos)
+            pos = align(pos + sz)
+        return (offsets, max(pos, 1))
+
+    def __getstate__(self):
+        return (self.num_slots, self.frame_shape, self.raw_shape, self.shm.name)
+
+    def __setstate__(self, state):
+        (num_slots, frame_shape, raw_shape, name) = state
+        self.__init__(num_slots, frame_shape, raw_shape, name)
+
+    # producer only; frame (and raw, if given) must match frame_shape (raw_shape); accepts anything
+    # numpy.asarray() understands, including PIL images
+    # returns the FrameRef of the written slot
+    def write(self, frame, timestamp, raw=None):
+        seq = int(self.head[0])
+        slot = seq % self.num_slots
+        gen = int(self.generations[slot])
+        self.generations[slot] = gen + 1		# odd: write in progress
+        self.frames[slot] = numpy.asarray(frame)
+        if ((raw is not None) and (self.raws is not None)):
+            self.raws[slot] = numpy.asarray(raw)
+        self.seqs[slot] = seq
+        self.timestamps[slot] = timestamp
+        self.generations[slot] = gen + 2
+        self.head[0] = seq + 1
+        return FrameRef(slot, (gen + 2), timestamp)
+
+    # returns a FrameRef to the most recently written frame, or None if nothing has been written yet
+    def latest(self):
+        seq = int(self.head[0])
+        if (seq < 1):
+            return None
+        slot = (seq - 1) % self.num_slots
+        gen = int(self.generations[slot])
+        ts = float(self.timestamps[slot])
+        if (((gen % 2) != 0) or (int(self.generations[slot]) != gen)):
+            return None
+        return FrameRef(slot, gen, ts)
+
+    def is_current(self, ref):
+        return (int(self.generations[ref.slot]) == ref.generation)
+
+    # returns a zero-copy (read-only) view of the referenced frame, or None if it has been overwritten
+    def get_frame(self, ref):
+        if not self.is_current(ref):
+            return None
+        view = self.frames[ref.slot]
+        view.flags.writeable = False
+        return view
+
+    # returns a zero-copy view of the referenced raw frame, or None if absent or overwritten
+    def get_raw(self, ref):
+        if ((self.raws is None) or (not self.is_current(ref))):
+            return None
+        view = self.raws[ref.slot]
+        view.flags.writeable = False
+        return view
+
+    # returns the referenced frame as a PIL image (mode 'L' or 'RGB'), or None if it has been overwritten
+    # copy=False wraps the slot without copying; the image is then only valid while is_current(ref)
+    def get_image(self, ref, copy=False):
+        frame = self.get_frame(ref)
+        if frame is None:
+            return None
+        if copy:
+            frame = frame.copy()
+            if not self.is_current(ref):
+                return None
+        mode = 'L' if (frame.ndim == 2) else 'RGB'
+        return PIL.Image.frombuffer(mode, (frame.shape[1], frame.shape[0]), frame, 'raw', mode, 0, 1)
+
+    def close(self):
+        self.head = None
+        self.generations = None
+        self.seqs = None
+        self.timestamps = None
+        self.frames = None
+        self.raws = None
+        self.shm.close()
+        if (self.owner_pid == os.getpid()):
+            self.shm.unlink()
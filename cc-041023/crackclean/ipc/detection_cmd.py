@@ -9,9 +9,12 @@ class DetectionCmd(OpObj):
 
     @unique
     class Token(Enum):
-        TERMINATE = 0
-        IS_READY  = 1
-        DETECT    = 2
+        TERMINATE    = 0
+        IS_READY     = 1
+        DETECT       = 2
+        START_STREAM = 3
+        SET_PARAMS   = 4
+        STOP_STREAM  = 5
 
     def __init__(self, token, params):
         super().__init__(token, params)
@@ -0,0 +1,15 @@
+# coding=utf-8
+
+from enum import Enum, unique
+
+from .op_obj import OpObj
+
+
+class DetectionEvent(OpObj):
+
+    @unique
+    class Token(Enum):
+        RESULT = 0
+
+    def __init__(self, token, params):
+        super().__init__(token, params)
@@ -1,18 +1,30 @@
 # coding=utf-8
 
 from abc import ABC, abstractmethod
+import multiprocessing.connection
 import queue
 import time
 
 from ..const import Const
+from .pipe_channel import PipeChannel
+from .send_policy import SendPolicy
+from .send_stats import SendStats
 
 
 class Endpoint(ABC):
 
+    # send_policy: SendPolicy applied when txq is full; send_deadline_s is the BLOCK_DEADLINE wait
+    # (default ENDPOINT_SEND_DEADLINE_S)
     @abstractmethod
-    def __init__(self, txq, rxq):
+    def __init__(self, txq, rxq, send_policy=SendPolicy.BLOCK, send_deadline_s=None):
         self.txq = txq
         self.rxq = rxq
+        self.send_policy = send_policy
+        self.send_deadline_s = Const.ENDPOINT_SEND_DEADLINE_S if (send_deadline_s is None) else send_deadline_s
+        self.num_tx_sent = 0
+        self.num_tx_dropped = 0
+        self.num_tx_rejected = 0
+        self.num_tx_timed_out = 0
 
     @staticmethod
     def shutdown_queue(q):
@@ -25,3 +37,54 @@ class Endpoint(ABC):
         q.close()
         q.join_thread()
 
+    # puts comm_obj on txq according to send_policy
+    # returns True if it was queued, False if it was rejected or timed out
+    def put_tx(self, comm_obj):
+        if (self.send_policy == SendPolicy.BLOCK):
+            self.txq.put(block=True, timeout=None, obj=comm_obj)
+        elif (self.send_policy == SendPolicy.BLOCK_DEADLINE):
+            try:
+                self.txq.put(block=True, timeout=self.send_deadline_s, obj=comm_obj)
+            except queue.Full:
+                self.num_tx_timed_out += 1
+                return False
+        elif (self.send_policy == SendPolicy.REJECT_NEW):
+            try:
+                self.txq.put(block=False, obj=comm_obj)
+            except queue.Full:
+                self.num_tx_rejected += 1
+                return False
+        else:	# (DROP_OLDEST)
+            block = False
+            while True:
+                try:
+                    self.txq.put(block=block, timeout=Const.ENDPOINT_DROP_RETRY_S, obj=comm_obj)
+                    break
+                except queue.Full:
+                    pass
+                # take back the oldest message; if the consumer got there first (or a queued message is
+                # still in flight to the pipe) there is nothing to take, so wait briefly for room instead
+                try:
+                    self.txq.get(block=False)
+                    self.num_tx_dropped += 1
+                    block = False
+                except queue.Empty:
+                    block = True
+        self.num_tx_sent += 1
+        return True
+
+    def get_send_stats(self):
+        return SendStats(self.send_policy, self.num_tx_sent, self.num_tx_dropped, self.num_tx_rejected, self.num_tx_timed_out)
+
+    # returns the object that becomes readable when rxq has data, for use with wait_any()
+    # (relies on multiprocessing.Queue's internal reader Connection)
+    def rx_waitable(self):
+        if isinstance(self.rxq, PipeChannel):
+            return self.rxq.reader
+        return self.rxq._reader
+
+    # blocks until at least one of the endpoints' rx queues has data or timeout_s elapses
+    # returns the list of ready waitables (empty on timeout)
+    @staticmethod
+    def wait_any(endpoints, timeout_s):
+        return multiprocessing.connection.wait([ep.rx_waitable() for ep in endpoints], timeout_s)
@@ -1,29 +1,25 @@
 # coding=utf-8
 
-import queue
-import time
-
 from .comm_obj import CommObj
 from ..const import Const
+from ..exceptions import ContractViolation
 from .endpoint import Endpoint
 
 
 class EventProducerEndpoint(Endpoint):
 
-    def __init__(self, txq):
-        super().__init__(txq, None)
+    # send_policy: see Endpoint (default SEND_POLICY_EVENT)
+    def __init__(self, txq, send_policy=None, send_deadline_s=None):
+        super().__init__(txq, None, (Const.SEND_POLICY_EVENT if (send_policy is None) else send_policy), send_deadline_s)
         self.next_op_id = 0
 
+    # returns False if the event could not be queued under send_policy
     def send_event(self, op_obj):
         if op_obj is None:
             raise ContractViolation('invalid argument: op_obj')
         op_id = self.reserve_op_id()
         comm_obj = CommObj(op_id, op_obj)
-        try:
-            self.txq.put(block=True, timeout=Const.QUEUE_TIMEOUT_S, obj=comm_obj)
-        except queue.Full:
-            return False
-        return True
+        return self.put_tx(comm_obj)
 
     def reserve_op_id(self):
         op_id = self.next_op_id
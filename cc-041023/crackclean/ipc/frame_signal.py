@@ -0,0 +1,38 @@
+# coding=utf-8
+
+import os
+
+
+# one-way "new frame" wakeup over a raw multiprocessing.Pipe, so that a FrameRing consumer can sleep until
+# the producer writes a frame instead of polling the ring
+#
+# notify() writes a byte without blocking; if the pipe is full a wakeup is already pending, so nothing is
+# lost (wakeups coalesce).  the consumer waits on reader (with multiprocessing.connection.wait, alongside
+# its command queue) and calls clear() before checking FrameRing.latest(), so that a frame written after the
+# check wakes it again.  the Connections are never used for messages, only for their file descriptors
+#
+# picklable (as its Connections are); only one process should notify and one should wait
+class FrameSignal(object):
+
+    def __init__(self, context):
+        (self.reader, self.writer) = context.Pipe(duplex=False)
+        # the flag belongs to the shared open file, so it carries over to the other processes
+        os.set_blocking(self.reader.fileno(), False)
+        os.set_blocking(self.writer.fileno(), False)
+
+    def notify(self):
+        try:
+            os.write(self.writer.fileno(), b'\x00')
+        except BlockingIOError:
+            pass
+
+    def clear(self):
+        try:
+            while os.read(self.reader.fileno(), 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
@@ -1,70 +1,255 @@
 # coding=utf-8
 
+import asyncio
+import concurrent.futures
 import queue
+import threading
 import time
 
 from ..const import Const
+from ..exceptions import ContractViolation
 from .comm_obj import CommObj
 from .endpoint import Endpoint
+from .master_endpoint_stats import MasterEndpointStats
 
 
 class MasterEndpoint(Endpoint):
 
-    def __init__(self, txq, rxq):
-        super().__init__(txq, rxq)
+    # every sent op is tracked until its response is claimed, it is abandoned, or its deadline passes (see
+    # is_pending(); a polling caller must resend or give up on an op that expired):
+    #   pending_ops: op_id -> (ts_sent, deadline, token)   sent, no response yet
+    #   resp_cache:  op_id -> (deadline, op_obj)           response received while waiting for another op
+    #   futures:     op_id -> Future                       pending ops sent with send_cmd_future()
+    # both tables together hold at most MASTER_ENDPOINT_MAX_OPS entries (oldest evicted first); responses
+    # to ops that are no longer tracked are dropped (counted as late)
+    #
+    # the first send_cmd_future() starts a receiver thread that reads rxq and completes futures; the
+    # polling calls (check_for_resp, send_cmd_sync) keep working alongside it.  the tables are guarded by
+    # self.lock, which is notified whenever a response is filed
+    #
+    # a command that cannot be queued under send_policy (default SEND_POLICY_CMD) is not tracked:
+    # send_cmd_async() returns None, send_cmd_sync() returns None and send_cmd_future() fails with queue.Full
+    def __init__(self, txq, rxq, send_policy=None, send_deadline_s=None):
+        super().__init__(txq, rxq, (Const.SEND_POLICY_CMD if (send_policy is None) else send_policy), send_deadline_s)
+        self.pending_ops = {}
         self.resp_cache = {}
+        self.futures = {}
+        self.lock = threading.Condition()
+        self.receiver = None
+        self.receiver_stop = False
         self.next_op_id = 0
+        self.next_expiry_check = 0
+        self.num_sent = 0
+        self.num_received = 0
+        self.num_expired = 0
+        self.num_evicted = 0
+        self.num_late = 0
 
     # TODO: refactor
     #def get_resp(self, op_id, block):
     def check_for_resp(self, op_id):
-        resp = self.resp_cache.pop(op_id, None)
-        if resp is not None:
-            return resp
+        with self.lock:
+            self.expire_ops()
+            entry = self.resp_cache.pop(op_id, None)
+            if entry is not None:
+                return entry[1]
+            if ((op_id not in self.pending_ops) or (self.receiver is not None)):
+                return None		# not awaiting a response, or the receiver thread will file it
         while True:
             try:
                 comm_obj = self.rxq.get(block=False)
-                if (comm_obj.op_id == op_id):
-                    return comm_obj.op_obj
-                self.resp_cache[comm_obj.op_id] = comm_obj.op_obj
             except queue.Empty:
                 break
+            resp = self.__accept_resp(comm_obj, op_id)
+            if resp is not None:
+                return resp
         return None
 
+    # True while op_id is tracked: until its response is claimed, or it is abandoned, expires or is evicted.
+    # once check_for_resp() returns None for an op that is no longer pending, no response will be returned
+    def is_pending(self, op_id):
+        with self.lock:
+            return ((op_id in self.pending_ops) or (op_id in self.resp_cache))
+
     def reserve_op_id(self):
-        op_id = self.next_op_id
-        self.next_op_id += 1
+        with self.lock:
+            op_id = self.next_op_id
+            self.next_op_id += 1
         return op_id
 
-    # TODO: don't block on put; should have short/zero timeout
-    def send_cmd_async(self, op_obj):
-        if op_obj is None:
-            raise ContractViolation('invalid argument: op_obj')
-        op_id = self.reserve_op_id()
-        comm_obj = CommObj(op_id, op_obj)
-        self.txq.put(block=True, timeout=None, obj=comm_obj)
-        return op_id
+    # timeout_s: how long the op is tracked before it expires (default MASTER_ENDPOINT_OP_TTL_S)
+    # returns the op_id, or None if the command could not be queued
+    def send_cmd_async(self, op_obj, timeout_s=None):
+        return self.__send_cmd(op_obj, timeout_s, None)
 
     # TODO: change the send semantics to be similar to the getresp ones
     def send_cmd_sync(self, op_obj, timeout_ms):
         ts = time.monotonic()
-        op_id = self.send_cmd_async(op_obj)
+        op_id = self.send_cmd_async(op_obj, (timeout_ms / 1000))
+        if op_id is None:
+            return None
         resp = self.__get_resp_timeout(op_id, timeout_ms)
         dur_ms = (time.monotonic() - ts) * 1000
         if ((resp is not None) and (dur_ms > Const.CMD_SYNC_WARN_MS)):
             print('warning: send_cmd_sync resp to ' + str(type(op_obj)) + '.' + str(op_obj.token) + ' took ' + str(dur_ms) + ' ms')
         return resp
 
-    def __get_resp_timeout(self, op_id, timeout_ms):
-        resp = self.resp_cache.pop(op_id, None)
-        if resp is not None:
-            return resp
-        while True:
-            try:
-                comm_obj = self.rxq.get(block=True, timeout=(timeout_ms / 1000))
+    # returns a concurrent.futures.Future that the receiver thread completes with the response op_obj, or
+    # fails with concurrent.futures.TimeoutError if none arrives within timeout_s (default
+    # MASTER_ENDPOINT_OP_TTL_S); cancelling the future abandons the op
+    def send_cmd_future(self, op_obj, timeout_s=None):
+        self.start_receiver()
+        fut = concurrent.futures.Future()
+        if (self.__send_cmd(op_obj, timeout_s, fut) is None):
+            fut.set_exception(queue.Full('could not queue ' + str(op_obj.token) + ' (' + str(self.send_policy) + ')'))
+        return fut
+
+    # asyncio variant of send_cmd_future(); await it from a running event loop
+    async def send_cmd_asyncio(self, op_obj, timeout_s=None):
+        return await asyncio.wrap_future(self.send_cmd_future(op_obj, timeout_s))
+
+    def start_receiver(self):
+        with self.lock:
+            if self.receiver is not None:
+                return
+            self.receiver_stop = False
+            self.receiver = threading.Thread(target=self.__receive_loop, name='MasterEndpoint receiver', daemon=True)
+            self.receiver.start()
+
+    # stops the receiver thread (if running); pending futures stay pending until polled out by
+    # check_for_resp()/send_cmd_sync() or abandoned
+    def stop_receiver(self):
+        with self.lock:
+            receiver = self.receiver
+            self.receiver_stop = True
+        if receiver is not None:
+            receiver.join()
+            with self.lock:
+                self.receiver = None
+
+    # stop tracking op_id; a response arriving later is dropped
+    def abandon(self, op_id):
+        with self.lock:
+            self.pending_ops.pop(op_id, None)
+            self.resp_cache.pop(op_id, None)
+            fut = self.futures.pop(op_id, None)
+        if ((fut is not None) and fut.set_running_or_notify_cancel()):
+            fut.set_exception(concurrent.futures.CancelledError('op ' + str(op_id) + ' abandoned'))
+
+    # drop ops whose deadline has passed (checked at most every MASTER_ENDPOINT_EXPIRY_CHECK_S)
+    def expire_ops(self):
+        with self.lock:
+            now = time.monotonic()
+            if (now < self.next_expiry_check):
+                return
+            self.next_expiry_check = now + Const.MASTER_ENDPOINT_EXPIRY_CHECK_S
+            expired = [op_id for (op_id, (ts_sent, deadline, token)) in self.pending_ops.items() if (deadline <= now)]
+            for op_id in expired:
+                (ts_sent, deadline, token) = self.pending_ops.pop(op_id)
+                self.num_expired += 1
+                fut = self.futures.pop(op_id, None)
+                if fut is None:
+                    print('warning: MasterEndpoint op ' + str(op_id) + ' (' + str(token) + ') expired without a response after ' + str(int((now - ts_sent) * 1000)) + ' ms')
+                elif fut.set_running_or_notify_cancel():
+                    fut.set_exception(concurrent.futures.TimeoutError('no response to ' + str(token) + ' after ' + str(int((now - ts_sent) * 1000)) + ' ms'))
+            expired = [op_id for (op_id, (deadline, op_obj)) in self.resp_cache.items() if (deadline <= now)]
+            for op_id in expired:
+                del self.resp_cache[op_id]
+                self.num_expired += 1
+
+    def get_stats(self):
+        with self.lock:
+            now = time.monotonic()
+            oldest_ms = 0
+            if self.pending_ops:
+                oldest_ms = (now - min(ts_sent for (ts_sent, deadline, token) in self.pending_ops.values())) * 1000
+            return MasterEndpointStats(self.num_sent, self.num_received, len(self.pending_ops), len(self.resp_cache), oldest_ms,
+                self.num_expired, self.num_evicted, self.num_late)
+
+    def __send_cmd(self, op_obj, timeout_s, fut):
+        if op_obj is None:
+            raise ContractViolation('invalid argument: op_obj')
+        if timeout_s is None:
+            timeout_s = Const.MASTER_ENDPOINT_OP_TTL_S
+        op_id = self.reserve_op_id()
+        comm_obj = CommObj(op_id, op_obj)
+        self.__track_op(op_id, op_obj.token, timeout_s, fut)
+        try:
+            sent = self.put_tx(comm_obj)
+        except BaseException:
+            self.abandon(op_id)
+            raise
+        with self.lock:
+            if not sent:
+                self.pending_ops.pop(op_id, None)
+                self.futures.pop(op_id, None)
+                return None
+            self.num_sent += 1
+        return op_id
+
+    def __track_op(self, op_id, token, timeout_s, fut):
+        with self.lock:
+            while ((len(self.pending_ops) + len(self.resp_cache)) >= Const.MASTER_ENDPOINT_MAX_OPS):
+                # op ids increase monotonically, so the smallest tracked id is the oldest op.  pending_ops is
+                # in send order, but resp_cache is in arrival order, so both are scanned
+                oldest = min(min(tbl) for tbl in (self.pending_ops, self.resp_cache) if tbl)
+                self.abandon(oldest)
+                self.num_evicted += 1
+            ts = time.monotonic()
+            self.pending_ops[op_id] = (ts, (ts + timeout_s), token)
+            if fut is not None:
+                self.futures[op_id] = fut
+        if fut is not None:
+            fut.add_done_callback(lambda f: self.abandon(op_id) if f.cancelled() else None)
+
+    # files a received response: completes its future, or returns its op_obj if it is the response to
+    # op_id, else caches it (or drops it if its op is no longer tracked) and returns None
+    def __accept_resp(self, comm_obj, op_id):
+        with self.lock:
+            self.num_received += 1
+            entry = self.pending_ops.pop(comm_obj.op_id, None)
+            if entry is None:
+                self.num_late += 1
+                return None
+            fut = self.futures.pop(comm_obj.op_id, None)
+            if fut is None:
                 if (comm_obj.op_id == op_id):
                     return comm_obj.op_obj
-                self.resp_cache[comm_obj.op_id] = comm_obj.op_obj
+                self.resp_cache[comm_obj.op_id] = (entry[1], comm_obj.op_obj)
+            self.lock.notify_all()
+        if ((fut is not None) and fut.set_running_or_notify_cancel()):
+            fut.set_result(comm_obj.op_obj)
+        return None
+
+    def __receive_loop(self):
+        while not self.receiver_stop:
+            try:
+                comm_obj = self.rxq.get(block=True, timeout=Const.MASTER_ENDPOINT_RECEIVER_POLL_S)
+                self.__accept_resp(comm_obj, None)
             except queue.Empty:
-                return None
+                pass
+            self.expire_ops()
 
+    def __get_resp_timeout(self, op_id, timeout_ms):
+        deadline = time.monotonic() + (timeout_ms / 1000)
+        while True:
+            with self.lock:
+                entry = self.resp_cache.pop(op_id, None)
+                if entry is not None:
+                    return entry[1]
+                remaining = deadline - time.monotonic()
+                if (remaining <= 0):
+                    break
+                if self.receiver is not None:
+                    self.lock.wait(remaining)
+                    continue
+            try:
+                # bounded so that a receiver thread started meanwhile is noticed
+                comm_obj = self.rxq.get(block=True, timeout=min(remaining, Const.MASTER_ENDPOINT_RECEIVER_POLL_S))
+            except queue.Empty:
+                continue
+            resp = self.__accept_resp(comm_obj, op_id)
+            if resp is not None:
+                return resp
+        self.abandon(op_id)
+        return None
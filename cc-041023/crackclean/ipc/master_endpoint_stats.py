@@ -0,0 +1,19 @@
+# coding=utf-8
+
+
+class MasterEndpointStats(object):
+
+    def __init__(self, sent, received, in_flight, cached, oldest_in_flight_ms, expired, evicted, late):
+        self.sent = sent				# commands sent
+        self.received = received			# responses received (including late ones)
+        self.in_flight = in_flight			# sent, no response yet
+        self.cached = cached				# response received, not yet claimed
+        self.oldest_in_flight_ms = oldest_in_flight_ms	# age of the oldest in-flight op (0 if none)
+        self.expired = expired				# ops dropped at their deadline (in flight or unclaimed)
+        self.evicted = evicted				# ops dropped to keep the table within its bound
+        self.late = late				# responses to ops that were abandoned/expired/evicted
+
+    def __str__(self):
+        return ('sent ' + str(self.sent) + ', received ' + str(self.received) + ', in flight ' + str(self.in_flight) +
+            ' (oldest ' + '{:.1f}'.format(self.oldest_in_flight_ms) + ' ms), cached ' + str(self.cached) +
+            ', expired ' + str(self.expired) + ', evicted ' + str(self.evicted) + ', late ' + str(self.late))
@@ -0,0 +1,58 @@
+# coding=utf-8
+
+import queue
+
+from .wire_codec import WireCodec
+
+
+# one-way channel over a raw multiprocessing.Pipe that carries WireCodec-encoded CommObjs
+#
+# a drop-in for the multiprocessing.Queue subset the endpoints use (put/get/close/join_thread), but
+# without the feeder thread and per-message pickling of Queue: put() encodes and writes the bytes
+# straight into the pipe, so a hot-path message costs one struct pack and one write.  like Queue, at most
+# maxsize messages are outstanding; put() waits for room (or raises queue.Full per block/timeout).
+#
+# only one process should write and one should read, except while draining in Endpoint.shutdown_queue()
+# or dropping the oldest message (SendPolicy.DROP_OLDEST); reads and writes are serialized with locks (as
+# with Queue) so that both are safe
+class PipeChannel(object):
+
+    def __init__(self, context, maxsize):
+        (self.reader, self.writer) = context.Pipe(duplex=False)
+        self.rlock = context.Lock()
+        self.wlock = context.Lock()
+        self.slots = context.BoundedSemaphore(maxsize)
+
+    def put(self, obj, block=True, timeout=None):
+        if not self.slots.acquire(block, timeout):
+            raise queue.Full
+        try:
+            buf = WireCodec.encode(obj)
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.wlock:
+            self.writer.send_bytes(buf)
+
+    # raises queue.Empty if nothing arrives (immediately if block is False, else within timeout)
+    def get(self, block=True, timeout=None):
+        if not block:
+            timeout = 0
+        if not self.rlock.acquire(block, timeout):
+            raise queue.Empty
+        try:
+            if ((timeout is not None) and (not self.reader.poll(timeout))):
+                raise queue.Empty
+            buf = self.reader.recv_bytes()
+        finally:
+            self.rlock.release()
+        self.slots.release()
+        return WireCodec.decode(buf)
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+    # for Queue compatibility: there is no feeder thread to join
+    def join_thread(self):
+        pass
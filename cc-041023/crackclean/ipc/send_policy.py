@@ -0,0 +1,15 @@
+# coding=utf-8
+
+from enum import Enum, unique
+
+
+# what an endpoint does when the queue it sends on is full
+@unique
+class SendPolicy(Enum):
+    BLOCK          = 0	# wait indefinitely
+    BLOCK_DEADLINE = 1	# wait up to the endpoint's send deadline, then give up (counted as timed out)
+    REJECT_NEW     = 2	# don't wait; give up on the new message (counted as rejected)
+    DROP_OLDEST    = 3	# discard the oldest queued message(s) to make room (counted as dropped)
+
+    def __str__(self):
+        return self.name
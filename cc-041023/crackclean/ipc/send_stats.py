@@ -0,0 +1,15 @@
+# coding=utf-8
+
+
+class SendStats(object):
+
+    def __init__(self, policy, sent, dropped, rejected, timed_out):
+        self.policy = policy
+        self.sent = sent			# messages put on the queue
+        self.dropped = dropped			# queued messages discarded to make room (DROP_OLDEST)
+        self.rejected = rejected		# messages not sent because the queue was full (REJECT_NEW)
+        self.timed_out = timed_out		# messages not sent within the deadline (BLOCK_DEADLINE)
+
+    def __str__(self):
+        return (str(self.policy) + ': sent ' + str(self.sent) + ', dropped ' + str(self.dropped) +
+            ', rejected ' + str(self.rejected) + ', timed out ' + str(self.timed_out))
@@ -2,26 +2,29 @@
 
 import queue
 
+from ..const import Const
+from ..exceptions import ContractViolation
 from .comm_obj import CommObj
 from .endpoint import Endpoint
 
 
 class SlaveEndpoint(Endpoint):
 
-    def __init__(self, txq, rxq):
-        super().__init__(txq, rxq)
+    # send_policy: see Endpoint (default SEND_POLICY_RESP)
+    def __init__(self, txq, rxq, send_policy=None, send_deadline_s=None):
+        super().__init__(txq, rxq, (Const.SEND_POLICY_RESP if (send_policy is None) else send_policy), send_deadline_s)
 
-    # TODO: don't block on put; should have short/zero timeout
+    # returns False if the response could not be queued under send_policy (the master's op then expires)
     def send_resp(self, op_id, op_obj):
         if op_obj is None:
             raise ContractViolation('invalid argument: op_obj')
         comm_obj = CommObj(op_id, op_obj)
-        self.txq.put(block=True, timeout=None, obj=comm_obj)
+        return self.put_tx(comm_obj)
 
-    # returns (op_id, op_obj) or None if empty (when block is False)
-    def get_cmd(self, block):
+    # returns (op_id, op_obj) or None if empty (when block is False, or after timeout_s when given)
+    def get_cmd(self, block, timeout_s=None):
         try:
-            comm_obj = self.rxq.get(block=block, timeout=None)
+            comm_obj = self.rxq.get(block=block, timeout=timeout_s)
             return (comm_obj.op_id, comm_obj.op_obj)
         except queue.Empty:
             return None
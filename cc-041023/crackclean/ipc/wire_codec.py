@@ -0,0 +1,174 @@
+# coding=utf-8
+
+import math
+import pickle
+import struct
+
+from ..detection_result import DetectionResult
+from ..filter_mode import FilterMode
+from ..frame_ref import FrameRef
+from .actuator_cmd import ActuatorCmd
+from .actuator_resp import ActuatorResp
+from .comm_obj import CommObj
+from .detection_cmd import DetectionCmd
+from .detection_resp import DetectionResp
+from .video_cmd import VideoCmd
+from .video_resp import VideoResp
+
+
+# compact fixed-layout encoding of CommObjs for PipeChannel
+#
+# a message is a HEADER (wire class id, token value, op_id) followed by the token's params packed with a
+# fixed struct layout.  only the op_obj classes and params on the hot per-frame path have a layout;
+# anything else (other classes, unexpected param types, PIL images) is pickled behind a zero class id.
+#
+# float params accept ints and decode as floats; int params must be ints (anything else is pickled so
+# that it round-trips unchanged)
+class WireCodec(object):
+
+    CLASS_ID_PICKLE = 0
+    # index is the wire class id
+    CLASSES = (None, ActuatorCmd, ActuatorResp, VideoCmd, VideoResp, DetectionCmd, DetectionResp)
+
+    HEADER = struct.Struct('<BBq')		# class id, token value, op_id
+    FLOAT = struct.Struct('<d')
+    FRAME_REF = struct.Struct('<IQd')		# slot, generation, timestamp
+    DETECT_PARAMS = struct.Struct('<dqdqB?')	# detect/simpfilter/adaptfilter thresh, radius, filter mode, overlay
+    DETECT = struct.Struct('<IQddqdqB?')	# FRAME_REF + DETECT_PARAMS
+    RESULT = struct.Struct('<BdIQd')		# flags (RESULT_HAS_*), y_mm, FRAME_REF
+
+    RESULT_HAS_Y_MM = 0x01
+    RESULT_HAS_IMG = 0x02
+
+    LAYOUT_EMPTY = 0
+    LAYOUT_FLOAT = 1
+    LAYOUT_FRAME_REF = 2
+    LAYOUT_DETECT = 3
+    LAYOUT_DETECT_PARAMS = 4
+    LAYOUT_RESULT = 5
+
+    # tokens not listed carry empty params
+    LAYOUTS = {
+        ActuatorCmd.Token.SET_TARGET_MM: LAYOUT_FLOAT,
+        ActuatorResp.Token.TARGET_VALUE: LAYOUT_FLOAT,
+        VideoResp.Token.LATEST_IMG: LAYOUT_FRAME_REF,
+        DetectionCmd.Token.DETECT: LAYOUT_DETECT,
+        DetectionCmd.Token.START_STREAM: LAYOUT_DETECT_PARAMS,
+        DetectionCmd.Token.SET_PARAMS: LAYOUT_DETECT_PARAMS,
+        DetectionResp.Token.DETECTION_RESULT: LAYOUT_RESULT,
+    }
+
+    @staticmethod
+    def encode(comm_obj):
+        op_obj = comm_obj.op_obj
+        class_id = WireCodec.class_id(op_obj)
+        if (class_id != WireCodec.CLASS_ID_PICKLE):
+            layout = WireCodec.LAYOUTS.get(op_obj.token, WireCodec.LAYOUT_EMPTY)
+            try:
+                body = WireCodec.encode_params(layout, op_obj.params)
+            except struct.error:
+                body = None
+            if body is not None:
+                return WireCodec.HEADER.pack(class_id, op_obj.token.value, comm_obj.op_id) + body
+        return bytes((WireCodec.CLASS_ID_PICKLE,)) + pickle.dumps(comm_obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def decode(buf):
+        class_id = buf[0]
+        if (class_id == WireCodec.CLASS_ID_PICKLE):
+            return pickle.loads(memoryview(buf)[1:])
+        (class_id, token_value, op_id) = WireCodec.HEADER.unpack_from(buf, 0)
+        cls = WireCodec.CLASSES[class_id]
+        token = cls.Token(token_value)
+        layout = WireCodec.LAYOUTS.get(token, WireCodec.LAYOUT_EMPTY)
+        params = WireCodec.decode_params(layout, buf, WireCodec.HEADER.size)
+        return CommObj(op_id, cls(token, params))
+
+    # returns the wire class id of op_obj, or CLASS_ID_PICKLE if it has no fixed layout
+    @staticmethod
+    def class_id(op_obj):
+        cls = type(op_obj)
+        for i in range(1, len(WireCodec.CLASSES)):
+            if (WireCodec.CLASSES[i] is cls):
+                return i
+        return WireCodec.CLASS_ID_PICKLE
+
+    # returns the packed params, or None if they don't fit layout
+    @staticmethod
+    def encode_params(layout, params):
+        if (type(params) is not tuple):
+            return None
+        if (layout == WireCodec.LAYOUT_EMPTY):
+            return b'' if (len(params) == 0) else None
+        if (layout == WireCodec.LAYOUT_FLOAT):
+            if ((len(params) != 1) or (not WireCodec.is_float(params[0]))):
+                return None
+            return WireCodec.FLOAT.pack(params[0])
+        if (layout == WireCodec.LAYOUT_FRAME_REF):
+            if ((len(params) != 1) or (not WireCodec.is_frame_ref(params[0]))):
+                return None
+            ref = params[0]
+            return WireCodec.FRAME_REF.pack(ref.slot, ref.generation, ref.timestamp)
+        if (layout == WireCodec.LAYOUT_DETECT):
+            if ((len(params) != 7) or (not WireCodec.is_frame_ref(params[0])) or (not WireCodec.is_detect_params(params[1:]))):
+                return None
+            ref = params[0]
+            return WireCodec.DETECT.pack(ref.slot, ref.generation, ref.timestamp, params[1], params[2], params[3], params[4], params[5].value, params[6])
+        if (layout == WireCodec.LAYOUT_DETECT_PARAMS):
+            if not WireCodec.is_detect_params(params):
+                return None
+            return WireCodec.DETECT_PARAMS.pack(params[0], params[1], params[2], params[3], params[4].value, params[5])
+        if (layout == WireCodec.LAYOUT_RESULT):
+            if ((len(params) != 1) or (type(params[0]) is not DetectionResult)):
+                return None
+            result = params[0]
+            flags = 0
+            y_mm = math.nan
+            (slot, generation, timestamp) = (0, 0, 0.0)
+            if result.y_mm is not None:
+                if not WireCodec.is_float(result.y_mm):
+                    return None
+                flags |= WireCodec.RESULT_HAS_Y_MM
+                y_mm = result.y_mm
+            if result.img is not None:
+                if not WireCodec.is_frame_ref(result.img):
+                    return None
+                flags |= WireCodec.RESULT_HAS_IMG
+                (slot, generation, timestamp) = (result.img.slot, result.img.generation, result.img.timestamp)
+            return WireCodec.RESULT.pack(flags, y_mm, slot, generation, timestamp)
+        return None
+
+    @staticmethod
+    def decode_params(layout, buf, offset):
+        if (layout == WireCodec.LAYOUT_EMPTY):
+            return ()
+        if (layout == WireCodec.LAYOUT_FLOAT):
+            return WireCodec.FLOAT.unpack_from(buf, offset)
+        if (layout == WireCodec.LAYOUT_FRAME_REF):
+            return (FrameRef(*WireCodec.FRAME_REF.unpack_from(buf, offset)),)
+        if (layout == WireCodec.LAYOUT_DETECT):
+            v = WireCodec.DETECT.unpack_from(buf, offset)
+            return (FrameRef(v[0], v[1], v[2]), v[3], v[4], v[5], v[6], FilterMode(v[7]), v[8])
+        if (layout == WireCodec.LAYOUT_DETECT_PARAMS):
+            v = WireCodec.DETECT_PARAMS.unpack_from(buf, offset)
+            return (v[0], v[1], v[2], v[3], FilterMode(v[4]), v[5])
+        if (layout == WireCodec.LAYOUT_RESULT):
+            (flags, y_mm, slot, generation, timestamp) = WireCodec.RESULT.unpack_from(buf, offset)
+            y_mm = y_mm if (flags & WireCodec.RESULT_HAS_Y_MM) else None
+            img = FrameRef(slot, generation, timestamp) if (flags & WireCodec.RESULT_HAS_IMG) else None
+            return (DetectionResult(y_mm, img),)
+        raise ValueError('unknown wire layout: ' + str(layout))
+
+    @staticmethod
+    def is_float(val):
+        return (type(val) in (float, int))
+
+    @staticmethod
+    def is_frame_ref(val):
+        return ((type(val) is FrameRef) and (type(val.slot) is int) and (type(val.generation) is int) and WireCodec.is_float(val.timestamp))
+
+    # (detect_thresh, simpfilter_thresh, adaptfilter_thresh, adaptfilter_radius, filter_mode, overlay)
+    @staticmethod
+    def is_detect_params(params):
+        return ((len(params) == 6) and WireCodec.is_float(params[0]) and (type(params[1]) is int) and WireCodec.is_float(params[2])
+            and (type(params[3]) is int) and isinstance(params[4], FilterMode) and (type(params[5]) is bool))
@@ -2,6 +2,7 @@
 
 import errno
 import os
+import struct
 import time
 
 from .const import Const
@@ -27,6 +28,7 @@ class Joystick(object):
     VAL_AXIS_MAXABS = 32767
 
     PACKET_SIZE = 8
+    PACKET_STRUCT = struct.Struct('<IhBB')	# struct js_event: time (ms), value, type, number
 
     class AxisEvent(object):
         def __init__(self, time_val, axis_num, val_norm):
@@ -60,12 +62,35 @@ class Joystick(object):
         del self.btns
         del self.axes
 
+    # the device fd, for waiting on with select/selectors (readable when check_for_events() has work)
+    def fileno(self):
+        return self.fd
+
     def check_for_event(self):
         buf = self.__check_for_packet()
         if buf is not None:
             return self.process_cooked(buf)		# TEMP
         return None
 
+    # reads every packet currently available (up to JOYSTICK_MAX_PACKETS_PER_READ per os.read) and returns
+    # the list of resulting events (possibly empty)
+    def check_for_events(self):
+        events = []
+        read_size = Joystick.PACKET_SIZE * Const.JOYSTICK_MAX_PACKETS_PER_READ
+        while True:
+            data = self.__read(read_size)
+            if data is None:
+                break
+            if ((len(data) % Joystick.PACKET_SIZE) != 0):
+                raise JoystickException('read incomplete packet')
+            for (ev_time, ev_val, ev_typeval, ev_num) in Joystick.PACKET_STRUCT.iter_unpack(data):
+                event = self.process_event(ev_time, ev_val, ev_typeval, ev_num)
+                if event is not None:
+                    events.append(event)
+            if (len(data) < read_size):
+                break
+        return events
+
     @staticmethod
     def __closedev(fd):
         try:
@@ -90,15 +115,24 @@ class Joystick(object):
 
     # returns None or packet
     def __check_for_packet(self):
+        data = self.__read(Joystick.PACKET_SIZE)
+        if data is None:
+            return None
+        num = len(data)
+        if (num != Joystick.PACKET_SIZE):
+            raise JoystickException('read incomplete packet')
+        return data
+
+    # returns None if no data is available, else up to size bytes
+    def __read(self, size):
         try:
-            data = os.read(self.fd, Joystick.PACKET_SIZE)
+            data = os.read(self.fd, size)
         except OSError as e:
             if not ((e.errno == errno.EAGAIN) or (e.errno == errno.EWOULDBLOCK)):
                 raise JoystickException('OSError: %s' % e)
             return None
-        num = len(data)
-        if (num != Joystick.PACKET_SIZE):
-            raise JoystickException('read incomplete packet')
+        if (len(data) == 0):
+            raise JoystickException('joystick device closed')
         return data
 
     # FIXME: still want this to be a separate func?
@@ -106,10 +140,10 @@ class Joystick(object):
     def process_cooked(self, data):
         if (len(data) != Joystick.PACKET_SIZE):
             raise ContractViolation('invalid argument: data')
-        ev_time = int.from_bytes(data[0:4], byteorder='little')
-        ev_val = int.from_bytes(data[4:6], byteorder='little', signed=True)
-        ev_typeval = data[6]
-        ev_num = data[7]
+        return self.process_event(*Joystick.PACKET_STRUCT.unpack(data))
+
+    # returns AxisEvent, ButtonEvent, or None (init events)
+    def process_event(self, ev_time, ev_val, ev_typeval, ev_num):
         is_init = ((ev_typeval & Joystick.JS_EVENT_INIT) != 0x00)
         ev_type = ev_typeval & ~(Joystick.JS_EVENT_INIT)
         if (ev_type == Joystick.JS_EVENT_BUTTON):
@@ -1,5 +1,6 @@
 # coding=utf-8
 
+import selectors
 import time
 
 from .const import Const
@@ -25,6 +26,7 @@ class JoystickController(Controller):
 
     def deinit(self):
         self.joystick.deinit()
+        print('JoystickController events: ' + str(self.ep_event_producer.get_send_stats()))
         # shutdown all queues that we write to
         Endpoint.shutdown_queue(self.endpoint.txq)
         Endpoint.shutdown_queue(self.ep_event_producer.txq)
@@ -32,28 +34,29 @@ class JoystickController(Controller):
         del self.joystick
         del self.ep_event_producer
 
+    # sleeps until the joystick fd or the command queue is readable (or JOYSTICK_CONTROLLER_MAX_WAIT_S
+    # passes), then drains both
     def start(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.joystick, selectors.EVENT_READ)
+        selector.register(self.endpoint.rx_waitable(), selectors.EVENT_READ)
+        try:
+            self.__run(selector)
+        finally:
+            selector.close()
+
+    def __run(self, selector):
         ignore_events = True
         ts_start = time.monotonic()
         while True:
-            event = self.joystick.check_for_event()
+            events = self.joystick.check_for_events()
             if ignore_events:
                 # ignore the initial flurry of non-init events that are occasionally emitted
                 # after the device is opened
                 if ((time.monotonic() - ts_start) >= Const.JOYSTICK_INITIAL_IGNORE_TIME_S):
                     ignore_events = False
             else:
-                if event is not None:
-                    if (isinstance(event, Joystick.AxisEvent)):
-                        if (event.axis_num == Const.JOYSTICK_AXIS_NUM):
-                            joystick_event = JoystickEvent(JoystickEvent.Token.POSITION, (event.val_norm,))
-                            self.ep_event_producer.send_event(joystick_event)
-                    elif (isinstance(event, Joystick.ButtonEvent)):
-                        if ((event.btn_num == Const.JOYSTICK_BUTTON_NUM) and (event.press)):
-                            joystick_event = JoystickEvent(JoystickEvent.Token.BUTTON_DOWN, ())
-                            self.ep_event_producer.send_event(joystick_event)
-                    else:
-                        raise JoystickException('JoystickController received unexpected event from Joystick')
+                self.send_events(events)
             # handle any incoming commands
             tup = self.endpoint.get_cmd(False)
             if tup is not None:
@@ -69,7 +72,31 @@ class JoystickController(Controller):
                 else:
                     self.endpoint.send_resp(cmd_op_id, JoystickResp(JoystickResp.Token.ERROR, ()))
                     raise JoystickException('JoystickController received unexpected JoystickCmd')
-            time.sleep(Const.JOYSTICK_CONTROLLER_LOOP_SLEEP_S)
+                continue	# there may be more commands queued
+            timeout_s = Const.JOYSTICK_CONTROLLER_MAX_WAIT_S
+            if ignore_events:
+                timeout_s = min(timeout_s, max(0, (ts_start + Const.JOYSTICK_INITIAL_IGNORE_TIME_S - time.monotonic())))
+            selector.select(timeout_s)
+
+    # forwards a batch of Joystick events, coalescing positions: only the newest position is sent, except
+    # that a pending position is sent ahead of each BUTTON_DOWN so that the two stay in order
+    def send_events(self, events):
+        val_norm = None
+        for event in events:
+            if (isinstance(event, Joystick.AxisEvent)):
+                if (event.axis_num == Const.JOYSTICK_AXIS_NUM):
+                    val_norm = event.val_norm
+            elif (isinstance(event, Joystick.ButtonEvent)):
+                if ((event.btn_num == Const.JOYSTICK_BUTTON_NUM) and (event.press)):
+                    if val_norm is not None:
+                        self.ep_event_producer.send_event(JoystickEvent(JoystickEvent.Token.POSITION, (val_norm,)))
+                        val_norm = None
+                    if not self.ep_event_producer.send_event(JoystickEvent(JoystickEvent.Token.BUTTON_DOWN, ())):
+                        print('Warning: JoystickController could not queue BUTTON_DOWN event')
+            else:
+                raise JoystickException('JoystickController received unexpected event from Joystick')
+        if val_norm is not None:
+            self.ep_event_producer.send_event(JoystickEvent(JoystickEvent.Token.POSITION, (val_norm,)))
 
     # for use in a ControllerProcess
     @staticmethod
@@ -2,10 +2,14 @@
 
 from enum import Enum, unique
 import serial
+import threading
+import time
 
 from .const import Const
 from .exceptions import ContractViolation
 from .exceptions import JrkG2Exception
+from .jrkg2_error_check import JrkG2ErrorCheck
+from .jrkg2_health import JrkG2Health
 
 
 class JrkG2(object):
@@ -16,6 +20,7 @@ class JrkG2(object):
 
     TARGET_MINVAL = 0x0000
     TARGET_MAXVAL = 0x0FFF
+    TARGET_RANGE = TARGET_MAXVAL - TARGET_MINVAL
 
     CMDBYTE_GET_AND_CLEAR_ERROR_FLAGS_HALTING  = 0xB3
     CMDBYTE_GET_AND_CLEAR_ERROR_FLAGS_OCCURRED = 0xB5
@@ -32,6 +37,14 @@ class JrkG2(object):
     VAR_OFFSET_ERROR_FLAGS_OCCURRED = 0x14
     VAR_LENGTH_ERROR_FLAGS_OCCURRED = 2
 
+    VARS_MAX_READ_LENGTH = 15		# GET_VARIABLES returns at most this many bytes per request
+
+    # health poll block reads: target and feedback, then both error flag variables
+    HEALTH_MOTION_VAR_OFFSET = VAR_OFFSET_TARGET
+    HEALTH_MOTION_VAR_LENGTH = (VAR_OFFSET_FEEDBACK + VAR_LENGTH_FEEDBACK) - VAR_OFFSET_TARGET
+    HEALTH_ERRORS_VAR_OFFSET = VAR_OFFSET_ERROR_FLAGS_HALTING
+    HEALTH_ERRORS_VAR_LENGTH = (VAR_OFFSET_ERROR_FLAGS_OCCURRED + VAR_LENGTH_ERROR_FLAGS_OCCURRED) - VAR_OFFSET_ERROR_FLAGS_HALTING
+
     @unique
     class ErrorFlag(Enum):
         AWAITING_COMMAND      = (0b0000000000000001, 'awaiting command')
@@ -53,9 +66,23 @@ class JrkG2(object):
         def desc(self):
             return self.value[1]
 
-    def __init__(self):
+    # port: serial device (default JRKG2_DEV)
+    def __init__(self, port=None):
+        self.port = Const.JRKG2_DEV if (port is None) else port
         self.crc_xor_table = JrkG2.build_crc_xor_table()
+        # framed SET_TARGET_HIRES packets for every target, so that setting a target is a lookup and a write
+        self.set_target_packets = tuple(self.frame(JrkG2.encode_set_target(target))
+            for target in range(JrkG2.TARGET_MINVAL, (JrkG2.TARGET_MAXVAL + 1)))
         self.serial_obj = None
+        # writes are serialized by tx_lock, held only for the write itself, so that commands without a
+        # response never wait on a read; commands with a response also hold txn_lock until it is read
+        self.tx_lock = threading.Lock()
+        self.txn_lock = threading.Lock()
+        self.health = None
+        self.health_poller = None
+        self.health_poll_stop = threading.Event()
+        self.num_health_polls = 0
+        self.num_health_poll_failures = 0
 
     def init(self):
         baud = (Const.JRKG2_BAUD if (Const.JRKG2_BAUD is not None) else JrkG2.DUMMY_USB_BAUD)
@@ -63,7 +90,7 @@ class JrkG2(object):
         write_timeout_s = (Const.JRKG2_WRITE_TIMEOUT_MS / 1000)
         try:
             self.serial_obj = serial.Serial(
-                port               = Const.JRKG2_DEV,
+                port               = self.port,
                 baudrate           = baud,
                 bytesize           = serial.EIGHTBITS,
                 parity             = serial.PARITY_NONE,
@@ -81,6 +108,7 @@ class JrkG2(object):
             raise JrkG2Exception('SerialException: %s' % e)
 
     def deinit(self):
+        self.stop_health_poll()
         try:
             # unclear if this can raise SerialException
             self.serial_obj.close()
@@ -89,27 +117,35 @@ class JrkG2(object):
         del self.serial_obj
 
     def __issue_cmd(self, cmd, resp_length, inhibit_err_check=False):
-        if Const.JRKG2_CRC_ENABLED:
-            crc = self.calc_crc(cmd)
-            self.__send(cmd + crc)
-        else:
-            self.__send(cmd)
+        return self.__issue_packet(self.frame(cmd), resp_length, inhibit_err_check)
+
+    # packet: a command as returned by frame()
+    def __issue_packet(self, packet, resp_length, inhibit_err_check=False):
         if (resp_length > 0):
-            resp = self.__recv(resp_length)
+            with self.txn_lock:
+                self.__send(packet)
+                resp = self.__recv(resp_length)
         else:
+            self.__send(packet)
             resp = bytes([])
-        if ((Const.JRKG2_CHECK_ERRFLAGS_AFTER_CMDS) and (not inhibit_err_check)):
+        if ((Const.JRKG2_ERROR_CHECK == JrkG2ErrorCheck.AFTER_CMDS) and (not inhibit_err_check)):
             flags = self.get_and_clear_error_flags_occurred()
-            # ignore AWAITING_COMMAND error
-            ignore_mask = JrkG2.ErrorFlag.AWAITING_COMMAND.mask()
-            errors = JrkG2.derive_error_flags(flags & (~ignore_mask))
-            if len(errors) > 0:
-                descs = []
-                for err in errors:
-                    descs.append(err.desc())
-                print('Warning: error flags occurred: ' + ','.join(descs))
+            JrkG2.warn_error_flags('occurred', flags)
         return resp
 
+    # prints a warning listing the flags in err_var, if any (ignoring AWAITING_COMMAND)
+    # returns the list of flags warned about
+    @staticmethod
+    def warn_error_flags(kind, err_var):
+        ignore_mask = JrkG2.ErrorFlag.AWAITING_COMMAND.mask()
+        errors = JrkG2.derive_error_flags(err_var & (~ignore_mask))
+        if len(errors) > 0:
+            descs = []
+            for err in errors:
+                descs.append(err.desc())
+            print('Warning: error flags ' + kind + ': ' + ','.join(descs))
+        return errors
+
     @staticmethod
     def derive_error_flags(err_var):
         error_flags = []
@@ -120,7 +156,8 @@ class JrkG2(object):
 
     def __send(self, data):
         try:
-            self.serial_obj.write(data)
+            with self.tx_lock:
+                self.serial_obj.write(data)
         except serial.SerialException as e:
             raise JrkG2Exception('SerialException: %s' % e)
 
@@ -135,11 +172,24 @@ class JrkG2(object):
 
     def calc_crc(self, msg):
         remainder = 0x00
-        for i in range(0, len(msg)):
-            remainder ^= msg[i]
-            remainder = self.crc_xor_table[remainder]
+        table = self.crc_xor_table
+        for b in msg:
+            remainder = table[remainder ^ b]
         return bytes([remainder])
 
+    # returns cmd as sent on the wire (with its CRC byte appended if enabled)
+    def frame(self, cmd):
+        if Const.JRKG2_CRC_ENABLED:
+            return cmd + self.calc_crc(cmd)
+        return bytes(cmd)
+
+    # returns the (unframed) SET_TARGET_HIRES command for target
+    @staticmethod
+    def encode_set_target(target):
+        byte0 = JrkG2.CMDBYTE_SET_TARGET_HIRES + (target & 0x1F)
+        byte1 = (target >> 5) & 0x7F
+        return bytes([byte0, byte1])
+
     # [TARGET_MINVAL,TARGET_MAXVAL]
     def get_target(self):
         # TODO: implement short form of this?: 0xA3?
@@ -153,23 +203,20 @@ class JrkG2(object):
             raise ContractViolation('invalid argument: target')
         if ((target < JrkG2.TARGET_MINVAL) or (target > JrkG2.TARGET_MAXVAL)):
             raise ContractViolation('invalid argument: target')
-        byte0 = JrkG2.CMDBYTE_SET_TARGET_HIRES + (target & 0x1F)
-        byte1 = (target >> 5) & 0x7F
-        data = bytes([byte0, byte1])
-        self.__issue_cmd(data, 0)
+        self.__issue_packet(self.set_target_packets[target - JrkG2.TARGET_MINVAL], 0)
 
     # [0,1]
     def get_target_norm(self):
         target = self.get_target()
-        norm = (target - JrkG2.TARGET_MINVAL) / (JrkG2.TARGET_MAXVAL - JrkG2.TARGET_MINVAL)
+        norm = (target - JrkG2.TARGET_MINVAL) / JrkG2.TARGET_RANGE
         return norm
 
     # [0,1]
     def set_target_norm(self, norm):
         if ((norm < 0) or (norm > 1)):
             raise ContractViolation('invalid argument: norm')
-        target = round(JrkG2.TARGET_MINVAL + (norm * (JrkG2.TARGET_MAXVAL - JrkG2.TARGET_MINVAL)))
-        self.set_target(target)
+        # norm is range-checked, so the target index needs no further validation
+        self.__issue_packet(self.set_target_packets[round(norm * JrkG2.TARGET_RANGE)], 0)
 
     # [0,stroke_mm]
     def get_target_mm(self):
@@ -181,8 +228,7 @@ class JrkG2(object):
     def set_target_mm(self, mm):
         if ((mm < 0) or (mm > Const.ACTUATOR_STROKE_MM)):
             return False
-        norm = mm / Const.ACTUATOR_STROKE_MM
-        self.set_target_norm(norm)
+        self.__issue_packet(self.set_target_packets[round((mm / Const.ACTUATOR_STROKE_MM) * JrkG2.TARGET_RANGE)], 0)
         return True
 
     def stop_motor(self):
@@ -193,7 +239,7 @@ class JrkG2(object):
     def get_variables(self, offset, length):
         if ((offset < 0) or (offset > 0xFF)):
             raise ContractViolation('invalid argument: offset')
-        if ((length < 0) or (length > 0xFF)):
+        if ((length < 0) or (length > JrkG2.VARS_MAX_READ_LENGTH)):
             raise ContractViolation('invalid argument: length')
         data = self.__issue_cmd(bytes([JrkG2.CMDBYTE_GET_VARIABLES, offset, length]), length)
         return bytearray(data)		# switch to immutable bytes? recv should already return bytes
@@ -204,9 +250,10 @@ class JrkG2(object):
         value = (data[1] << 8) + data[0]
         return value
 
+    # returns the table as bytes, indexed by remainder byte
     @staticmethod
     def build_crc_xor_table():
-        table = {}
+        table = bytearray(0x100)
         for b in range(0, 0x100):
             v = b
             for i in range(0, 8):
@@ -214,7 +261,7 @@ class JrkG2(object):
                     v ^= JrkG2.CRC7_POLY
                 v >>= 1
             table[b] = v
-        return table
+        return bytes(table)
 
     def get_and_clear_error_flags_halting(self):
         data = bytes([JrkG2.CMDBYTE_GET_AND_CLEAR_ERROR_FLAGS_HALTING])
@@ -228,6 +275,68 @@ class JrkG2(object):
         value = (data[1] << 8) + data[0]
         return value
 
+    # reads target and feedback, then both error flag variables, with two GET_VARIABLES block reads (the
+    # variables are not contiguous within VARS_MAX_READ_LENGTH) and warns about flags that occurred since
+    # the previous poll and halting flags that newly appeared
+    # the block reads do not clear the occurred flags, so when any are set they are cleared with a
+    # follow-up command; in the common (error-free) case a poll is two round trips
+    # returns the new JrkG2Health, also available from get_health()
+    def poll_health(self):
+        motion = self.get_variables(JrkG2.HEALTH_MOTION_VAR_OFFSET, JrkG2.HEALTH_MOTION_VAR_LENGTH)
+        errors = self.get_variables(JrkG2.HEALTH_ERRORS_VAR_OFFSET, JrkG2.HEALTH_ERRORS_VAR_LENGTH)
+        def var16(data, data_offset, offset):
+            i = offset - data_offset
+            return (data[i + 1] << 8) + data[i]
+        halting = var16(errors, JrkG2.HEALTH_ERRORS_VAR_OFFSET, JrkG2.VAR_OFFSET_ERROR_FLAGS_HALTING)
+        occurred = var16(errors, JrkG2.HEALTH_ERRORS_VAR_OFFSET, JrkG2.VAR_OFFSET_ERROR_FLAGS_OCCURRED)
+        if ((occurred & (~JrkG2.ErrorFlag.AWAITING_COMMAND.mask())) != 0):
+            # the clear returns everything set up to now, including flags raised since the block read
+            occurred |= self.get_and_clear_error_flags_occurred()
+        prev_halting = 0
+        if self.health is not None:
+            for err in self.health.errors_halting:
+                prev_halting |= err.mask()
+        JrkG2.warn_error_flags('halting', halting & (~prev_halting))
+        errors_occurred = JrkG2.warn_error_flags('occurred', occurred)
+        self.health = JrkG2Health(time.monotonic(),
+            var16(motion, JrkG2.HEALTH_MOTION_VAR_OFFSET, JrkG2.VAR_OFFSET_TARGET),
+            var16(motion, JrkG2.HEALTH_MOTION_VAR_OFFSET, JrkG2.VAR_OFFSET_FEEDBACK),
+            JrkG2.derive_error_flags(halting), errors_occurred)
+        self.num_health_polls += 1
+        return self.health
+
+    # returns the JrkG2Health from the most recent poll (None before the first)
+    def get_health(self):
+        return self.health
+
+    # starts a daemon thread that calls poll_health() every period_s (default JRKG2_HEALTH_POLL_PERIOD_S)
+    def start_health_poll(self, period_s=None):
+        if self.health_poller is not None:
+            return
+        if period_s is None:
+            period_s = Const.JRKG2_HEALTH_POLL_PERIOD_S
+        if (period_s <= 0):
+            raise ContractViolation('invalid argument: period_s')
+        self.health_poll_stop.clear()
+        self.health_poller = threading.Thread(target=self.__health_poll_loop, args=(period_s,), name='JrkG2 health poll', daemon=True)
+        self.health_poller.start()
+
+    def stop_health_poll(self):
+        if self.health_poller is None:
+            return
+        self.health_poll_stop.set()
+        self.health_poller.join()
+        self.health_poller = None
+
+    def __health_poll_loop(self, period_s):
+        while not self.health_poll_stop.wait(period_s):
+            try:
+                self.poll_health()
+            except JrkG2Exception as e:
+                # keep polling; a persistent failure will also surface on the next request/response command
+                self.num_health_poll_failures += 1
+                print('Warning: JrkG2 health poll failed: %s' % e)
+
 #    def get_error_flags_occurred(self):
 #        data = self.get_variables(JrkG2.VAR_OFFSET_ERROR_FLAGS_OCCURRED, JrkG2.VAR_LENGTH_ERROR_FLAGS_OCCURRED)
 #        value = (data[1] << 8) + data[0]
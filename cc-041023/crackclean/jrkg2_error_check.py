@@ -0,0 +1,15 @@
+# coding=utf-8
+
+from enum import Enum, unique
+
+
+# how JrkG2 watches the controller's error flags
+@unique
+class JrkG2ErrorCheck(Enum):
+    NONE       = 0	# never read them
+    AFTER_CMDS = 1	# read and clear them after every command (one extra round trip per command, including set_target)
+    POLLED     = 2	# commands without a response are fire-and-forget; a background thread reads error flags,
+			# feedback and target with GET_VARIABLES block reads every JRKG2_HEALTH_POLL_PERIOD_S
+
+    def __str__(self):
+        return self.name
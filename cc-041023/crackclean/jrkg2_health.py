@@ -0,0 +1,17 @@
+# coding=utf-8
+
+
+# snapshot of the JrkG2 state taken by one health poll
+class JrkG2Health(object):
+
+    def __init__(self, timestamp, target, feedback, errors_halting, errors_occurred):
+        self.timestamp = timestamp			# time.monotonic() when the block reads completed
+        self.target = target				# [TARGET_MINVAL,TARGET_MAXVAL]
+        self.feedback = feedback
+        self.errors_halting = errors_halting		# list of JrkG2.ErrorFlag
+        self.errors_occurred = errors_occurred		# list of JrkG2.ErrorFlag (since the previous poll)
+
+    def __str__(self):
+        return ('target ' + str(self.target) + ', feedback ' + str(self.feedback) +
+            ', halting [' + ','.join(err.desc() for err in self.errors_halting) + ']' +
+            ', occurred [' + ','.join(err.desc() for err in self.errors_occurred) + ']')
@@ -0,0 +1,218 @@
+# coding=utf-8
+
+import collections
+import math
+import os
+import select
+import threading
+import time
+import tty
+
+from .const import Const
+from .exceptions import JrkG2Exception
+from .jrkg2 import JrkG2
+
+
+# simulated Jrk G2 on a pseudo-terminal, for exercising JrkG2/ActuatorController without the board
+#
+# implements the subset of the serial protocol that JrkG2 uses (SET_TARGET_HIRES, GET_VARIABLES, the two
+# GET_AND_CLEAR_ERROR_FLAGS commands and STOP_MOTOR), with CRC7 checking when JRKG2_CRC_ENABLED.  a bad
+# CRC or malformed command (including a GET_VARIABLES read longer than 15 bytes or past the variables) is
+# dropped and raises SERIAL_CRC_ERROR/SERIAL_PROTOCOL_ERROR, which (as on the board) halts the motor until
+# the halting flags are read back.
+#
+# the position (reported as feedback, in target units) follows the target as a first-order lag with time
+# constant JRKG2_SIM_TIME_CONSTANT_MS, after a dead time of JRKG2_SIM_DEAD_TIME_MS; every response is
+# delayed by JRKG2_SIM_RESPONSE_LATENCY_MS.  the device runs on a thread of the process that starts it
+# (controller processes are daemonic, so cannot have child processes)
+class JrkG2Sim(object):
+
+    VARS_SIZE = 0x40
+
+    # data bytes that follow each command byte (excluding the CRC byte)
+    CMD_DATA_LENGTHS = {b: 1 for b in range(JrkG2.CMDBYTE_SET_TARGET_HIRES, (JrkG2.CMDBYTE_SET_TARGET_HIRES + 0x20))}
+    CMD_DATA_LENGTHS.update({
+        JrkG2.CMDBYTE_GET_AND_CLEAR_ERROR_FLAGS_HALTING:  0,
+        JrkG2.CMDBYTE_GET_AND_CLEAR_ERROR_FLAGS_OCCURRED: 0,
+        JrkG2.CMDBYTE_GET_VARIABLES:                      2,
+        JrkG2.CMDBYTE_STOP_MOTOR:                         0,
+    })
+
+    # errors that halt the motor (until read with GET_AND_CLEAR_ERROR_FLAGS_HALTING)
+    LATCHED_ERRORS_MASK = (JrkG2.ErrorFlag.SERIAL_CRC_ERROR.mask() | JrkG2.ErrorFlag.SERIAL_PROTOCOL_ERROR.mask())
+
+    def __init__(self):
+        self.crc_xor_table = JrkG2.build_crc_xor_table()
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+        self.thread = None
+        (self.wake_r, self.wake_w) = (None, None)
+        self.time_constant_s = Const.JRKG2_SIM_TIME_CONSTANT_MS / 1000
+        self.dead_time_s = Const.JRKG2_SIM_DEAD_TIME_MS / 1000
+        self.response_latency_s = Const.JRKG2_SIM_RESPONSE_LATENCY_MS / 1000
+        # device state (only touched by the device thread, except for reading the counters)
+        self.target = 0
+        self.target_effective = None		# target the motor is driving to (None while stopped)
+        self.target_schedule = collections.deque()	# (ts, target) not yet past the dead time
+        self.position = 0.0
+        self.position_ts = 0
+        self.errors_halting = JrkG2.ErrorFlag.AWAITING_COMMAND.mask()
+        self.errors_occurred = 0
+        self.num_cmds = 0
+        self.num_targets = 0
+        self.num_reads = 0
+        self.num_crc_errors = 0
+        self.num_protocol_errors = 0
+
+    # opens the pty and starts the device thread; JrkG2 should then open self.port
+    def start(self):
+        try:
+            (self.master_fd, self.slave_fd) = os.openpty()
+            tty.setraw(self.master_fd)
+            tty.setraw(self.slave_fd)
+            self.port = os.ttyname(self.slave_fd)
+            (self.wake_r, self.wake_w) = os.pipe()
+        except OSError as e:
+            raise JrkG2Exception('OSError: %s' % e)
+        self.position_ts = time.monotonic()
+        self.thread = threading.Thread(target=self.__run, name='JrkG2Sim', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        os.write(self.wake_w, b'\x00')
+        self.thread.join()
+        self.thread = None
+        for fd in (self.master_fd, self.slave_fd, self.wake_r, self.wake_w):
+            os.close(fd)
+        print('JrkG2Sim: ' + str(self.num_cmds) + ' commands (' + str(self.num_targets) + ' targets, ' +
+            str(self.num_reads) + ' reads), ' + str(self.num_crc_errors) + ' CRC errors, ' +
+            str(self.num_protocol_errors) + ' protocol errors')
+
+    def __run(self):
+        buf = bytearray()
+        while True:
+            (ready, _, _) = select.select([self.master_fd, self.wake_r], [], [])
+            if self.wake_r in ready:
+                break
+            try:
+                buf += os.read(self.master_fd, 4096)
+            except OSError:
+                break
+            consumed = 0
+            while True:
+                length = self.__process(buf, consumed)
+                if (length == 0):
+                    break
+                consumed += length
+            del buf[:consumed]
+
+    # handles the command at buf[start:], if complete
+    # returns the number of bytes consumed (0 if more are needed)
+    def __process(self, buf, start):
+        if (start >= len(buf)):
+            return 0
+        cmd_byte = buf[start]
+        data_length = JrkG2Sim.CMD_DATA_LENGTHS.get(cmd_byte)
+        if data_length is None:
+            # unknown command, or a data byte where a command was expected
+            self.__raise_error(JrkG2.ErrorFlag.SERIAL_PROTOCOL_ERROR)
+            self.num_protocol_errors += 1
+            return 1
+        length = 1 + data_length + (1 if Const.JRKG2_CRC_ENABLED else 0)
+        if ((len(buf) - start) < length):
+            return 0
+        cmd = bytes(buf[start:(start + 1 + data_length)])
+        if any((b & 0x80) for b in cmd[1:]):
+            self.__raise_error(JrkG2.ErrorFlag.SERIAL_PROTOCOL_ERROR)
+            self.num_protocol_errors += 1
+            return length
+        if (Const.JRKG2_CRC_ENABLED and (self.__calc_crc(cmd) != buf[start + length - 1])):
+            self.__raise_error(JrkG2.ErrorFlag.SERIAL_CRC_ERROR)
+            self.num_crc_errors += 1
+            return length
+        self.num_cmds += 1
+        self.__execute(cmd)
+        return length
+
+    def __execute(self, cmd):
+        now = time.monotonic()
+        self.__advance(now)
+        if ((cmd[0] & 0xE0) == JrkG2.CMDBYTE_SET_TARGET_HIRES):
+            self.target = (cmd[0] & 0x1F) + (cmd[1] << 5)
+            self.target_schedule.append(((now + self.dead_time_s), self.target))
+            self.errors_halting &= ~JrkG2.ErrorFlag.AWAITING_COMMAND.mask()
+            self.num_targets += 1
+        elif (cmd[0] == JrkG2.CMDBYTE_STOP_MOTOR):
+            self.target_schedule.clear()
+            self.target_effective = None
+            self.errors_halting |= JrkG2.ErrorFlag.AWAITING_COMMAND.mask()
+        elif (cmd[0] == JrkG2.CMDBYTE_GET_VARIABLES):
+            (offset, length) = (cmd[1], cmd[2])
+            if ((length > JrkG2.VARS_MAX_READ_LENGTH) or ((offset + length) > JrkG2Sim.VARS_SIZE)):
+                # as on the board: no response
+                self.__raise_error(JrkG2.ErrorFlag.SERIAL_PROTOCOL_ERROR)
+                self.num_protocol_errors += 1
+                return
+            self.__respond(bytes(self.__variables()[offset:(offset + length)]))
+            self.num_reads += 1
+        elif (cmd[0] == JrkG2.CMDBYTE_GET_AND_CLEAR_ERROR_FLAGS_HALTING):
+            value = self.errors_halting
+            self.errors_halting &= ~JrkG2Sim.LATCHED_ERRORS_MASK
+            self.__respond(value.to_bytes(2, 'little'))
+            self.num_reads += 1
+        elif (cmd[0] == JrkG2.CMDBYTE_GET_AND_CLEAR_ERROR_FLAGS_OCCURRED):
+            value = self.errors_occurred
+            self.errors_occurred = 0
+            self.__respond(value.to_bytes(2, 'little'))
+            self.num_reads += 1
+
+    def __variables(self):
+        variables = bytearray(JrkG2Sim.VARS_SIZE)
+        fields = (
+            (JrkG2.VAR_OFFSET_TARGET, JrkG2.VAR_LENGTH_TARGET, self.target),
+            (JrkG2.VAR_OFFSET_FEEDBACK, JrkG2.VAR_LENGTH_FEEDBACK, round(self.position)),
+            (JrkG2.VAR_OFFSET_ERROR_FLAGS_HALTING, JrkG2.VAR_LENGTH_ERROR_FLAGS_HALTING, self.errors_halting),
+            (JrkG2.VAR_OFFSET_ERROR_FLAGS_OCCURRED, JrkG2.VAR_LENGTH_ERROR_FLAGS_OCCURRED, self.errors_occurred),
+        )
+        for (offset, length, value) in fields:
+            variables[offset:(offset + length)] = value.to_bytes(length, 'little')
+        return variables
+
+    def __respond(self, data):
+        if (self.response_latency_s > 0):
+            time.sleep(self.response_latency_s)
+        os.write(self.master_fd, data)
+
+    def __raise_error(self, err):
+        self.__advance(time.monotonic())
+        self.errors_occurred |= err.mask()
+        self.errors_halting |= err.mask()
+
+    # moves the position model forward to now, applying scheduled targets as they pass the dead time
+    def __advance(self, now):
+        while (self.target_schedule and (self.target_schedule[0][0] <= now)):
+            (ts, target) = self.target_schedule.popleft()
+            self.__integrate(ts)
+            self.target_effective = target
+        self.__integrate(now)
+
+    def __integrate(self, ts):
+        dt = ts - self.position_ts
+        if (dt <= 0):
+            return
+        self.position_ts = ts
+        if ((self.target_effective is None) or ((self.errors_halting & JrkG2Sim.LATCHED_ERRORS_MASK) != 0)):
+            return
+        if (self.time_constant_s <= 0):
+            self.position = float(self.target_effective)
+        else:
+            self.position = self.target_effective + ((self.position - self.target_effective) * math.exp(-dt / self.time_constant_s))
+
+    def __calc_crc(self, msg):
+        remainder = 0x00
+        for b in msg:
+            remainder = self.crc_xor_table[remainder ^ b]
+        return remainder
@@ -13,6 +13,7 @@ from .ipc.actuator_cmd import ActuatorCmd
 from .ipc.actuator_resp import ActuatorResp
 from .ipc.endpoint import Endpoint
 from .ipc.detection_cmd import DetectionCmd
+from .ipc.detection_event import DetectionEvent
 from .ipc.detection_resp import DetectionResp
 from .ipc.joystick_cmd import JoystickCmd
 from .ipc.joystick_resp import JoystickResp
@@ -34,8 +35,10 @@ class MainController(Controller):
         ACQUIRE_IMAGE    = 2
         AWAIT_IMAGE      = 3
         AWAIT_RESULT     = 4
+        STREAMING        = 5
         AWAIT_ACTUATOR   = 6
         TERMINATE        = 7
+        OVERLAPPED       = 8
 
     def __init__(self, endpoint, params):
         super().__init__(endpoint, params)
@@ -44,6 +47,8 @@ class MainController(Controller):
         self.endpoint_joystick = None
         self.endpoint_joystick_event = None
         self.endpoint_video = None
+        self.endpoint_detection_event = None
+        self.overlay = None
         self.pending_op_id_actuator = None
         self.pending_op_id_detection = None
         self.pending_op_id_joystick = None
@@ -55,8 +60,17 @@ class MainController(Controller):
         self.endpoint_joystick = self.params[2]
         self.endpoint_joystick_event = self.params[3]
         self.endpoint_video = self.params[4]
+        self.overlay = self.params[5]
+        # None unless pipeline mode (DetectionController streams results as events)
+        self.endpoint_detection_event = self.params[6]
 
     def deinit(self):
+        print('MainController endpoint stats:')
+        print('  actuator:  ' + str(self.endpoint_actuator.get_stats()))
+        print('  detection: ' + str(self.endpoint_detection.get_stats()))
+        print('  joystick:  ' + str(self.endpoint_joystick.get_stats()))
+        print('  video:     ' + str(self.endpoint_video.get_stats()))
+        print('  responses: ' + str(self.endpoint.get_send_stats()))
         # shutdown all queues that we write to
         Endpoint.shutdown_queue(self.endpoint.txq)
         Endpoint.shutdown_queue(self.endpoint_actuator.txq)
@@ -69,6 +83,7 @@ class MainController(Controller):
         del self.endpoint_joystick
         del self.endpoint_joystick_event
         del self.endpoint_video
+        del self.endpoint_detection_event
 
     def start(self):
         cc_mode = CcMode.MANUAL
@@ -92,14 +107,43 @@ class MainController(Controller):
 
         ts_last_video_acquire_cmd = None
 
+        # state to return to after a cycle's actuator command completes (ACQUIRE_IMAGE, STREAMING or OVERLAPPED)
+        fsm_state_cycle = MainController.FsmState.ACQUIRE_IMAGE
+        # overlapped mode: actuator commands don't block the cycle (no AWAIT_ACTUATOR); target_sent is the
+        # target of the in-flight actuator command
+        actuator_async = Const.MAIN_CONTROLLER_OVERLAPPED
+        target_sent = None
+        # overlapped mode: newest frame received while detection is busy
+        img_next = None
+        img_latest = None
+        # set when a detection parameter changes; forwarded to DetectionController in pipeline mode
+        detect_params_dirty = False
+        # pipeline mode: set by START until START_STREAM is acknowledged (a rejected send is retried)
+        stream_start_pending = False
+
         cur_detect_thresh = Const.DETECTION_DETECT_THRESH_DEFAULT
         cur_simpfilter_thresh = Const.DETECTION_SIMPFILTER_THRESH_DEFAULT
         cur_adaptfilter_thresh = Const.DETECTION_ADAPTFILTER_THRESH_DEFAULT
         cur_adaptfilter_radius = Const.DETECTION_ADAPTFILTER_RADIUS_DEFAULT
 
-        last_loop = time.monotonic()
+        # every endpoint we receive on; the loop sleeps until one of them is readable
+        rx_endpoints = [
+            self.endpoint,
+            self.endpoint_actuator,
+            self.endpoint_detection,
+            self.endpoint_joystick,
+            self.endpoint_joystick_event,
+            self.endpoint_video
+        ]
+        if self.endpoint_detection_event is not None:
+            rx_endpoints.append(self.endpoint_detection_event)
+
         while True:
             #print(str(fsm_state))
+            fsm_state_begin = fsm_state
+            pending_begin = self.pending_op_ids()
+            # (DetectionResult, image timestamp, detection call ms) when a result arrives this iteration
+            result_tup = None
             if (fsm_state == MainController.FsmState.STARTING):
                 if not actuator_ready:
                     if self.pending_op_id_actuator is None:
@@ -112,6 +156,8 @@ class MainController(Controller):
                             self.pending_op_id_actuator = None
                             if (resp.token == ActuatorResp.Token.TRUE):
                                 actuator_ready = True
+                        elif not self.endpoint_actuator.is_pending(self.pending_op_id_actuator):
+                            self.pending_op_id_actuator = None		# expired; IS_READY is resent
                 if not detection_ready:
                     if self.pending_op_id_detection is None:
                         self.cmd_detection_is_ready(False)
@@ -123,6 +169,8 @@ class MainController(Controller):
                             self.pending_op_id_detection = None
                             if (resp.token == DetectionResp.Token.TRUE):
                                 detection_ready = True
+                        elif not self.endpoint_detection.is_pending(self.pending_op_id_detection):
+                            self.pending_op_id_detection = None		# expired; IS_READY is resent
                 if not joystick_ready:
                     if self.pending_op_id_joystick is None:
                         self.cmd_joystick_is_ready(False)
@@ -134,6 +182,8 @@ class MainController(Controller):
                             self.pending_op_id_joystick = None
                             if (resp.token == JoystickResp.Token.TRUE):
                                 joystick_ready = True
+                        elif not self.endpoint_joystick.is_pending(self.pending_op_id_joystick):
+                            self.pending_op_id_joystick = None		# expired; IS_READY is resent
                 if not video_ready:
                     if self.pending_op_id_video is None:
                         self.cmd_video_is_ready(False)
@@ -145,14 +195,18 @@ class MainController(Controller):
                             self.pending_op_id_video = None
                             if (resp.token == VideoResp.Token.TRUE):
                                 video_ready = True
+                        elif not self.endpoint_video.is_pending(self.pending_op_id_video):
+                            self.pending_op_id_video = None		# expired; IS_READY is resent
                 if (actuator_ready and detection_ready and joystick_ready and video_ready):
                     fsm_state = MainController.FsmState.READY
             elif (fsm_state == MainController.FsmState.READY):
                 pass
             elif (fsm_state == MainController.FsmState.ACQUIRE_IMAGE):
+                # (a command rejected under backpressure is retried on the next iteration)
                 self.pending_op_id_video = self.endpoint_video.send_cmd_async(VideoCmd(VideoCmd.Token.GET_LATEST_IMG, ()))
-                ts_last_video_acquire_cmd = time.monotonic()
-                fsm_state = MainController.FsmState.AWAIT_IMAGE
+                if (self.pending_op_id_video is not None):
+                    ts_last_video_acquire_cmd = time.monotonic()
+                    fsm_state = MainController.FsmState.AWAIT_IMAGE
             elif (fsm_state == MainController.FsmState.AWAIT_IMAGE):
                 video_resp = self.endpoint_video.check_for_resp(self.pending_op_id_video)
                 if (video_resp is not None):
@@ -161,8 +215,11 @@ class MainController(Controller):
                     if not video_resp.params[0].is_empty():
                         img_latest = video_resp.params[0]
                         ts_dc_call = time.monotonic()
-                        self.pending_op_id_detection = self.endpoint_detection.send_cmd_async(DetectionCmd(DetectionCmd.Token.DETECT, (img_latest, cur_detect_thresh, cur_simpfilter_thresh, cur_adaptfilter_thresh, cur_adaptfilter_radius, filter_mode)))
-                        fsm_state = MainController.FsmState.AWAIT_RESULT
+                        self.pending_op_id_detection = self.endpoint_detection.send_cmd_async(DetectionCmd(DetectionCmd.Token.DETECT, (img_latest, cur_detect_thresh, cur_simpfilter_thresh, cur_adaptfilter_thresh, cur_adaptfilter_radius, filter_mode, self.overlay)))
+                        if (self.pending_op_id_detection is not None):
+                            fsm_state = MainController.FsmState.AWAIT_RESULT
+                        else:
+                            fsm_state = MainController.FsmState.ACQUIRE_IMAGE
                 else:
                     img_elapsed_s = time.monotonic() - ts_last_video_acquire_cmd
                     if (img_elapsed_s > Const.VIDEO_MAX_IMG_REQ_DELAY_S):
@@ -173,40 +230,132 @@ class MainController(Controller):
                 if (detection_resp is not None):
                     self.pending_op_id_detection = None
                     MainController.validate_op_obj(detection_resp, DetectionResp, (DetectionResp.Token.DETECTION_RESULT,))
-                    detection_result = detection_resp.params[0]
-                    dc_call_ms = (time.monotonic() - ts_dc_call) * 1000
-                    dc_y_mm = detection_result.y_mm
-
-                    if ((cc_mode == CcMode.AUTO) and (dc_y_mm is not None)):
-                        target_req = MainController.calc_act_mm_from_dc_mm(dc_y_mm)
-                    num_full_cycles += 1
-                    run_dur_s = (time.monotonic() - ts_start)
-                    ips = num_full_cycles / run_dur_s
-                    img_age_ms = (time.time() - img_latest.timestamp) * 1000
-                    if ((target_cur is None) or (target_cur == MainController.TARGET_STOP)):
-                        target_str = 'STOP'
-                    else:
-                        target_str = '{0:.1f}'.format(target_cur)
-                    cc_status = CcStatus(cc_mode, cur_detect_thresh, cur_simpfilter_thresh, cur_adaptfilter_thresh, cur_adaptfilter_radius, filter_mode, ips, dc_call_ms, img_age_ms, dc_y_mm, target_str, detection_result.img)
-                    if (target_req != target_cur):
-                        if (target_req == MainController.TARGET_STOP):
-                            self.pending_op_id_actuator = self.endpoint_actuator.send_cmd_async(ActuatorCmd(ActuatorCmd.Token.STOP_MOTOR, ()))
-                        else:
-                            self.pending_op_id_actuator = self.endpoint_actuator.send_cmd_async(ActuatorCmd(ActuatorCmd.Token.SET_TARGET_MM, (target_req,)))
-                        fsm_state = MainController.FsmState.AWAIT_ACTUATOR
+                    result_tup = (detection_resp.params[0], img_latest.timestamp, ((time.monotonic() - ts_dc_call) * 1000))
+                elif not self.endpoint_detection.is_pending(self.pending_op_id_detection):
+                    # expired; carry on with the next image
+                    self.pending_op_id_detection = None
+                    fsm_state = MainController.FsmState.ACQUIRE_IMAGE
+            elif (fsm_state == MainController.FsmState.STREAMING):
+                if (self.pending_op_id_detection is not None):
+                    # START_STREAM/SET_PARAMS ack
+                    detection_resp = self.endpoint_detection.check_for_resp(self.pending_op_id_detection)
+                    if (detection_resp is not None):
+                        self.pending_op_id_detection = None
+                        MainController.validate_op_obj(detection_resp, DetectionResp, (DetectionResp.Token.OK,))
+                        stream_start_pending = False
+                    elif not self.endpoint_detection.is_pending(self.pending_op_id_detection):
+                        # expired; START_STREAM (which carries the parameters) or SET_PARAMS is resent
+                        self.pending_op_id_detection = None
+                        if not stream_start_pending:
+                            detect_params_dirty = True
+                elif stream_start_pending:
+                    self.pending_op_id_detection = self.endpoint_detection.send_cmd_async(DetectionCmd(DetectionCmd.Token.START_STREAM, (cur_detect_thresh, cur_simpfilter_thresh, cur_adaptfilter_thresh, cur_adaptfilter_radius, filter_mode, self.overlay)))
+                    if (self.pending_op_id_detection is not None):
+                        # START_STREAM carries the current parameters
+                        detect_params_dirty = False
+                elif detect_params_dirty:
+                    self.pending_op_id_detection = self.endpoint_detection.send_cmd_async(DetectionCmd(DetectionCmd.Token.SET_PARAMS, (cur_detect_thresh, cur_simpfilter_thresh, cur_adaptfilter_thresh, cur_adaptfilter_radius, filter_mode, self.overlay)))
+                    detect_params_dirty = (self.pending_op_id_detection is None)
+                event = self.check_for_latest_detection_event()
+                if event is not None:
+                    result_tup = event.params
+            elif (fsm_state == MainController.FsmState.OVERLAPPED):
+                # request the next frame once the buffered one has gone to detection (at most one frame is
+                # fetched per detection, rather than one per camera frame); a frame that is not newer is re-requested
+                if ((self.pending_op_id_video is None) and (img_next is None)):
+                    self.pending_op_id_video = self.endpoint_video.send_cmd_async(VideoCmd(VideoCmd.Token.GET_LATEST_IMG, ()))
+                    ts_last_video_acquire_cmd = time.monotonic()
+                elif (self.pending_op_id_video is not None):
+                    video_resp = self.endpoint_video.check_for_resp(self.pending_op_id_video)
+                    if (video_resp is not None):
+                        self.pending_op_id_video = None
+                        MainController.validate_op_obj(video_resp, VideoResp, (VideoResp.Token.LATEST_IMG,))
+                        img = video_resp.params[0]
+                        if ((not img.is_empty()) and
+                            ((img_latest is None) or (img.timestamp > img_latest.timestamp))):
+                            img_next = img
                     else:
-                        fsm_state = MainController.FsmState.ACQUIRE_IMAGE
+                        img_elapsed_s = time.monotonic() - ts_last_video_acquire_cmd
+                        if (img_elapsed_s > Const.VIDEO_MAX_IMG_REQ_DELAY_S):
+                            print('failed to receive image from VideoController after ' + str(Const.VIDEO_MAX_IMG_REQ_DELAY_S) + ' s; terminating application')
+                            fsm_state = MainController.FsmState.TERMINATE
+                # collect the previous detection's result, then immediately start the next one
+                if (self.pending_op_id_detection is not None):
+                    detection_resp = self.endpoint_detection.check_for_resp(self.pending_op_id_detection)
+                    if (detection_resp is not None):
+                        self.pending_op_id_detection = None
+                        MainController.validate_op_obj(detection_resp, DetectionResp, (DetectionResp.Token.DETECTION_RESULT,))
+                        result_tup = (detection_resp.params[0], img_latest.timestamp, ((time.monotonic() - ts_dc_call) * 1000))
+                    elif not self.endpoint_detection.is_pending(self.pending_op_id_detection):
+                        self.pending_op_id_detection = None		# expired; detection moves on to the next frame
+                if ((self.pending_op_id_detection is None) and (img_next is not None)):
+                    img_latest = img_next
+                    img_next = None
+                    ts_dc_call = time.monotonic()
+                    self.pending_op_id_detection = self.endpoint_detection.send_cmd_async(DetectionCmd(DetectionCmd.Token.DETECT, (img_latest, cur_detect_thresh, cur_simpfilter_thresh, cur_adaptfilter_thresh, cur_adaptfilter_radius, filter_mode, self.overlay)))
             elif (fsm_state == MainController.FsmState.AWAIT_ACTUATOR):
                 actuator_resp = self.endpoint_actuator.check_for_resp(self.pending_op_id_actuator)
                 if (actuator_resp is not None):
                     self.pending_op_id_actuator = None
                     MainController.validate_op_obj(actuator_resp, ActuatorResp, (ActuatorResp.Token.OK,))
                     target_cur = target_req
-                    fsm_state = MainController.FsmState.ACQUIRE_IMAGE
+                    fsm_state = fsm_state_cycle
+                elif not self.endpoint_actuator.is_pending(self.pending_op_id_actuator):
+                    # expired; target_cur is unchanged, so the target is resent with the next result
+                    self.pending_op_id_actuator = None
+                    fsm_state = fsm_state_cycle
             elif (fsm_state == MainController.FsmState.TERMINATE):
                 break
             else:
                 raise CcException('MainController encountered unexpected FsmState: ' + str(fsm_state))
+            # handle a detection result (either mode)
+            if result_tup is not None:
+                (detection_result, img_timestamp, dc_call_ms) = result_tup
+                dc_y_mm = detection_result.y_mm
+
+                if ((cc_mode == CcMode.AUTO) and (dc_y_mm is not None)):
+                    target_req = MainController.calc_act_mm_from_dc_mm(dc_y_mm)
+                num_full_cycles += 1
+                run_dur_s = (time.monotonic() - ts_start)
+                ips = num_full_cycles / run_dur_s
+                img_age_ms = (time.time() - img_timestamp) * 1000
+                if ((target_cur is None) or (target_cur == MainController.TARGET_STOP)):
+                    target_str = 'STOP'
+                else:
+                    target_str = '{0:.1f}'.format(target_cur)
+                cc_status = CcStatus(cc_mode, cur_detect_thresh, cur_simpfilter_thresh, cur_adaptfilter_thresh, cur_adaptfilter_radius, filter_mode, ips, dc_call_ms, img_age_ms, dc_y_mm, target_str, detection_result.img)
+                if actuator_async:
+                    # actuator is serviced below
+                    pass
+                elif (target_req != target_cur):
+                    if (target_req == MainController.TARGET_STOP):
+                        self.pending_op_id_actuator = self.endpoint_actuator.send_cmd_async(ActuatorCmd(ActuatorCmd.Token.STOP_MOTOR, ()))
+                    else:
+                        self.pending_op_id_actuator = self.endpoint_actuator.send_cmd_async(ActuatorCmd(ActuatorCmd.Token.SET_TARGET_MM, (target_req,)))
+                    if (self.pending_op_id_actuator is not None):
+                        fsm_state = MainController.FsmState.AWAIT_ACTUATOR
+                    else:
+                        fsm_state = fsm_state_cycle		# retried with the next result
+                else:
+                    fsm_state = fsm_state_cycle
+            # overlapped mode: service the actuator without blocking the cycle; at most one command is in
+            # flight, and once it completes only the newest target_req is sent (intermediate targets are dropped)
+            if (actuator_async and (fsm_state == fsm_state_cycle) and (fsm_state != MainController.FsmState.ACQUIRE_IMAGE)):
+                if (self.pending_op_id_actuator is not None):
+                    actuator_resp = self.endpoint_actuator.check_for_resp(self.pending_op_id_actuator)
+                    if (actuator_resp is not None):
+                        self.pending_op_id_actuator = None
+                        MainController.validate_op_obj(actuator_resp, ActuatorResp, (ActuatorResp.Token.OK,))
+                        target_cur = target_sent
+                    elif not self.endpoint_actuator.is_pending(self.pending_op_id_actuator):
+                        self.pending_op_id_actuator = None		# expired; target_req is resent below
+                if ((self.pending_op_id_actuator is None) and (target_req != target_cur)):
+                    if (target_req == MainController.TARGET_STOP):
+                        self.pending_op_id_actuator = self.endpoint_actuator.send_cmd_async(ActuatorCmd(ActuatorCmd.Token.STOP_MOTOR, ()))
+                    else:
+                        self.pending_op_id_actuator = self.endpoint_actuator.send_cmd_async(ActuatorCmd(ActuatorCmd.Token.SET_TARGET_MM, (target_req,)))
+                    if (self.pending_op_id_actuator is not None):
+                        target_sent = target_req
             # handle any incoming commands
             tup = self.endpoint.get_cmd(False)
             if tup is not None:
@@ -222,7 +371,13 @@ class MainController(Controller):
                         self.resp_error(cmd_op_id)
                     else:
                         ts_start = time.monotonic()
-                        fsm_state = MainController.FsmState.ACQUIRE_IMAGE
+                        if self.endpoint_detection_event is not None:
+                            # START_STREAM is sent (and retried) by the STREAMING state
+                            stream_start_pending = True
+                            fsm_state_cycle = MainController.FsmState.STREAMING
+                        elif actuator_async:
+                            fsm_state_cycle = MainController.FsmState.OVERLAPPED
+                        fsm_state = fsm_state_cycle
                     self.resp_ok(cmd_op_id)
                 elif (cmd.token == MainCmd.Token.IS_READY):
                     if (fsm_state != MainController.FsmState.STARTING):
@@ -253,37 +408,47 @@ class MainController(Controller):
                         #self.resp_error(cmd_op_id)
                         raise CcException('MainController received unexpected SET_DETECT_THRESH parameter')
                     cur_detect_thresh = cmd.params[0]
+                    detect_params_dirty = True
                     self.resp_ok(cmd_op_id)
                 elif (cmd.token == MainCmd.Token.SET_SIMPFILTER_THRESH):
                     if not isinstance(cmd.params[0], int):
                         #self.resp_error(cmd_op_id)
                         raise CcException('MainController received unexpected SET_SIMPFILTER_THRESH parameter')
                     cur_simpfilter_thresh = cmd.params[0]
+                    detect_params_dirty = True
                     self.resp_ok(cmd_op_id)
                 elif (cmd.token == MainCmd.Token.SET_ADAPTFILTER_THRESH):
                     if not isinstance(cmd.params[0], float):
                         #self.resp_error(cmd_op_id)
                         raise CcException('MainController received unexpected SET_ADAPTFILTER_THRESH parameter')
                     cur_adaptfilter_thresh = cmd.params[0]
+                    detect_params_dirty = True
                     self.resp_ok(cmd_op_id)
                 elif (cmd.token == MainCmd.Token.SET_ADAPTFILTER_RADIUS):
                     if not isinstance(cmd.params[0], int):
                         #self.resp_error(cmd_op_id)
                         raise CcException('MainController received unexpected SET_ADAPTFILTER_RADIUS parameter')
                     cur_adaptfilter_radius = cmd.params[0]
+                    detect_params_dirty = True
                     self.resp_ok(cmd_op_id)
                 elif (cmd.token == MainCmd.Token.SET_FILTER_MODE):
                     if not isinstance(cmd.params[0], FilterMode):
                         #self.resp_error(cmd_op_id)
                         raise CcException('MainController received unexpected SET_FILTER_MODE parameter')
                     filter_mode = cmd.params[0]
+                    detect_params_dirty = True
                     self.resp_ok(cmd_op_id)
                 else:
                     #self.resp_error(cmd_op_id)
                     raise CcException('MainController received unexpected MainCmd')
-            # handle any incoming joystick events
-            event = self.endpoint_joystick_event.check_for_event()
-            if event is not None:
+            # handle all pending joystick events: positions are applied in order (so the newest wins) and
+            # every BUTTON_DOWN is kept, so a fast stick sweep never leaves stale positions queued
+            num_joystick_events = 0
+            while True:
+                event = self.endpoint_joystick_event.check_for_event()
+                if event is None:
+                    break
+                num_joystick_events += 1
                 MainController.validate_op_obj(event, JoystickEvent, (JoystickEvent.Token.BUTTON_DOWN, JoystickEvent.Token.POSITION))
                 if (event.token == JoystickEvent.Token.BUTTON_DOWN):
                     if cc_mode == CcMode.AUTO:
@@ -303,12 +468,29 @@ class MainController(Controller):
                             target_req = Const.ACTUATOR_STROKE_MM
                         else:
                             target_req = 0
-            # pace iteration
-            # TODO: possible precision/boundary issue here?
-            elapsed = time.monotonic() - last_loop
-            if (elapsed < Const.MAIN_CONTROLLER_MIN_PERIOD_S):
-                time.sleep(Const.MAIN_CONTROLLER_MIN_PERIOD_S - elapsed)
-            last_loop = time.monotonic()
+            # wait for the next message, but only after an idle iteration: if anything happened (state change,
+            # command sent or response consumed, command/event/result handled), the next iteration may have
+            # work to do without new input.  the bounded wait keeps timeouts (e.g. video) serviced.
+            idle = (
+                (fsm_state == fsm_state_begin) and
+                (self.pending_op_ids() == pending_begin) and
+                (result_tup is None) and
+                (tup is None) and
+                (num_joystick_events == 0)
+            )
+            if idle:
+                Endpoint.wait_any(rx_endpoints, Const.MAIN_CONTROLLER_MAX_WAIT_S)
+        # stop streaming, so that DetectionController is idle before the actuator is shut down
+        if (fsm_state_cycle == MainController.FsmState.STREAMING):
+            print('MainController stopping detection stream...')
+            if (self.pending_op_id_detection is not None):
+                self.endpoint_detection.abandon(self.pending_op_id_detection)
+                self.pending_op_id_detection = None
+            resp = self.endpoint_detection.send_cmd_sync(DetectionCmd(DetectionCmd.Token.STOP_STREAM, ()), Const.CMD_SYNC_TIMEOUT_MS)
+            if resp is None:
+                print('Warning: timed out waiting for DetectionController response to STOP_STREAM command')
+            else:
+                MainController.validate_op_obj(resp, DetectionResp, (DetectionResp.Token.OK,))
         # retract actuator
         print('MainController retracting actuator...')
         resp = self.endpoint_actuator.send_cmd_sync(ActuatorCmd(ActuatorCmd.Token.SET_TARGET_MM, (0,)), Const.CMD_SYNC_TIMEOUT_MS)
@@ -347,6 +529,20 @@ class MainController(Controller):
         else:
             MainController.validate_op_obj(resp, VideoResp, (VideoResp.Token.OK,))
 
+    def pending_op_ids(self):
+        return (self.pending_op_id_actuator, self.pending_op_id_detection, self.pending_op_id_joystick, self.pending_op_id_video)
+
+    # pipeline mode: drains the detection event queue, returning only the newest event (or None)
+    def check_for_latest_detection_event(self):
+        latest = None
+        while True:
+            event = self.endpoint_detection_event.check_for_event()
+            if event is None:
+                break
+            MainController.validate_op_obj(event, DetectionEvent, (DetectionEvent.Token.RESULT,))
+            latest = event
+        return latest
+
     @staticmethod
     def calc_act_mm_from_dc_mm(dc_y_mm):
         act_mm = Const.CALIBRATION_ACTUATOR_MM_AT_Y_ORIGIN - dc_y_mm
@@ -0,0 +1,138 @@
+# coding=utf-8
+
+import os
+import random
+import time
+import numpy
+import PIL.Image
+
+from .camera import Camera
+from .const import Const
+from .exceptions import CameraException
+
+
+# camera backend that plays back recorded frames (CameraBackend.PLAYBACK), so that the video -> detection ->
+# actuator loop can run without the camera
+#
+# CAMERA_PLAYBACK_PATH is one of:
+#   .npy file        N x CAMERA_HEIGHT x CAMERA_WIDTH uint8 array (or a single frame), memory-mapped
+#   .npz file        'frames' array as above, plus optional 'timestamps' (N capture times in seconds)
+#   directory        .npy frames and/or image files, played in filename order
+# the sequence loops.  frames are paced by the recorded timestamps (which must be strictly increasing)
+# when present, else at CAMERA_PLAYBACK_FPS with gaussian jitter of CAMERA_PLAYBACK_JITTER_MS; each frame
+# is reported incomplete with probability CAMERA_PLAYBACK_INCOMPLETE_PROB.  as with the camera's NewestOnly
+# buffer handling, frames that arrive while the previous one is still unread are lost (counted as skipped)
+class PlaybackCam(Camera):
+
+    IMG_EXTS = ('.bmp', '.jpg', '.jpeg', '.png', '.tif', '.tiff')
+
+    def __init__(self, path=None):
+        self.path = Const.CAMERA_PLAYBACK_PATH if (path is None) else path
+        self.frames = None
+        self.intervals = None
+        self.rng = random.Random(Const.CAMERA_PLAYBACK_SEED)
+        self.acquiring = False
+        self.frame_num = -1
+        self.interval_num = 0
+        self.next_frame_ts = None
+        self.num_frames = 0
+        self.num_skipped = 0
+        self.num_incomplete = 0
+
+    def init(self):
+        if self.path is None:
+            raise CameraException('PlaybackCam init failed: no CAMERA_PLAYBACK_PATH')
+        try:
+            (self.frames, timestamps) = PlaybackCam.load(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            raise CameraException('PlaybackCam init failed: %s: %s' % (type(e).__name__, e))
+        if (len(self.frames) == 0):
+            raise CameraException('PlaybackCam init failed: no frames in ' + self.path)
+        for frame in (self.frames if isinstance(self.frames, list) else self.frames[:1]):
+            if ((frame.shape != (Const.CAMERA_HEIGHT, Const.CAMERA_WIDTH)) or (frame.dtype != numpy.uint8)):
+                raise CameraException('PlaybackCam init failed: frames must be ' + str(Const.CAMERA_HEIGHT) + ' x ' +
+                    str(Const.CAMERA_WIDTH) + ' uint8, not ' + str(frame.shape) + ' ' + str(frame.dtype))
+        if timestamps is not None:
+            if (len(timestamps) != len(self.frames)):
+                raise CameraException('PlaybackCam init failed: ' + str(len(timestamps)) + ' timestamps for ' + str(len(self.frames)) + ' frames')
+            intervals = numpy.diff(numpy.asarray(timestamps, dtype=numpy.float64))
+            if (len(intervals) > 0):
+                if not (intervals.min() > 0):
+                    raise CameraException('PlaybackCam init failed: timestamps must be strictly increasing')
+                # the median interval closes the loop from the last frame back to the first
+                self.intervals = list(intervals) + [float(numpy.median(intervals))]
+        print('PlaybackCam: ' + str(len(self.frames)) + ' frames from ' + self.path + ' (' +
+            ('recorded timing' if (self.intervals is not None) else (str(Const.CAMERA_PLAYBACK_FPS) + ' fps')) + ')')
+
+    def deinit(self):
+        print('PlaybackCam: ' + str(self.num_frames) + ' frames delivered (' + str(self.num_incomplete) +
+            ' incomplete), ' + str(self.num_skipped) + ' skipped')
+        self.frames = None
+
+    def begin_acquisition(self):
+        self.acquiring = True
+        self.next_frame_ts = time.monotonic() + self.__next_interval()
+
+    def end_acquisition(self):
+        self.acquiring = False
+
+    def get_next_raw_image(self):
+        if not self.acquiring:
+            raise CameraException('acquisition not started')
+        now = time.monotonic()
+        if (self.next_frame_ts > now):
+            time.sleep(self.next_frame_ts - now)
+            now = time.monotonic()
+        # deliver the newest frame that has arrived; after falling behind by a whole loop of the sequence,
+        # the schedule restarts from now
+        num_skipped = 0
+        while True:
+            self.frame_num += 1
+            self.next_frame_ts += self.__next_interval()
+            if (self.next_frame_ts > now):
+                break
+            if (num_skipped == len(self.frames)):
+                self.next_frame_ts = now
+                break
+            num_skipped += 1
+        self.num_skipped += num_skipped
+        self.num_frames += 1
+        if (self.rng.random() < Const.CAMERA_PLAYBACK_INCOMPLETE_PROB):
+            self.num_incomplete += 1
+            return None
+        return self.frames[self.frame_num % len(self.frames)]
+
+    def __next_interval(self):
+        if self.intervals is not None:
+            interval = self.intervals[self.interval_num % len(self.intervals)]
+            self.interval_num += 1
+            return interval
+        return max(0, self.rng.gauss((1 / Const.CAMERA_PLAYBACK_FPS), (Const.CAMERA_PLAYBACK_JITTER_MS / 1000)))
+
+    # returns (frames, timestamps); frames is a 3-d ndarray or a list of 2-d ones, timestamps may be None
+    @staticmethod
+    def load(path):
+        if os.path.isdir(path):
+            frames = []
+            for fn in sorted(os.listdir(path)):
+                ext = os.path.splitext(fn)[1].lower()
+                if (ext == '.npy'):
+                    frames.extend(PlaybackCam.split_frames(numpy.load(os.path.join(path, fn))))
+                elif ext in PlaybackCam.IMG_EXTS:
+                    with PIL.Image.open(os.path.join(path, fn)) as img:
+                        frames.append(numpy.asarray(img.convert(Const.DETECTION_PIL_IMG_MODE)))
+            return (frames, None)
+        if path.lower().endswith('.npz'):
+            with numpy.load(path) as npz:
+                timestamps = npz['timestamps'] if ('timestamps' in npz.files) else None
+                return (PlaybackCam.split_frames(npz['frames']), timestamps)
+        return (PlaybackCam.split_frames(numpy.load(path, mmap_mode='r')), None)
+
+    # a single 2-d frame becomes a one-frame list; a 3-d array is indexed frame by frame as is
+    @staticmethod
+    def split_frames(arr):
+        if (arr.ndim == 2):
+            return [arr]
+        if (arr.ndim != 3):
+            raise ValueError('expected 2-d or 3-d frame array, got ' + str(arr.ndim) + '-d')
+        return arr
@@ -1,13 +1,13 @@
 # coding=utf-8
 
-import PIL.Image
 import PySpin
 
+from .camera import Camera
 from .const import Const
 from .exceptions import SpinCamException
 
 
-class SpinCam(object):
+class SpinCam(Camera):
 
     def __init__(self):
         self.spin_system = None
@@ -107,9 +107,7 @@ class SpinCam(object):
         except PySpin.SpinnakerException as e:
             raise SpinCamException('SpinnakerException: %s' % e)
 
-    # returns next image as a processed PIL image
-    # returns None if image is incomplete
-    def get_next_image(self):
+    def get_next_raw_image(self):
         try:
             img_result = self.spin_cam.GetNextImage()
         except PySpin.SpinnakerException as e:
@@ -126,9 +124,7 @@ class SpinCam(object):
 #        # TODO: check PixelFormat?
         # release image (Spinnaker docs don't make it clear why this is only required on success)
         img_result.Release()
-        img_pil = PIL.Image.fromarray(img_ndarray, mode=Const.DETECTION_PIL_IMG_MODE)
-        img_pil_resized = img_pil.resize((Const.DETECTION_IMG_DIM, Const.DETECTION_IMG_DIM), Const.DETECTION_PIL_RESAMP)
-        return img_pil_resized
+        return img_ndarray
 
     @staticmethod
     def geni_set_int(nodemap, node_name, value):
@@ -2,10 +2,12 @@
 
 import time
 
+from .camera_backend import CameraBackend
+from .const import Const
 from .controller import Controller
-from .exceptions import SpinCamException
+from .exceptions import CameraException
 from .exceptions import VideoException
-from .spin_cam import SpinCam
+from .playback_cam import PlaybackCam
 from .video_image import VideoImage
 from .ipc.endpoint import Endpoint
 from .ipc.video_cmd import VideoCmd
@@ -14,31 +16,47 @@ from .ipc.video_resp import VideoResp
 
 class VideoController(Controller):
 
+    # params: (frame_ring, frame_signal); frame_ring may be None, in which case images are pickled into
+    # responses; frame_signal (pipeline mode, may be None) is notified after each frame is written to the ring
     def __init__(self, endpoint, params):
         super().__init__(endpoint, params)
+        self.frame_ring = self.params[0]
+        self.frame_signal = self.params[1]
         self.img_latest = None
-        self.spin_cam   = None
+        self.camera     = None
 
     def init(self):
         self.img_latest = VideoImage(None, None)
-        self.spin_cam = SpinCam()
+        if (Const.CAMERA_BACKEND == CameraBackend.PLAYBACK):
+            self.camera = PlaybackCam()
+        else:
+            # PySpin is only required for the FLIR camera
+            from .spin_cam import SpinCam
+            self.camera = SpinCam()
         try:
-            self.spin_cam.init()
-        except SpinCamException as e:
+            self.camera.init()
+        except CameraException as e:
             self.deinit()
-            raise VideoException('VideoController init failed: SpinCamException: %s' % e)
+            raise VideoException('VideoController init failed: %s: %s' % (type(e).__name__, e))
 
     def deinit(self):
-        self.spin_cam.deinit()
+        self.camera.deinit()
+        print('VideoController responses: ' + str(self.endpoint.get_send_stats()))
         # shutdown all queues that we write to
         Endpoint.shutdown_queue(self.endpoint.txq)
         # delete refs
         del self.img_latest
-        del self.spin_cam
+        del self.camera
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+        if self.frame_signal is not None:
+            self.frame_signal.close()
+        del self.frame_ring
+        del self.frame_signal
 
-    # TODO: catch/handle SpinCamException
+    # TODO: catch/handle CameraException
     def start(self):
-        self.spin_cam.begin_acquisition()
+        self.camera.begin_acquisition()
         while True:
             tup = self.endpoint.get_cmd(False)
             if tup is not None:
@@ -56,10 +74,17 @@ class VideoController(Controller):
                 else:
                     self.endpoint.send_resp(cmd_op_id, VideoResp(VideoResp.Token.ERROR, ()))
                     raise VideoException('VideoController received unexpected command')
-            img_pil = self.spin_cam.get_next_image()
+            imgs = self.camera.get_next_images()
             img_time = time.time()
-            if img_pil is not None:
-                self.img_latest = VideoImage(img_pil, img_time)
+            if imgs is not None:
+                (img_raw, img_pil) = imgs
+                if self.frame_ring is not None:
+                    # only the slot reference is sent to consumers
+                    self.img_latest = self.frame_ring.write(img_pil, img_time, img_raw)
+                    if self.frame_signal is not None:
+                        self.frame_signal.notify()
+                else:
+                    self.img_latest = VideoImage(img_pil, img_time)
             else:
                 # TODO: log
                 #print('image incomplete; image status = %d' % img_result.GetImageStatus())
@@ -77,7 +102,7 @@ class VideoController(Controller):
             controller.start()
         except VideoException as e:
             print('VideoException: ' + str(e))
-        controller.spin_cam.end_acquisition()
+        controller.camera.end_acquisition()
         print('deinitializing VideoController...')
         controller.deinit()
         print('exiting VideoController worker...')
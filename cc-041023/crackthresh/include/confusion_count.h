@@ -0,0 +1,32 @@
+#ifndef CONFUSION_COUNT_H
+#define CONFUSION_COUNT_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+#include "point_sink.h"
+
+
+// scores filter points against a truth bitmap (nonzero == crack pixel) of the same geometry as the
+// filtered image; points must be added with an origin of (0, 0)
+class ConfusionCount : public PointSink {
+
+	public:
+		ConfusionCount(const unsigned char *mask, ptrdiff_t mask_stride, int64_t mask_total);
+		~ConfusionCount();
+		bool add(const int x, const int y);
+		int64_t get_tp();
+		int64_t get_fp();
+		int64_t get_fn();
+
+	private:
+		const unsigned char *mask;
+		ptrdiff_t mask_stride;
+		int64_t mask_total;
+		int64_t tp;
+		int64_t fp;
+
+};
+
+#endif
+
@@ -1,13 +1,17 @@
 #ifndef FILTER_H
 #define FILTER_H
 
-#include "point_set.h"
+#include <stddef.h>
+
+#include "integral_image.h"
+#include "point_sink.h"
 
 
 namespace filter {
 
-bool filter_simple(PointSet *ptset, const unsigned char *img, int width, int height, int x_origin, int y_origin, int thresh);
-bool filter_adaptive(PointSet *ptset, const unsigned char *img, int width, int height, int x_origin, int y_origin, float thresh, int radius);
+bool filter_simple(PointSink *ptset, const unsigned char *img, int width, int height, ptrdiff_t stride, int x_origin, int y_origin, int thresh);
+bool filter_adaptive(PointSink *ptset, const unsigned char *img, int width, int height, ptrdiff_t stride, int x_origin, int y_origin, float thresh, int radius);
+bool filter_adaptive(PointSink *ptset, const IntegralImage *img_int, int x_origin, int y_origin, float thresh, int radius);
 
 }
 
@@ -0,0 +1,43 @@
+#ifndef INTEGRAL_IMAGE_H
+#define INTEGRAL_IMAGE_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include <vector>
+
+
+// reusable integral image workspace
+//
+// The table is row-major with a leading row and column of zeros, so that rect_sum() needs no bounds
+// checks.  Entries are uint32, which holds the sum of up to 16.8 million 8-bit pixels.  Storage is
+// reused across build() calls and only grows, so successive frames of the same size allocate nothing.
+class IntegralImage {
+
+	public:
+		IntegralImage();
+		~IntegralImage();
+		bool build(const unsigned char *img, int width, int height, ptrdiff_t stride);
+		int get_width() const;
+		int get_height() const;
+		inline unsigned char pixel(int x, int y) const {
+			return pixels[((size_t)y * width) + x];
+		}
+		// sum of the pixels in the inclusive rectangle (x1, y1)-(x2, y2)
+		inline int64_t rect_sum(int x1, int y1, int x2, int y2) const {
+			const size_t row_len = (size_t)width + 1;
+			return (int64_t)sums[((size_t)(y2 + 1) * row_len) + (x2 + 1)]
+				- (int64_t)sums[((size_t)(y1    ) * row_len) + (x2 + 1)]
+				- (int64_t)sums[((size_t)(y2 + 1) * row_len) + (x1    )]
+				+ (int64_t)sums[((size_t)(y1    ) * row_len) + (x1    )];
+		}
+
+	private:
+		int width;
+		int height;
+		std::vector<unsigned char> pixels;
+		std::vector<uint32_t> sums;
+
+};
+
+#endif
+
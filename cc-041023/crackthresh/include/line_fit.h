@@ -0,0 +1,29 @@
+#ifndef LINE_FIT_H
+#define LINE_FIT_H
+
+#include <stdint.h>
+
+#include "point_sink.h"
+
+
+// accumulates the sums needed for a least-squares line fit (y = m*x + b) without storing any points
+class LineFit : public PointSink {
+
+	public:
+		LineFit();
+		~LineFit();
+		bool add(const int x, const int y);
+		int64_t count();
+		bool solve(double *m, double *b);
+
+	private:
+		int64_t n;
+		int64_t sum_x;
+		int64_t sum_y;
+		int64_t sum_xy;
+		int64_t sum_xx;
+
+};
+
+#endif
+
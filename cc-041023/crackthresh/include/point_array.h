@@ -0,0 +1,28 @@
+#ifndef POINT_ARRAY_H
+#define POINT_ARRAY_H
+
+#include <Python.h>
+#include <stdint.h>
+#include <vector>
+
+#include "point_sink.h"
+
+
+// collects points into preallocated contiguous int32 buffers (no per-point Python allocation)
+class PointArray : public PointSink {
+
+	public:
+		PointArray(const int capacity);
+		~PointArray();
+		bool add(const int x, const int y);
+		Py_ssize_t size();
+		PyObject* get_data();
+
+	private:
+		std::vector<int32_t> xvec;
+		std::vector<int32_t> yvec;
+
+};
+
+#endif
+
@@ -3,8 +3,10 @@
 
 #include <Python.h>
 
+#include "point_sink.h"
 
-class PointSet {
+
+class PointSet : public PointSink {
 
 	public:
 		PointSet();
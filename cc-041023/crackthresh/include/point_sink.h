@@ -0,0 +1,14 @@
+#ifndef POINT_SINK_H
+#define POINT_SINK_H
+
+
+// abstract destination for the points that pass a filter
+class PointSink {
+
+	public:
+		virtual ~PointSink() {}
+		virtual bool add(const int x, const int y) = 0;
+
+};
+
+#endif
@@ -0,0 +1,15 @@
+#ifndef SWEEP_H
+#define SWEEP_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+
+namespace sweep {
+
+bool sweep_simple(const unsigned char *img, int width, int height, ptrdiff_t stride, const unsigned char *mask, ptrdiff_t mask_stride, const int *threshs, int num_threshs, int64_t *counts);
+bool sweep_adaptive(const unsigned char *img, int width, int height, ptrdiff_t stride, const unsigned char *mask, ptrdiff_t mask_stride, const int *radii, int num_radii, const float *threshs, int num_threshs, int64_t *counts);
+
+}
+
+#endif
@@ -1,9 +1,11 @@
 from distutils.core import setup, Extension
 
+import numpy
+
 crackthresh_module = Extension(
     name = 'crackthresh',
-    sources = ['src/crackthresh_module.cpp', 'src/point_set.cpp', 'src/filter.cpp'],
-    include_dirs = ['include']
+    sources = ['src/crackthresh_module.cpp', 'src/point_set.cpp', 'src/point_array.cpp', 'src/line_fit.cpp', 'src/integral_image.cpp', 'src/confusion_count.cpp', 'src/sweep.cpp', 'src/filter.cpp'],
+    include_dirs = ['include', numpy.get_include()]
 )
 
 setup (
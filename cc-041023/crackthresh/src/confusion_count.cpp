@@ -0,0 +1,35 @@
+
+#include "confusion_count.h"
+
+
+// mask_total is the number of nonzero mask pixels
+ConfusionCount::ConfusionCount(const unsigned char *mask, ptrdiff_t mask_stride, int64_t mask_total) {
+	this->mask = mask;
+	this->mask_stride = mask_stride;
+	this->mask_total = mask_total;
+	tp = 0;
+	fp = 0;
+}
+
+ConfusionCount::~ConfusionCount() {
+}
+
+bool ConfusionCount::add(const int x, const int y) {
+	if (mask[(y * mask_stride) + x] != 0)
+		tp += 1;
+	else
+		fp += 1;
+	return true;
+}
+
+int64_t ConfusionCount::get_tp() {
+	return tp;
+}
+
+int64_t ConfusionCount::get_fp() {
+	return fp;
+}
+
+int64_t ConfusionCount::get_fn() {
+	return mask_total - tp;
+}
@@ -1,25 +1,66 @@
 
 #define PY_SSIZE_T_CLEAN
+#define PY_ARRAY_UNIQUE_SYMBOL crackthresh_ARRAY_API
+#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
 
 #include <stdio.h>
+#include <string.h>
+#include <new>
+#include <vector>
 #include <Python.h>
 
+#include <numpy/arrayobject.h>
+
 #include "filter.h"
+#include "integral_image.h"
+#include "line_fit.h"
+#include "point_array.h"
 #include "point_set.h"
+#include "sweep.h"
 
 
 static PyObject *crackthresh_error;
 
+// acquires a view of an 8-bit grayscale image from any buffer-protocol object: either a flat, contiguous
+// buffer of width*height bytes (e.g. bytes) or a 2-D (height, width) buffer with contiguous rows and an
+// arbitrary row stride (e.g. a cropped NumPy view), so no copy is needed
+//
+// returns false with an exception set on error; on success, the caller must PyBuffer_Release() the view
+//
+// allow_bool additionally accepts boolean data (e.g. a NumPy bool mask)
+static bool get_image(PyObject *obj, Py_buffer *view, int width, int height, Py_ssize_t *stride, bool allow_bool = false) {
+	if (PyObject_GetBuffer(obj, view, PyBUF_STRIDES | PyBUF_FORMAT) != 0)
+		return false;
+	bool format_ok = ((view->format == NULL) || (strcmp(view->format, "B") == 0) || (allow_bool && (strcmp(view->format, "?") == 0)));
+	if ((view->itemsize != 1) || (!format_ok)) {
+		PyBuffer_Release(view);
+		PyErr_SetString(PyExc_ValueError, "invalid argument: img (expected unsigned 8-bit data)");
+		return false;
+	}
+	if ((view->ndim == 1) && (view->shape[0] == ((Py_ssize_t)width * height)) && (view->strides[0] == 1)) {
+		*stride = width;
+		return true;
+	}
+	if ((view->ndim == 2) && (view->shape[0] == height) && (view->shape[1] == width) && (view->strides[1] == 1)) {
+		*stride = view->strides[0];
+		return true;
+	}
+	char msg[256];
+	sprintf(msg, "invalid argument: img (ndim==%d, len==%ld, width==%d, height==%d)", view->ndim, (long)(view->len), width, height);
+	PyBuffer_Release(view);
+	PyErr_SetString(PyExc_ValueError, msg);
+	return false;
+}
+
 static PyObject* crackthresh_filter_simple(PyObject *self, PyObject *args) {
-	const unsigned char *img;
-	Py_ssize_t count;
+	PyObject *img_obj;
 	int width;
 	int height;
 	int x_origin;
 	int y_origin;
 	int thresh;
 	// parse and validate args
-	if (!PyArg_ParseTuple(args, "y#iiiii", &img, &count, &width, &height, &x_origin, &y_origin, &thresh))
+	if (!PyArg_ParseTuple(args, "Oiiiii", &img_obj, &width, &height, &x_origin, &y_origin, &thresh))
 		return NULL;
 	if (width < 0) {
 		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
@@ -29,18 +70,18 @@ static PyObject* crackthresh_filter_simple(PyObject *self, PyObject *args) {
 		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
 		return NULL;
 	}
-	if (count != (width * height)) {
-		char msg[256];
-		sprintf(msg, "invalid argument: img (len==%ld, width==%d, height==%d)", count, width, height);
-		PyErr_SetString(PyExc_ValueError, msg);
-		return NULL;
-	}
 	if ((thresh < 0) || (thresh > 255)) {
 		PyErr_SetString(PyExc_ValueError, "invalid argument: thresh");
 		return NULL;
 	}
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride))
+		return NULL;
+	// PointSet builds Python lists, so the GIL must be held here
 	PointSet ptset;
-	bool res = filter::filter_simple(&ptset, img, width, height, x_origin, y_origin, thresh);
+	bool res = filter::filter_simple(&ptset, (const unsigned char *)img.buf, width, height, stride, x_origin, y_origin, thresh);
+	PyBuffer_Release(&img);
 	if (!res) {
 		PyErr_SetString(crackthresh_error, "filter_simple failed");
 		return NULL;
@@ -58,8 +99,7 @@ static PyObject* crackthresh_filter_simple(PyObject *self, PyObject *args) {
 }
 
 static PyObject* crackthresh_filter_adaptive(PyObject *self, PyObject *args) {
-	const unsigned char *img;
-	Py_ssize_t count;
+	PyObject *img_obj;
 	int width;
 	int height;
 	int x_origin;
@@ -67,7 +107,7 @@ static PyObject* crackthresh_filter_adaptive(PyObject *self, PyObject *args) {
 	float thresh;
 	int radius;
 	// parse and validate args
-	if (!PyArg_ParseTuple(args, "y#iiiifi", &img, &count, &width, &height, &x_origin, &y_origin, &thresh, &radius))
+	if (!PyArg_ParseTuple(args, "Oiiiifi", &img_obj, &width, &height, &x_origin, &y_origin, &thresh, &radius))
 		return NULL;
 
 	if (width < 0) {
@@ -78,12 +118,6 @@ static PyObject* crackthresh_filter_adaptive(PyObject *self, PyObject *args) {
 		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
 		return NULL;
 	}
-	if (count != (width * height)) {
-		char msg[256];
-		sprintf(msg, "invalid argument: img (len==%ld, width==%d, height==%d)", count, width, height);
-		PyErr_SetString(PyExc_ValueError, msg);
-		return NULL;
-	}
 // TEMP commented out to allow for negative values
 //	if ((thresh < (float)0) || (thresh > (float)1)) {
 //		PyErr_SetString(PyExc_ValueError, "invalid argument: thresh");
@@ -93,8 +127,14 @@ static PyObject* crackthresh_filter_adaptive(PyObject *self, PyObject *args) {
 		PyErr_SetString(PyExc_ValueError, "invalid argument: radius");
 		return NULL;
 	}
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride))
+		return NULL;
+	// PointSet builds Python lists, so the GIL must be held here
 	PointSet ptset;
-	bool res = filter::filter_adaptive(&ptset, img, width, height, x_origin, y_origin, thresh, radius);
+	bool res = filter::filter_adaptive(&ptset, (const unsigned char *)img.buf, width, height, stride, x_origin, y_origin, thresh, radius);
+	PyBuffer_Release(&img);
 	if (!res) {
 		PyErr_SetString(crackthresh_error, "filter_adaptive failed");
 		return NULL;
@@ -111,18 +151,632 @@ static PyObject* crackthresh_filter_adaptive(PyObject *self, PyObject *args) {
 	return result;
 }
 
+// builds the (x_vals, y_vals, xy_vals) result tuple from a PointArray: x_vals and y_vals are contiguous
+// int32 arrays of length N, and xy_vals is an (N, 2) view of the same buffer
+static PyObject* build_array_result(PointArray *ptarr) {
+	PyObject *data = ptarr->get_data();
+	if (data == NULL)
+		return NULL;
+	PyObject *xdata = PySequence_GetItem(data, 0);
+	PyObject *ydata = PySequence_GetItem(data, 1);
+	PyObject *xydata = PyArray_Transpose((PyArrayObject *)data, NULL);
+	Py_DECREF(data);
+	if ((xdata == NULL) || (ydata == NULL) || (xydata == NULL)) {
+		Py_XDECREF(xdata);
+		Py_XDECREF(ydata);
+		Py_XDECREF(xydata);
+		return NULL;
+	}
+	// "N" steals the references
+	return Py_BuildValue("NNN", xdata, ydata, xydata);
+}
+
+static PyObject* crackthresh_filter_simple_array(PyObject *self, PyObject *args) {
+	PyObject *img_obj;
+	int width;
+	int height;
+	int x_origin;
+	int y_origin;
+	int thresh;
+	// parse and validate args
+	if (!PyArg_ParseTuple(args, "Oiiiii", &img_obj, &width, &height, &x_origin, &y_origin, &thresh))
+		return NULL;
+	if (width < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
+		return NULL;
+	}
+	if (height < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: height");
+		return NULL;
+	}
+	if ((thresh < 0) || (thresh > 255)) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: thresh");
+		return NULL;
+	}
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride))
+		return NULL;
+	PointArray ptarr(width * height);
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = filter::filter_simple(&ptarr, (const unsigned char *)img.buf, width, height, stride, x_origin, y_origin, thresh);
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&img);
+	if (!res) {
+		PyErr_SetString(crackthresh_error, "filter_simple_array failed");
+		return NULL;
+	}
+	// prepare and return result
+	return build_array_result(&ptarr);
+}
+
+static PyObject* crackthresh_filter_adaptive_array(PyObject *self, PyObject *args) {
+	PyObject *img_obj;
+	int width;
+	int height;
+	int x_origin;
+	int y_origin;
+	float thresh;
+	int radius;
+	// parse and validate args
+	if (!PyArg_ParseTuple(args, "Oiiiifi", &img_obj, &width, &height, &x_origin, &y_origin, &thresh, &radius))
+		return NULL;
+	if (width < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
+		return NULL;
+	}
+	if (height < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: height");
+		return NULL;
+	}
+	if (radius < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: radius");
+		return NULL;
+	}
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride))
+		return NULL;
+	PointArray ptarr(width * height);
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = filter::filter_adaptive(&ptarr, (const unsigned char *)img.buf, width, height, stride, x_origin, y_origin, thresh, radius);
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&img);
+	if (!res) {
+		PyErr_SetString(crackthresh_error, "filter_adaptive_array failed");
+		return NULL;
+	}
+	// prepare and return result
+	return build_array_result(&ptarr);
+}
+
+// builds the (m, b_px, n_points) result tuple from a LineFit; m and b_px are None if the fit is undefined
+static PyObject* build_fit_result(LineFit *fit) {
+	double m;
+	double b;
+	long long num = (long long)fit->count();
+	if (!fit->solve(&m, &b))
+		return Py_BuildValue("OOL", Py_None, Py_None, num);
+	return Py_BuildValue("ddL", m, b, num);
+}
+
+static PyObject* crackthresh_fit_line_simple(PyObject *self, PyObject *args) {
+	PyObject *img_obj;
+	int width;
+	int height;
+	int x_origin;
+	int y_origin;
+	int thresh;
+	// parse and validate args
+	if (!PyArg_ParseTuple(args, "Oiiiii", &img_obj, &width, &height, &x_origin, &y_origin, &thresh))
+		return NULL;
+	if (width < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
+		return NULL;
+	}
+	if (height < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: height");
+		return NULL;
+	}
+	if ((thresh < 0) || (thresh > 255)) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: thresh");
+		return NULL;
+	}
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride))
+		return NULL;
+	LineFit fit;
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = filter::filter_simple(&fit, (const unsigned char *)img.buf, width, height, stride, x_origin, y_origin, thresh);
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&img);
+	if (!res) {
+		PyErr_SetString(crackthresh_error, "fit_line_simple failed");
+		return NULL;
+	}
+	// prepare and return result
+	return build_fit_result(&fit);
+}
+
+static PyObject* crackthresh_fit_line_adaptive(PyObject *self, PyObject *args) {
+	PyObject *img_obj;
+	int width;
+	int height;
+	int x_origin;
+	int y_origin;
+	float thresh;
+	int radius;
+	// parse and validate args
+	if (!PyArg_ParseTuple(args, "Oiiiifi", &img_obj, &width, &height, &x_origin, &y_origin, &thresh, &radius))
+		return NULL;
+	if (width < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
+		return NULL;
+	}
+	if (height < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: height");
+		return NULL;
+	}
+	if (radius < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: radius");
+		return NULL;
+	}
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride))
+		return NULL;
+	LineFit fit;
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = filter::filter_adaptive(&fit, (const unsigned char *)img.buf, width, height, stride, x_origin, y_origin, thresh, radius);
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&img);
+	if (!res) {
+		PyErr_SetString(crackthresh_error, "fit_line_adaptive failed");
+		return NULL;
+	}
+	// prepare and return result
+	return build_fit_result(&fit);
+}
+
+// parses a sequence of ints into a vector; returns false with an exception set on error
+static bool get_int_seq(PyObject *obj, std::vector<int> *vals, const char *name) {
+	PyObject *seq = PySequence_Fast(obj, name);
+	if (seq == NULL)
+		return false;
+	Py_ssize_t num = PySequence_Fast_GET_SIZE(seq);
+	for (Py_ssize_t i=0; i<num; ++i) {
+		long val = PyLong_AsLong(PySequence_Fast_GET_ITEM(seq, i));
+		if ((val == -1) && PyErr_Occurred()) {
+			Py_DECREF(seq);
+			return false;
+		}
+		vals->push_back((int)val);
+	}
+	Py_DECREF(seq);
+	return true;
+}
+
+// parses a sequence of floats into a vector; returns false with an exception set on error
+static bool get_float_seq(PyObject *obj, std::vector<float> *vals, const char *name) {
+	PyObject *seq = PySequence_Fast(obj, name);
+	if (seq == NULL)
+		return false;
+	Py_ssize_t num = PySequence_Fast_GET_SIZE(seq);
+	for (Py_ssize_t i=0; i<num; ++i) {
+		double val = PyFloat_AsDouble(PySequence_Fast_GET_ITEM(seq, i));
+		if ((val == -1.0) && PyErr_Occurred()) {
+			Py_DECREF(seq);
+			return false;
+		}
+		vals->push_back((float)val);
+	}
+	Py_DECREF(seq);
+	return true;
+}
+
+static PyObject* crackthresh_sweep_simple(PyObject *self, PyObject *args) {
+	PyObject *img_obj;
+	int width;
+	int height;
+	PyObject *threshs_obj;
+	PyObject *mask_obj;
+	// parse and validate args
+	if (!PyArg_ParseTuple(args, "OiiOO", &img_obj, &width, &height, &threshs_obj, &mask_obj))
+		return NULL;
+	if (width < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
+		return NULL;
+	}
+	if (height < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: height");
+		return NULL;
+	}
+	std::vector<int> threshs;
+	if (!get_int_seq(threshs_obj, &threshs, "invalid argument: thresholds"))
+		return NULL;
+	for (size_t i=0; i<threshs.size(); ++i) {
+		if ((threshs[i] < 0) || (threshs[i] > 255)) {
+			PyErr_SetString(PyExc_ValueError, "invalid argument: thresholds");
+			return NULL;
+		}
+	}
+	npy_intp dims[2] = {(npy_intp)threshs.size(), 3};
+	PyObject *counts = PyArray_ZEROS(2, dims, NPY_INT64, 0);
+	if (counts == NULL)
+		return NULL;
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride)) {
+		Py_DECREF(counts);
+		return NULL;
+	}
+	Py_buffer mask;
+	Py_ssize_t mask_stride;
+	if (!get_image(mask_obj, &mask, width, height, &mask_stride, true)) {
+		PyBuffer_Release(&img);
+		Py_DECREF(counts);
+		return NULL;
+	}
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = sweep::sweep_simple((const unsigned char *)img.buf, width, height, stride, (const unsigned char *)mask.buf, mask_stride, threshs.data(), (int)threshs.size(), (int64_t *)PyArray_DATA((PyArrayObject *)counts));
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&mask);
+	PyBuffer_Release(&img);
+	if (!res) {
+		Py_DECREF(counts);
+		PyErr_SetString(crackthresh_error, "sweep_simple failed");
+		return NULL;
+	}
+	return counts;
+}
+
+static PyObject* crackthresh_sweep_adaptive(PyObject *self, PyObject *args) {
+	PyObject *img_obj;
+	int width;
+	int height;
+	PyObject *radii_obj;
+	PyObject *threshs_obj;
+	PyObject *mask_obj;
+	// parse and validate args
+	if (!PyArg_ParseTuple(args, "OiiOOO", &img_obj, &width, &height, &radii_obj, &threshs_obj, &mask_obj))
+		return NULL;
+	if (width < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
+		return NULL;
+	}
+	if (height < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: height");
+		return NULL;
+	}
+	std::vector<int> radii;
+	if (!get_int_seq(radii_obj, &radii, "invalid argument: radii"))
+		return NULL;
+	for (size_t i=0; i<radii.size(); ++i) {
+		if (radii[i] < 0) {
+			PyErr_SetString(PyExc_ValueError, "invalid argument: radii");
+			return NULL;
+		}
+	}
+	std::vector<float> threshs;
+	if (!get_float_seq(threshs_obj, &threshs, "invalid argument: thresholds"))
+		return NULL;
+	npy_intp dims[3] = {(npy_intp)radii.size(), (npy_intp)threshs.size(), 3};
+	PyObject *counts = PyArray_ZEROS(3, dims, NPY_INT64, 0);
+	if (counts == NULL)
+		return NULL;
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride)) {
+		Py_DECREF(counts);
+		return NULL;
+	}
+	Py_buffer mask;
+	Py_ssize_t mask_stride;
+	if (!get_image(mask_obj, &mask, width, height, &mask_stride, true)) {
+		PyBuffer_Release(&img);
+		Py_DECREF(counts);
+		return NULL;
+	}
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = sweep::sweep_adaptive((const unsigned char *)img.buf, width, height, stride, (const unsigned char *)mask.buf, mask_stride, radii.data(), (int)radii.size(), threshs.data(), (int)threshs.size(), (int64_t *)PyArray_DATA((PyArrayObject *)counts));
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&mask);
+	PyBuffer_Release(&img);
+	if (!res) {
+		Py_DECREF(counts);
+		PyErr_SetString(crackthresh_error, "sweep_adaptive failed");
+		return NULL;
+	}
+	return counts;
+}
+
+// crackthresh.IntegralImage: a reusable integral image workspace that can be built once per frame and
+// then queried with any number of adaptive filter parameter combinations
+//
+// the GIL is released while the workspace is built or queried, so concurrent use from several threads is
+// guarded (the counters are only touched with the GIL held): queries may overlap each other, but a build
+// may not overlap anything; a call that would conflict raises RuntimeError instead of waiting
+
+typedef struct {
+	PyObject_HEAD
+	IntegralImage *img_int;
+	int num_readers;	// queries in progress
+	bool writing;		// build in progress
+} IntegralImageObject;
+
+// returns false with an exception set if the workspace is being built
+static bool IntegralImage_begin_read(IntegralImageObject *self) {
+	if (self->writing) {
+		PyErr_SetString(PyExc_RuntimeError, "IntegralImage is being built by another thread");
+		return false;
+	}
+	++self->num_readers;
+	return true;
+}
+
+static void IntegralImage_end_read(IntegralImageObject *self) {
+	--self->num_readers;
+}
+
+// returns false with an exception set if the workspace is in use
+static bool IntegralImage_begin_write(IntegralImageObject *self) {
+	if (self->writing || (self->num_readers > 0)) {
+		PyErr_SetString(PyExc_RuntimeError, "IntegralImage is in use by another thread");
+		return false;
+	}
+	self->writing = true;
+	return true;
+}
+
+static void IntegralImage_end_write(IntegralImageObject *self) {
+	self->writing = false;
+}
+
+static void IntegralImage_dealloc(IntegralImageObject *self) {
+	delete self->img_int;
+	Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject* IntegralImage_new(PyTypeObject *type, PyObject *args, PyObject *kwds) {
+	IntegralImageObject *self = (IntegralImageObject *)type->tp_alloc(type, 0);
+	if (self == NULL)
+		return NULL;
+	self->num_readers = 0;
+	self->writing = false;
+	self->img_int = new (std::nothrow) IntegralImage();
+	if (self->img_int == NULL) {
+		Py_DECREF(self);
+		return PyErr_NoMemory();
+	}
+	return (PyObject *)self;
+}
+
+// returns false with an exception set on error
+static bool IntegralImage_build_impl(IntegralImageObject *self, PyObject *img_obj, int width, int height) {
+	if (width < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: width");
+		return false;
+	}
+	if (height < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: height");
+		return false;
+	}
+	Py_buffer img;
+	Py_ssize_t stride;
+	if (!get_image(img_obj, &img, width, height, &stride))
+		return false;
+	if (!IntegralImage_begin_write(self)) {
+		PyBuffer_Release(&img);
+		return false;
+	}
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = self->img_int->build((const unsigned char *)img.buf, width, height, stride);
+	Py_END_ALLOW_THREADS
+	IntegralImage_end_write(self);
+	PyBuffer_Release(&img);
+	if (!res) {
+		PyErr_SetString(crackthresh_error, "IntegralImage.build failed");
+		return false;
+	}
+	return true;
+}
+
+static int IntegralImage_init(IntegralImageObject *self, PyObject *args, PyObject *kwds) {
+	PyObject *img_obj = NULL;
+	int width = 0;
+	int height = 0;
+	if (!PyArg_ParseTuple(args, "|Oii", &img_obj, &width, &height))
+		return -1;
+	if ((img_obj != NULL) && (!IntegralImage_build_impl(self, img_obj, width, height)))
+		return -1;
+	return 0;
+}
+
+static PyObject* IntegralImage_build(IntegralImageObject *self, PyObject *args) {
+	PyObject *img_obj;
+	int width;
+	int height;
+	if (!PyArg_ParseTuple(args, "Oii", &img_obj, &width, &height))
+		return NULL;
+	if (!IntegralImage_build_impl(self, img_obj, width, height))
+		return NULL;
+	Py_RETURN_NONE;
+}
+
+static PyObject* IntegralImage_filter_adaptive(IntegralImageObject *self, PyObject *args) {
+	int x_origin;
+	int y_origin;
+	float thresh;
+	int radius;
+	if (!PyArg_ParseTuple(args, "iifi", &x_origin, &y_origin, &thresh, &radius))
+		return NULL;
+	if (radius < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: radius");
+		return NULL;
+	}
+	PointArray ptarr(self->img_int->get_width() * self->img_int->get_height());
+	if (!IntegralImage_begin_read(self))
+		return NULL;
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = filter::filter_adaptive(&ptarr, self->img_int, x_origin, y_origin, thresh, radius);
+	Py_END_ALLOW_THREADS
+	IntegralImage_end_read(self);
+	if (!res) {
+		PyErr_SetString(crackthresh_error, "IntegralImage.filter_adaptive failed");
+		return NULL;
+	}
+	return build_array_result(&ptarr);
+}
+
+static PyObject* IntegralImage_fit_line_adaptive(IntegralImageObject *self, PyObject *args) {
+	int x_origin;
+	int y_origin;
+	float thresh;
+	int radius;
+	if (!PyArg_ParseTuple(args, "iifi", &x_origin, &y_origin, &thresh, &radius))
+		return NULL;
+	if (radius < 0) {
+		PyErr_SetString(PyExc_ValueError, "invalid argument: radius");
+		return NULL;
+	}
+	if (!IntegralImage_begin_read(self))
+		return NULL;
+	LineFit fit;
+	bool res;
+	Py_BEGIN_ALLOW_THREADS
+	res = filter::filter_adaptive(&fit, self->img_int, x_origin, y_origin, thresh, radius);
+	Py_END_ALLOW_THREADS
+	IntegralImage_end_read(self);
+	if (!res) {
+		PyErr_SetString(crackthresh_error, "IntegralImage.fit_line_adaptive failed");
+		return NULL;
+	}
+	return build_fit_result(&fit);
+}
+
+static PyObject* IntegralImage_get_width(IntegralImageObject *self, void *closure) {
+	if (self->writing) {
+		PyErr_SetString(PyExc_RuntimeError, "IntegralImage is being built by another thread");
+		return NULL;
+	}
+	return PyLong_FromLong(self->img_int->get_width());
+}
+
+static PyObject* IntegralImage_get_height(IntegralImageObject *self, void *closure) {
+	if (self->writing) {
+		PyErr_SetString(PyExc_RuntimeError, "IntegralImage is being built by another thread");
+		return NULL;
+	}
+	return PyLong_FromLong(self->img_int->get_height());
+}
+
+static PyMethodDef IntegralImage_methods[] = {
+	{
+		"build",
+		(PyCFunction)IntegralImage_build,
+		METH_VARARGS,
+		"build(img, width, height) -> None; (re)builds the integral image, reusing its storage"
+	},
+	{
+		"filter_adaptive",
+		(PyCFunction)IntegralImage_filter_adaptive,
+		METH_VARARGS,
+		"filter_adaptive(x_origin, y_origin, thresh, radius) -> (x_vals, y_vals, xy_vals) as int32 ndarrays"
+	},
+	{
+		"fit_line_adaptive",
+		(PyCFunction)IntegralImage_fit_line_adaptive,
+		METH_VARARGS,
+		"fit_line_adaptive(x_origin, y_origin, thresh, radius) -> (m, b_px, n_points); m and b_px are None if undefined"
+	},
+	{
+		NULL,
+		NULL,
+		0,
+		NULL
+	}
+};
+
+static PyGetSetDef IntegralImage_getset[] = {
+	{(char *)"width",  (getter)IntegralImage_get_width,  NULL, (char *)"width of the last built image",  NULL},
+	{(char *)"height", (getter)IntegralImage_get_height, NULL, (char *)"height of the last built image", NULL},
+	{NULL, NULL, NULL, NULL, NULL}
+};
+
+static PyTypeObject IntegralImageType = {
+	PyVarObject_HEAD_INIT(NULL, 0)
+};
+
+static void init_integral_image_type() {
+	IntegralImageType.tp_name = "crackthresh.IntegralImage";
+	IntegralImageType.tp_basicsize = sizeof(IntegralImageObject);
+	IntegralImageType.tp_itemsize = 0;
+	IntegralImageType.tp_dealloc = (destructor)IntegralImage_dealloc;
+	IntegralImageType.tp_flags = Py_TPFLAGS_DEFAULT;
+	IntegralImageType.tp_doc = "IntegralImage([img, width, height]): reusable integral image workspace for adaptive filtering; concurrent build() raises RuntimeError";
+	IntegralImageType.tp_methods = IntegralImage_methods;
+	IntegralImageType.tp_getset = IntegralImage_getset;
+	IntegralImageType.tp_init = (initproc)IntegralImage_init;
+	IntegralImageType.tp_new = IntegralImage_new;
+}
+
 static PyMethodDef crackthresh_methods[] = {
 	{
 		"filter_simple",
 		crackthresh_filter_simple,
 		METH_VARARGS,
-		"TODO: docstring"
+		"filter_simple(img, width, height, x_origin, y_origin, thresh) -> (x_vals, y_vals, xy_vals) as lists"
 	},
 	{
 		"filter_adaptive",
 		crackthresh_filter_adaptive,
 		METH_VARARGS,
-		"TODO: docstring"
+		"filter_adaptive(img, width, height, x_origin, y_origin, thresh, radius) -> (x_vals, y_vals, xy_vals) as lists"
+	},
+	{
+		"filter_simple_array",
+		crackthresh_filter_simple_array,
+		METH_VARARGS,
+		"filter_simple_array(img, width, height, x_origin, y_origin, thresh) -> (x_vals, y_vals, xy_vals) as int32 ndarrays"
+	},
+	{
+		"filter_adaptive_array",
+		crackthresh_filter_adaptive_array,
+		METH_VARARGS,
+		"filter_adaptive_array(img, width, height, x_origin, y_origin, thresh, radius) -> (x_vals, y_vals, xy_vals) as int32 ndarrays"
+	},
+	{
+		"fit_line_simple",
+		crackthresh_fit_line_simple,
+		METH_VARARGS,
+		"fit_line_simple(img, width, height, x_origin, y_origin, thresh) -> (m, b_px, n_points); m and b_px are None if undefined"
+	},
+	{
+		"fit_line_adaptive",
+		crackthresh_fit_line_adaptive,
+		METH_VARARGS,
+		"fit_line_adaptive(img, width, height, x_origin, y_origin, thresh, radius) -> (m, b_px, n_points); m and b_px are None if undefined"
+	},
+	{
+		"sweep_simple",
+		crackthresh_sweep_simple,
+		METH_VARARGS,
+		"sweep_simple(img, width, height, thresholds, truth_mask) -> int64 ndarray of shape (len(thresholds), 3) holding (TP, FP, FN)"
+	},
+	{
+		"sweep_adaptive",
+		crackthresh_sweep_adaptive,
+		METH_VARARGS,
+		"sweep_adaptive(img, width, height, radii, thresholds, truth_mask) -> int64 ndarray of shape (len(radii), len(thresholds), 3) holding (TP, FP, FN)"
 	},
 	{
 		NULL,
@@ -135,7 +789,8 @@ static PyMethodDef crackthresh_methods[] = {
 static struct PyModuleDef crackthresh_definition = {
 	PyModuleDef_HEAD_INIT,
 	"crackthresh",
-	"TODO: docstring",
+	"Point filtering routines for crack images.  img may be any 8-bit buffer: flat (width*height bytes) or\n"
+	"2-D (height, width) with contiguous rows.  All but the list-returning filters release the GIL while scanning.",
 	-1,
 	crackthresh_methods
 };
@@ -144,12 +799,18 @@ extern "C" {
 // naming significant; also must match the name keyword argument in setup.py's setup() call (?)
 PyMODINIT_FUNC PyInit_crackthresh(void) {
 	PyObject *m;
+	import_array();
 	m = PyModule_Create(&crackthresh_definition);
 	if (m == NULL)
 		return NULL;
 	crackthresh_error = PyErr_NewException("crackthresh.error", NULL, NULL);
 	Py_INCREF(crackthresh_error);
 	PyModule_AddObject(m, "error", crackthresh_error);
+	init_integral_image_type();
+	if (PyType_Ready(&IntegralImageType) < 0)
+		return NULL;
+	Py_INCREF(&IntegralImageType);
+	PyModule_AddObject(m, "IntegralImage", (PyObject *)&IntegralImageType);
 	return m;
 }
 }
@@ -1,6 +1,7 @@
 
 #include "filter.h"
-#include "point_set.h"
+#include "integral_image.h"
+#include "point_sink.h"
 
 
 namespace filter {
@@ -13,8 +14,10 @@ inline int max(int a, int b) {
 	return (a > b) ? a : b;
 }
 
+// stride is the distance in bytes between the starts of successive image rows (width, if contiguous)
+//
 // returns true on success, else false
-bool filter_simple(PointSet *ptset, const unsigned char *img, int width, int height, int x_origin, int y_origin, int thresh) {
+bool filter_simple(PointSink *ptset, const unsigned char *img, int width, int height, ptrdiff_t stride, int x_origin, int y_origin, int thresh) {
 	if (width < 0)
 		return false;
 	if (height < 0)
@@ -23,7 +26,7 @@ bool filter_simple(PointSet *ptset, const unsigned char *img, int width, int hei
 		return false;
 	for (int y=0; y<height; ++y)
 		for (int x=0; x<width; ++x)
-			if (img[(y * width) + x] <= thresh)
+			if (img[(y * stride) + x] <= thresh)
 				(*ptset).add(x + x_origin, y + y_origin);
 	return true;
 }
@@ -31,42 +34,36 @@ bool filter_simple(PointSet *ptset, const unsigned char *img, int width, int hei
 // Bradley/Roth adaptive thresholding
 //
 // returns true on success, else false
-bool filter_adaptive(PointSet *ptset, const unsigned char *img, int width, int height, int x_origin, int y_origin, float thresh, int radius) {
-	if (width < 0)
-		return false;
-	if (height < 0)
-		return false;
-	if ((thresh < (float)0) || (thresh > (float)1))
+bool filter_adaptive(PointSink *ptset, const unsigned char *img, int width, int height, ptrdiff_t stride, int x_origin, int y_origin, float thresh, int radius) {
+	IntegralImage img_int;
+	if (!img_int.build(img, width, height, stride))
 		return false;
+	return filter_adaptive(ptset, &img_int, x_origin, y_origin, thresh, radius);
+}
+
+// Bradley/Roth adaptive thresholding over a prebuilt integral image
+//
+// thresh may be negative (a pixel then passes if it is up to -thresh brighter than its neighborhood mean)
+//
+// returns true on success, else false
+bool filter_adaptive(PointSink *ptset, const IntegralImage *img_int, int x_origin, int y_origin, float thresh, int radius) {
 	if (radius < 0)
 		return false;
-	// compute integral image
-	int img_int[width*height];
-	int ysum = 0;
-	for (int x=0; x<width; ++x) {
-		ysum = 0;
-		for (int y=0; y<height; ++y) {
-			int idx = (y * width) + x;
-			ysum += img[idx];
-			img_int[idx] = ysum + ((x > 0) ? img_int[idx - 1] : 0);
-		}
-	}
-	// perform adaptive thresholding
+	const int width = img_int->get_width();
+	const int height = img_int->get_height();
+	const float scale = ((float)1) - thresh;
 	int num_pix;
-	int x1, x2, y1, y2, sum1, sum2, sum3, sum4, sum_rect;
-	for (int x=0; x<width; ++x) {
-		for (int y=0; y<height; ++y) {
+	int x1, x2, y1, y2;
+	int64_t sum_rect;
+	for (int y=0; y<height; ++y) {
+		y1 = filter::max(0,          y - radius);
+		y2 = filter::min(height - 1, y + radius);
+		for (int x=0; x<width; ++x) {
 			x1 = filter::max(0,          x - radius);
 			x2 = filter::min(width  - 1, x + radius);
-			y1 = filter::max(0,          y - radius);
-			y2 = filter::min(height - 1, y + radius);
 			num_pix = (x2 - x1 + 1) * (y2 - y1 + 1);
-			sum1 =                           img_int[((y2    ) * width) + (x2    )]     ;
-			sum2 =  (y1 > 0)              ? (img_int[((y1 - 1) * width) + (x2    )]) : 0;
-			sum3 =  (x1 > 0)              ? (img_int[((y2    ) * width) + (x1 - 1)]) : 0;
-			sum4 = ((x1 > 0) && (y1 > 0)) ? (img_int[((y1 - 1) * width) + (x1 - 1)]) : 0;
-			sum_rect = sum1 - sum2 - sum3 + sum4;
-			if ((img[(y * width) + x] * (int)num_pix) <= (sum_rect * (((float)1) - thresh)))
+			sum_rect = img_int->rect_sum(x1, y1, x2, y2);
+			if ((img_int->pixel(x, y) * num_pix) <= (sum_rect * scale))
 				(*ptset).add(x + x_origin, y + y_origin);
 		}
 	}
@@ -0,0 +1,61 @@
+
+#include <string.h>
+#include <new>
+
+#include "integral_image.h"
+
+
+IntegralImage::IntegralImage() {
+	width = 0;
+	height = 0;
+}
+
+IntegralImage::~IntegralImage() {
+}
+
+// stride is the distance in bytes between the starts of successive image rows (width, if contiguous)
+//
+// returns true on success, else false
+bool IntegralImage::build(const unsigned char *img, int width, int height, ptrdiff_t stride) {
+	if (width < 0)
+		return false;
+	if (height < 0)
+		return false;
+	if (((int64_t)width * height) > ((int64_t)UINT32_MAX / 255))
+		return false;
+	this->width = width;
+	this->height = height;
+	const size_t row_len = (size_t)width + 1;
+	try {
+		pixels.resize((size_t)width * height);
+		sums.resize(row_len * ((size_t)height + 1));
+	} catch (const std::bad_alloc &e) {
+		this->width = 0;
+		this->height = 0;
+		return false;
+	}
+	// copy pixels and compute sums in a single row-major pass
+	memset(sums.data(), 0, row_len * sizeof(uint32_t));
+	for (int y=0; y<height; ++y) {
+		const unsigned char *src = img + (y * stride);
+		unsigned char *dst = pixels.data() + ((size_t)y * width);
+		const uint32_t *sums_prev = sums.data() + ((size_t)y * row_len);
+		uint32_t *sums_cur = sums.data() + ((size_t)(y + 1) * row_len);
+		uint32_t row_sum = 0;
+		sums_cur[0] = 0;
+		for (int x=0; x<width; ++x) {
+			dst[x] = src[x];
+			row_sum += src[x];
+			sums_cur[x + 1] = sums_prev[x + 1] + row_sum;
+		}
+	}
+	return true;
+}
+
+int IntegralImage::get_width() const {
+	return width;
+}
+
+int IntegralImage::get_height() const {
+	return height;
+}
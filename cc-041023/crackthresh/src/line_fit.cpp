@@ -0,0 +1,39 @@
+
+#include "line_fit.h"
+
+
+LineFit::LineFit() {
+	n = 0;
+	sum_x = 0;
+	sum_y = 0;
+	sum_xy = 0;
+	sum_xx = 0;
+}
+
+LineFit::~LineFit() {
+}
+
+bool LineFit::add(const int x, const int y) {
+	n += 1;
+	sum_x += x;
+	sum_y += y;
+	sum_xy += (int64_t)x * y;
+	sum_xx += (int64_t)x * x;
+	return true;
+}
+
+int64_t LineFit::count() {
+	return n;
+}
+
+// returns false if the fit is undefined (fewer than two points, or all points share one x value)
+bool LineFit::solve(double *m, double *b) {
+	// the sums are exact, so the numerator and denominator are computed exactly as well
+	int64_t denom = (n * sum_xx) - (sum_x * sum_x);
+	if ((n < 2) || (denom == 0))
+		return false;
+	int64_t numer = (n * sum_xy) - (sum_x * sum_y);
+	*m = (double)numer / (double)denom;
+	*b = ((double)sum_y - ((*m) * (double)sum_x)) / (double)n;
+	return true;
+}
@@ -0,0 +1,45 @@
+
+#define PY_ARRAY_UNIQUE_SYMBOL crackthresh_ARRAY_API
+#define NO_IMPORT_ARRAY
+#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
+
+#include <string.h>
+
+#include "point_array.h"
+
+#include <numpy/arrayobject.h>
+
+
+// capacity is the maximum number of points expected (e.g. width * height), so add() never reallocates
+PointArray::PointArray(const int capacity) {
+	xvec.reserve((capacity > 0) ? capacity : 0);
+	yvec.reserve((capacity > 0) ? capacity : 0);
+}
+
+PointArray::~PointArray() {
+}
+
+bool PointArray::add(const int x, const int y) {
+	xvec.push_back(x);
+	yvec.push_back(y);
+	return true;
+}
+
+Py_ssize_t PointArray::size() {
+	return (Py_ssize_t)xvec.size();
+}
+
+// returns a new reference to a (2, N) int32 ndarray (row 0: x values, row 1: y values), or NULL on error
+PyObject* PointArray::get_data() {
+	npy_intp num = (npy_intp)xvec.size();
+	npy_intp dims[2] = {2, num};
+	PyObject *arr = PyArray_SimpleNew(2, dims, NPY_INT32);
+	if (arr == NULL)
+		return NULL;
+	if (num > 0) {
+		int32_t *data = (int32_t *)PyArray_DATA((PyArrayObject *)arr);
+		memcpy(data,       xvec.data(), num * sizeof(int32_t));
+		memcpy(data + num, yvec.data(), num * sizeof(int32_t));
+	}
+	return arr;
+}
@@ -0,0 +1,114 @@
+
+#include <algorithm>
+#include <vector>
+
+#include "confusion_count.h"
+#include "filter.h"
+#include "integral_image.h"
+#include "sweep.h"
+
+
+namespace sweep {
+
+// number of nonzero pixels in a mask
+static int64_t mask_total(const unsigned char *mask, int width, int height, ptrdiff_t mask_stride) {
+	int64_t total = 0;
+	for (int y=0; y<height; ++y)
+		for (int x=0; x<width; ++x)
+			if (mask[(y * mask_stride) + x] != 0)
+				total += 1;
+	return total;
+}
+
+// runs filter_simple once per threshold, scoring each result against the mask
+//
+// counts must hold num_threshs rows of (TP, FP, FN)
+//
+// returns true on success, else false
+bool sweep_simple(const unsigned char *img, int width, int height, ptrdiff_t stride, const unsigned char *mask, ptrdiff_t mask_stride, const int *threshs, int num_threshs, int64_t *counts) {
+	int64_t total = mask_total(mask, width, height, mask_stride);
+	for (int i=0; i<num_threshs; ++i) {
+		ConfusionCount cc(mask, mask_stride, total);
+		if (!filter::filter_simple(&cc, img, width, height, stride, 0, 0, threshs[i]))
+			return false;
+		counts[(i * 3) + 0] = cc.get_tp();
+		counts[(i * 3) + 1] = cc.get_fp();
+		counts[(i * 3) + 2] = cc.get_fn();
+	}
+	return true;
+}
+
+// scores filter_adaptive at every (radius, threshold) pair against the mask, over a single shared integral
+// image
+//
+// For a given pixel and radius, the filter's pass condition can only change once as the threshold
+// grows (it holds for every threshold up to some critical value), so rather than running the filter
+// once per pair, each pixel is binary-searched against the sorted thresholds using the filter's own
+// comparison, and the counts for all thresholds follow from a histogram of those results.
+//
+// counts must hold num_radii * num_threshs rows of (TP, FP, FN), radius-major
+//
+// returns true on success, else false
+bool sweep_adaptive(const unsigned char *img, int width, int height, ptrdiff_t stride, const unsigned char *mask, ptrdiff_t mask_stride, const int *radii, int num_radii, const float *threshs, int num_threshs, int64_t *counts) {
+	int64_t total = mask_total(mask, width, height, mask_stride);
+	IntegralImage img_int;
+	if (!img_int.build(img, width, height, stride))
+		return false;
+	// sort thresholds, remembering their original positions
+	std::vector<int> order(num_threshs);
+	for (int t=0; t<num_threshs; ++t)
+		order[t] = t;
+	std::stable_sort(order.begin(), order.end(), [threshs](int a, int b) { return threshs[a] < threshs[b]; });
+	std::vector<float> scales(num_threshs);
+	for (int t=0; t<num_threshs; ++t)
+		scales[t] = ((float)1) - threshs[order[t]];
+	// hist_*[k]: number of pixels that pass for exactly the k smallest thresholds
+	std::vector<int64_t> hist_tp(num_threshs + 1);
+	std::vector<int64_t> hist_fp(num_threshs + 1);
+	for (int r=0; r<num_radii; ++r) {
+		const int radius = radii[r];
+		if (radius < 0)
+			return false;
+		std::fill(hist_tp.begin(), hist_tp.end(), 0);
+		std::fill(hist_fp.begin(), hist_fp.end(), 0);
+		for (int y=0; y<height; ++y) {
+			const int y1 = std::max(0,          y - radius);
+			const int y2 = std::min(height - 1, y + radius);
+			for (int x=0; x<width; ++x) {
+				const int x1 = std::max(0,         x - radius);
+				const int x2 = std::min(width - 1, x + radius);
+				const int num_pix = (x2 - x1 + 1) * (y2 - y1 + 1);
+				const int64_t sum_rect = img_int.rect_sum(x1, y1, x2, y2);
+				const int lhs = img_int.pixel(x, y) * num_pix;
+				// find the first sorted threshold for which the pixel fails (same test as filter_adaptive)
+				int lo = 0;
+				int hi = num_threshs;
+				while (lo < hi) {
+					const int mid = (lo + hi) / 2;
+					if (lhs <= (sum_rect * scales[mid]))
+						lo = mid + 1;
+					else
+						hi = mid;
+				}
+				if (mask[(y * mask_stride) + x] != 0)
+					hist_tp[lo] += 1;
+				else
+					hist_fp[lo] += 1;
+			}
+		}
+		// a pixel counted in hist_*[k] passes for sorted thresholds 0..k-1
+		int64_t tp = 0;
+		int64_t fp = 0;
+		for (int t=num_threshs-1; t>=0; --t) {
+			tp += hist_tp[t + 1];
+			fp += hist_fp[t + 1];
+			int64_t *row = counts + ((((int64_t)r * num_threshs) + order[t]) * 3);
+			row[0] = tp;
+			row[1] = fp;
+			row[2] = total - tp;
+		}
+	}
+	return true;
+}
+
+}
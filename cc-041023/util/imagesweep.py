@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 # coding=utf-8
 
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 import csv
 import getopt
 import os
+import queue
 import sys
+import threading
+import time
 
 from edgetpu.detection.engine import DetectionEngine
 import numpy
@@ -17,21 +22,26 @@ import crackthresh
 IMG_DIM = 300
 PIL_RESAMP = Image.ANTIALIAS
 
+# pipelined mode (--jobs N > 1)
+QUEUE_DEPTH = 4        # reader -> detection queue depth
+WRITE_THREADS = 2      # PNG writer pool size
+
 
 def main(argv):
     # process args
     try:
         (opts, args) = getopt.getopt(
             argv,
-            "a:d:hi:l:m:o:r:s:",
+            "a:d:hi:j:l:m:o:r:s:",
             [
                 "athresh=",
                 "dthresh=",
                 "help",
                 "indir=",
+                "jobs=",
                 "labelid=",
                 "model=",
-                "outdir="
+                "outdir=",
                 "aradius=",
                 "sthresh=",
             ]
@@ -41,6 +51,7 @@ def main(argv):
     arg_athresh = None
     arg_dthresh = None
     arg_indir   = None
+    arg_jobs    = None
     arg_labelid = None
     arg_model   = None
     arg_outdir  = None
@@ -55,6 +66,8 @@ def main(argv):
             usage(0)
         elif opt in ("-i", "--indir"):
             arg_indir = arg
+        elif opt in ("-j", "--jobs"):
+            arg_jobs = arg
         elif opt in ("-l", "--labelid"):
             arg_labelid = arg
         elif opt in ("-m", "--model"):
@@ -95,6 +108,15 @@ def main(argv):
         usage(1)
     # parse path_indir
     path_indir = arg_indir
+    # parse jobs
+    jobs = 1
+    if arg_jobs is not None:
+        try:
+            jobs = int(arg_jobs)
+        except ValueError:
+            usage(1)
+        if (jobs < 1):
+            usage(1)
     # parse label_id
     try:
         label_id = int(arg_labelid)
@@ -119,7 +141,7 @@ def main(argv):
     if ((simple_thresh < 0) or (simple_thresh > 255)):
         usage(1)
     # process
-    res = process(path_indir, path_model, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir)
+    res = process(path_indir, path_model, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir, jobs)
     if (res):
         print('[success]')
         sys.exit(0)
@@ -143,10 +165,11 @@ def usage(exit_code):
     print('')
     print('OPTIONAL PARAMS:')
     print('  -h, --help        show this usage synopsis')
+    print('  -j, --jobs=JOBS   number of render processes; >1 enables the pipelined mode (default 1)')
     print('')
     sys.exit(exit_code)
 
-def process(path_indir, path_model, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir):
+def process(path_indir, path_model, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir, jobs=1):
     #
     if not os.access(path_indir, os.R_OK):
         print('error: input directory not readable')
@@ -187,17 +210,18 @@ def process(path_indir, path_model, label_id, detect_thresh, simple_thresh, adap
     # initialize DetectionEngine
     engine = DetectionEngine(path_model)
     #
+    time_start = time.monotonic()
+    if (jobs > 1):
+        nds = process_pipelined(path_indir, engine, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir_simple, path_outdir_adaptive, jobs)
+    else:
+        nds = process_serial(path_indir, engine, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir_simple, path_outdir_adaptive)
+    if nds is None:
+        return False
+    time_elapsed = time.monotonic() - time_start
     num_lt_one = 0
     num_eq_one = 0
     num_gt_one = 0
-    for fn in os.listdir(path_indir):
-        if not (fn.endswith('.png') or fn.endswith('.PNG')):
-            print('skipping file: ' + fn)
-            continue
-        nd = process_image(path_indir, fn, engine, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir_simple, path_outdir_adaptive)
-        if nd is None:
-            print('error processing image')
-            return False
+    for nd in nds:
         if (nd < 1):
             num_lt_one += 1
         elif (nd == 1):
@@ -212,10 +236,130 @@ def process(path_indir, path_model, label_id, detect_thresh, simple_thresh, adap
     print('  # images w/ <1 crack detected:        ' + str(num_lt_one))
     print('  # images w/ exactly 1 crack detected: ' + str(num_eq_one))
     print('  # images w/ >1 crack detected:        ' + str(num_gt_one))
+    print('  images/s:                             ' + '{:.2f}'.format(len(nds) / max(time_elapsed, 1e-9)))
     return True
 
+def list_images(path_indir):
+    for fn in os.listdir(path_indir):
+        if not (fn.endswith('.png') or fn.endswith('.PNG')):
+            print('skipping file: ' + fn)
+            continue
+        yield fn
+
+# returns list of per-image detection counts, None on error
+def process_serial(path_indir, engine, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir_simple, path_outdir_adaptive):
+    nds = []
+    for fn in list_images(path_indir):
+        nd = process_image(path_indir, fn, engine, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir_simple, path_outdir_adaptive)
+        if nd is None:
+            print('error processing image')
+            return None
+        nds.append(nd)
+    return nds
+
+# reader thread -> (bounded queue) -> detection (this thread, single device)
+#   -> render process pool -> (bounded in-flight futures) -> PNG writer thread pool
+# at most QUEUE_DEPTH loaded images and 2*jobs rendered image pairs are held at any time
+# returns list of per-image detection counts, None on error
+def process_pipelined(path_indir, engine, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir_simple, path_outdir_adaptive, jobs):
+    q_loaded = queue.Queue(maxsize=QUEUE_DEPTH)
+    q_rendering = queue.Queue(maxsize=(2 * jobs))
+    stop = threading.Event()
+    errors = []
+    reader_exc = []
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    # always ends the stream with None (even if loading raises or stop is set) so that detection never
+    # waits forever; the sentinel put is unconditional, as the consumer drains q_loaded until it sees it.
+    # an exception is re-raised in the calling thread once the pipeline has wound down
+    def reader():
+        try:
+            for fn in list_images(path_indir):
+                img = load_image(path_indir, fn)
+                if img is None:
+                    errors.append(fn)
+                    break
+                if not put(q_loaded, (fn, img)):
+                    return
+        except Exception as e:
+            reader_exc.append(e)
+        finally:
+            q_loaded.put(None)
+
+    def writer():
+        with ThreadPoolExecutor(max_workers=WRITE_THREADS) as pool_write:
+            while True:
+                item = q_rendering.get()
+                if item is None:
+                    break
+                (fn, f_render) = item
+                try:
+                    (img_simple, img_adaptive) = f_render.result()
+                except Exception as e:
+                    print('error rendering image: ' + fn + ': ' + str(e))
+                    errors.append(fn)
+                    stop.set()
+                    continue
+                # bounded: each write must finish before the next render result is taken
+                fs = [
+                    pool_write.submit(img_simple.save, os.path.join(path_outdir_simple, fn)),
+                    pool_write.submit(img_adaptive.save, os.path.join(path_outdir_adaptive, fn))
+                ]
+                for f in fs:
+                    try:
+                        f.result()
+                    except OSError as e:
+                        print('error writing image: ' + fn + ': ' + str(e))
+                        errors.append(fn)
+                        stop.set()
+
+    nds = []
+    thread_reader = threading.Thread(target=reader, daemon=True)
+    thread_writer = threading.Thread(target=writer, daemon=True)
+    thread_reader.start()
+    thread_writer.start()
+    eos = False
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool_render:
+            try:
+                while not stop.is_set():
+                    item = q_loaded.get()
+                    if item is None:
+                        eos = True
+                        break
+                    (fn, img) = item
+                    (nd, box) = detect_image(img, engine, label_id, detect_thresh)
+                    nds.append(nd)
+                    f_render = pool_render.submit(render_images, numpy.asarray(img), box, simple_thresh, adaptive_radius, adaptive_thresh)
+                    if not put(q_rendering, (fn, f_render)):
+                        break
+            finally:
+                # the writer drains q_rendering until None, so it (and every render future) is always joined
+                stop.set()
+                q_rendering.put(None)
+                thread_writer.join()
+    finally:
+        # the reader stops once stop is set; drain q_loaded up to its sentinel so that it can finish
+        while not eos:
+            eos = (q_loaded.get() is None)
+        thread_reader.join()
+    if reader_exc:
+        raise reader_exc[0]
+    if errors:
+        print('error processing image')
+        return None
+    return nds
+
 # returns None on error
-def process_image(path_indir, fn_img, engine, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir_simple, path_outdir_adaptive):
+def load_image(path_indir, fn_img):
     # load image
     img = Image.open(os.path.join(path_indir, fn_img))
     if (img.mode != 'L'):
@@ -231,21 +375,19 @@ def process_image(path_indir, fn_img, engine, label_id, detect_thresh, simple_th
         return None
     if (img.width != IMG_DIM):
         img = img.resize((IMG_DIM,IMG_DIM), PIL_RESAMP)
+    return img
+
+# returns (num_detections, box), box == (xc0, yc0, xc1, yc1) if exactly 1 crack detected, else None
+def detect_image(img, engine, label_id, detect_thresh):
     img_dim = img.width
-    img_rgb = img.convert('RGB')
     ans = engine.DetectWithImage(
-        img_rgb,
+        img.convert('RGB'),
         threshold=detect_thresh,
         keep_aspect_ratio=True,
         relative_coord=False,
         top_k=10
     )
     #
-    img_simple = img_rgb.copy()
-    draw_simple = ImageDraw.Draw(img_simple)
-    img_adaptive = img_rgb.copy()
-    draw_adaptive = ImageDraw.Draw(img_adaptive)
-    #
     num_detections = 0
     #
     xc0 = None
@@ -261,11 +403,23 @@ def process_image(path_indir, fn_img, engine, label_id, detect_thresh, simple_th
                 xc1 = min((img_dim - 1), int(round(obj.bounding_box[1][0])))
                 yc1 = min((img_dim - 1), int(round(obj.bounding_box[1][1])))
     if (num_detections != 1):
-        img_simple.save(os.path.join(path_outdir_simple, fn_img))
-        img_adaptive.save(os.path.join(path_outdir_adaptive, fn_img))
-        return num_detections
+        return (num_detections, None)
+    return (num_detections, (xc0, yc0, xc1, yc1))
+
+# filters the detected box and draws the simple/adaptive overlays (picklable worker entry point)
+# returns (img_simple, img_adaptive); plain RGB copies if box is None
+def render_images(imgarr, box, simple_thresh, adaptive_radius, adaptive_thresh):
+    img_dim = imgarr.shape[1]
+    img_rgb = Image.fromarray(imgarr).convert('RGB')
+    #
+    img_simple = img_rgb.copy()
+    draw_simple = ImageDraw.Draw(img_simple)
+    img_adaptive = img_rgb.copy()
+    draw_adaptive = ImageDraw.Draw(img_adaptive)
+    if box is None:
+        return (img_simple, img_adaptive)
+    (xc0, yc0, xc1, yc1) = box
     #
-    imgarr = numpy.asarray(img)
     crop = imgarr[yc0:(yc1+1),xc0:(xc1+1)]
     imgbytes = crop.tobytes(order='C')
     # do simple
@@ -275,7 +429,6 @@ def process_image(path_indir, fn_img, engine, label_id, detect_thresh, simple_th
     (m, b_px) = numpy.linalg.lstsq(A, y_vals, rcond=None)[0]
     draw_simple.line((0, b_px, (img_dim - 1), (m * (img_dim - 1)) + b_px), fill=128)
     draw_simple.rectangle(((xc0,yc0),(xc1+1,yc1+1)), outline='red')
-    img_simple.save(os.path.join(path_outdir_simple, fn_img))
     # do adaptive
     (x_vals, y_vals, xy_vals) = crackthresh.filter_adaptive(imgbytes, xc1-xc0+1, yc1-yc0+1, xc0, yc0, adaptive_thresh, adaptive_radius)
     draw_adaptive.point(xy_vals)
@@ -283,6 +436,16 @@ def process_image(path_indir, fn_img, engine, label_id, detect_thresh, simple_th
     (m, b_px) = numpy.linalg.lstsq(A, y_vals, rcond=None)[0]
     draw_adaptive.line((0, b_px, (img_dim - 1), (m * (img_dim - 1)) + b_px), fill=128)
     draw_adaptive.rectangle(((xc0,yc0),(xc1+1,yc1+1)), outline='red')
+    return (img_simple, img_adaptive)
+
+# returns None on error
+def process_image(path_indir, fn_img, engine, label_id, detect_thresh, simple_thresh, adaptive_radius, adaptive_thresh, path_outdir_simple, path_outdir_adaptive):
+    img = load_image(path_indir, fn_img)
+    if img is None:
+        return None
+    (num_detections, box) = detect_image(img, engine, label_id, detect_thresh)
+    (img_simple, img_adaptive) = render_images(numpy.asarray(img), box, simple_thresh, adaptive_radius, adaptive_thresh)
+    img_simple.save(os.path.join(path_outdir_simple, fn_img))
     img_adaptive.save(os.path.join(path_outdir_adaptive, fn_img))
     return num_detections
 
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+# IPC round-trip micro-benchmark: MasterEndpoint.send_cmd_sync over multiprocessing.Queue vs PipeChannel
+#
+# run from the repository root:  python3 -m util.ipcbench [-n COUNT]
+
+import getopt
+import multiprocessing
+import statistics
+import sys
+import time
+
+from crackclean.const import Const
+from crackclean.detection_result import DetectionResult
+from crackclean.filter_mode import FilterMode
+from crackclean.frame_ref import FrameRef
+from crackclean.ipc.actuator_cmd import ActuatorCmd
+from crackclean.ipc.actuator_resp import ActuatorResp
+from crackclean.ipc.detection_cmd import DetectionCmd
+from crackclean.ipc.detection_resp import DetectionResp
+from crackclean.ipc.master_endpoint import MasterEndpoint
+from crackclean.ipc.pipe_channel import PipeChannel
+from crackclean.ipc.slave_endpoint import SlaveEndpoint
+
+
+COUNT_DEFAULT = 10000
+WARMUP = 200
+
+
+def main(argv):
+    # process args
+    try:
+        (opts, args) = getopt.getopt(
+            argv,
+            "hn:",
+            [
+                "help",
+                "count=",
+            ]
+        )
+    except getopt.GetoptError:
+        usage(1)
+    arg_count = None
+    for (opt,arg) in opts:
+        if opt in ("-h", "--help"):
+            usage(0)
+        elif opt in ("-n", "--count"):
+            arg_count = arg
+        else:
+            usage(1)
+    # parse count
+    count = COUNT_DEFAULT
+    if arg_count is not None:
+        try:
+            count = int(arg_count)
+        except ValueError:
+            usage(1)
+        if (count < 1):
+            usage(1)
+    #
+    context = multiprocessing.get_context('forkserver')
+    msgs = [
+        ('actuator SET_TARGET_MM', ActuatorCmd(ActuatorCmd.Token.SET_TARGET_MM, (123.5,))),
+        ('detection DETECT', DetectionCmd(DetectionCmd.Token.DETECT, (FrameRef(3, 1234, time.monotonic()),
+            Const.DETECTION_DETECT_THRESH_DEFAULT, Const.DETECTION_SIMPFILTER_THRESH_DEFAULT,
+            Const.DETECTION_ADAPTFILTER_THRESH_DEFAULT, Const.DETECTION_ADAPTFILTER_RADIUS_DEFAULT, FilterMode.ADAPTIVE, True))),
+    ]
+    print('round trips per case: ' + str(count))
+    print('{:<24} {:<6} {:>9} {:>9} {:>9} {:>9}'.format('message', 'chan', 'mean_us', 'p50_us', 'p90_us', 'p99_us'))
+    for (name, op_obj) in msgs:
+        for chan in ('queue', 'pipe'):
+            lat = bench(context, chan, op_obj, count)
+            lat.sort()
+            print('{:<24} {:<6} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+                name, chan, statistics.mean(lat), lat[len(lat) // 2], lat[int(len(lat) * 0.9)], lat[int(len(lat) * 0.99)]))
+
+def usage(exit_code):
+    print('USAGE:')
+    print('  python3 -m util.ipcbench [PARAMS]')
+    print('')
+    print('OPTIONAL PARAMS:')
+    print('  -h, --help        show this usage synopsis')
+    print('  -n, --count=N     round trips per case (default ' + str(COUNT_DEFAULT) + ')')
+    print('')
+    sys.exit(exit_code)
+
+def make_channel(context, chan, maxsize):
+    if (chan == 'pipe'):
+        return PipeChannel(context, maxsize)
+    return context.Queue(maxsize)
+
+# returns the list of send_cmd_sync round-trip latencies (us)
+def bench(context, chan, op_obj, count):
+    q_cmd = make_channel(context, chan, Const.CMD_QUEUE_MAXSIZE)
+    q_resp = make_channel(context, chan, Const.RESP_QUEUE_MAXSIZE)
+    ep_master = MasterEndpoint(q_cmd, q_resp)
+    ep_slave = SlaveEndpoint(q_resp, q_cmd)
+    proc = context.Process(target=echo_slave, args=(ep_slave,))
+    proc.start()
+    for i in range(WARMUP):
+        ep_master.send_cmd_sync(op_obj, Const.CMD_SYNC_TIMEOUT_MS)
+    lat = []
+    for i in range(count):
+        ts = time.perf_counter()
+        resp = ep_master.send_cmd_sync(op_obj, Const.CMD_SYNC_TIMEOUT_MS)
+        lat.append((time.perf_counter() - ts) * 1000000)
+        if resp is None:
+            print('error: timeout')
+            break
+    ep_master.send_cmd_sync(ActuatorCmd(ActuatorCmd.Token.TERMINATE, ()), Const.CMD_SYNC_TIMEOUT_MS)
+    proc.join()
+    return lat
+
+# replies to each command the way the real controller would on the hot path
+def echo_slave(ep_slave):
+    ref = FrameRef(1, 42, time.monotonic())
+    while True:
+        (op_id, op_obj) = ep_slave.get_cmd(block=True)
+        if (op_obj.token == ActuatorCmd.Token.TERMINATE):
+            ep_slave.send_resp(op_id, ActuatorResp(ActuatorResp.Token.OK, ()))
+            break
+        elif isinstance(op_obj, ActuatorCmd):
+            ep_slave.send_resp(op_id, ActuatorResp(ActuatorResp.Token.OK, ()))
+        else:
+            ep_slave.send_resp(op_id, DetectionResp(DetectionResp.Token.DETECTION_RESULT, (DetectionResult(12.5, ref),)))
+
+
+if __name__ == '__main__':
+    appname = sys.argv[0]
+    main(sys.argv[1:])
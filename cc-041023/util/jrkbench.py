@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+# actuator benchmark against the simulated Jrk G2 (JrkG2Sim): JrkG2 command throughput and latency, and
+# ActuatorController target coalescing under a stream of SET_TARGET_MM commands
+#
+# everything runs in this process (the simulated device and the controller on their own threads)
+#
+# run from the repository root:  python3 -m util.jrkbench [-n COUNT] [-r RATE_HZ] [-d DURATION_S]
+
+import getopt
+import math
+import multiprocessing
+import random
+import statistics
+import sys
+import threading
+import time
+
+from crackclean.actuator_controller import ActuatorController
+from crackclean.const import Const
+from crackclean.ipc.actuator_cmd import ActuatorCmd
+from crackclean.ipc.master_endpoint import MasterEndpoint
+from crackclean.ipc.pipe_channel import PipeChannel
+from crackclean.ipc.slave_endpoint import SlaveEndpoint
+from crackclean.jrkg2 import JrkG2
+from crackclean.jrkg2_sim import JrkG2Sim
+
+
+COUNT_DEFAULT = 2000
+RATE_HZ_DEFAULT = 200
+DURATION_S_DEFAULT = 3
+NOISE_MM = 0.1
+SWEEP_PERIOD_S = 2
+
+
+def main(argv):
+    # process args
+    try:
+        (opts, args) = getopt.getopt(
+            argv,
+            "hn:r:d:",
+            [
+                "help",
+                "count=",
+                "rate=",
+                "duration=",
+            ]
+        )
+    except getopt.GetoptError:
+        usage(1)
+    arg_count = None
+    arg_rate = None
+    arg_duration = None
+    for (opt,arg) in opts:
+        if opt in ("-h", "--help"):
+            usage(0)
+        elif opt in ("-n", "--count"):
+            arg_count = arg
+        elif opt in ("-r", "--rate"):
+            arg_rate = arg
+        elif opt in ("-d", "--duration"):
+            arg_duration = arg
+        else:
+            usage(1)
+    # parse args
+    count = COUNT_DEFAULT
+    rate_hz = RATE_HZ_DEFAULT
+    duration_s = DURATION_S_DEFAULT
+    try:
+        if arg_count is not None:
+            count = int(arg_count)
+        if arg_rate is not None:
+            rate_hz = float(arg_rate)
+        if arg_duration is not None:
+            duration_s = float(arg_duration)
+    except ValueError:
+        usage(1)
+    if ((count < 1) or (rate_hz <= 0) or (duration_s <= 0)):
+        usage(1)
+    #
+    Const.JRKG2_SIMULATED = True
+    print('simulated device: time constant ' + str(Const.JRKG2_SIM_TIME_CONSTANT_MS) + ' ms, dead time ' +
+        str(Const.JRKG2_SIM_DEAD_TIME_MS) + ' ms, response latency ' + str(Const.JRKG2_SIM_RESPONSE_LATENCY_MS) +
+        ' ms, error check ' + str(Const.JRKG2_ERROR_CHECK))
+    bench_jrkg2(count)
+    print('')
+    bench_controller(rate_hz, duration_s)
+
+def usage(exit_code):
+    print('USAGE:')
+    print('  python3 -m util.jrkbench [PARAMS]')
+    print('')
+    print('OPTIONAL PARAMS:')
+    print('  -h, --help          show this usage synopsis')
+    print('  -n, --count=N       JrkG2 commands per case (default ' + str(COUNT_DEFAULT) + ')')
+    print('  -r, --rate=HZ       SET_TARGET_MM commands per second sent to the controller (default ' + str(RATE_HZ_DEFAULT) + ')')
+    print('  -d, --duration=S    controller case duration (default ' + str(DURATION_S_DEFAULT) + ')')
+    print('')
+    sys.exit(exit_code)
+
+def print_latencies(name, lat):
+    lat.sort()
+    print('{:<28} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+        name, statistics.mean(lat), lat[len(lat) // 2], lat[int(len(lat) * 0.9)], lat[int(len(lat) * 0.99)]))
+
+# JrkG2 calls straight to the device: host cost of fire-and-forget target writes (and the rate at which
+# the device takes them), and round-trip latency of reads
+def bench_jrkg2(count):
+    sim = JrkG2Sim()
+    sim.start()
+    jrkg2 = JrkG2(sim.port)
+    jrkg2.init()
+    jrkg2.get_and_clear_error_flags_halting()
+    print('{:<28} {:>9} {:>9} {:>9} {:>9}'.format('JrkG2 call', 'mean_us', 'p50_us', 'p90_us', 'p99_us'))
+    # set_target_mm
+    targets_before = sim.num_targets
+    lat = []
+    ts_start = time.perf_counter()
+    for i in range(count):
+        mm = random.uniform(0, Const.ACTUATOR_STROKE_MM)
+        ts = time.perf_counter()
+        jrkg2.set_target_mm(mm)
+        lat.append((time.perf_counter() - ts) * 1000000)
+    while ((sim.num_targets - targets_before) < count):
+        time.sleep(0.001)
+    dur_s = time.perf_counter() - ts_start
+    print_latencies('set_target_mm', lat)
+    # reads
+    for (name, call) in (('get_feedback', jrkg2.get_feedback), ('poll_health', jrkg2.poll_health)):
+        lat = []
+        for i in range(count):
+            ts = time.perf_counter()
+            call()
+            lat.append((time.perf_counter() - ts) * 1000000)
+        print_latencies(name, lat)
+    print('device accepted ' + str(count) + ' targets in ' + '{:.1f}'.format(dur_s * 1000) + ' ms (' +
+        '{:.0f}'.format(count / dur_s) + ' targets/s)')
+    jrkg2.stop_motor()
+    jrkg2.deinit()
+    sim.stop()
+
+# ActuatorController fed SET_TARGET_MM at rate_hz (a slow sweep plus noise, like MainController in AUTO
+# mode): ack latency, and how many targets reach the device after coalescing, deadband and rate limiting
+def bench_controller(rate_hz, duration_s):
+    context = multiprocessing.get_context('forkserver')
+    q_cmd = PipeChannel(context, Const.CMD_QUEUE_MAXSIZE)
+    q_resp = PipeChannel(context, Const.RESP_QUEUE_MAXSIZE)
+    ep_master = MasterEndpoint(q_cmd, q_resp)
+    controller = ActuatorController(SlaveEndpoint(q_resp, q_cmd), None)
+    controller.init()
+    thread = threading.Thread(target=controller.start, name='ActuatorController')
+    thread.start()
+    print('ActuatorController: ' + str(rate_hz) + ' SET_TARGET_MM/s for ' + str(duration_s) + ' s (deadband ' +
+        str(Const.ACTUATOR_TARGET_DEADBAND_MM) + ' mm, max ' + str(Const.ACTUATOR_MAX_UPDATE_HZ) + ' updates/s)')
+    sim = controller.jrkg2_sim
+    targets_before = sim.num_targets
+    lat = []
+    period_s = 1 / rate_hz
+    ts_start = time.monotonic()
+    ts_next = ts_start
+    while True:
+        now = time.monotonic()
+        if ((now - ts_start) >= duration_s):
+            break
+        if (now < ts_next):
+            time.sleep(ts_next - now)
+        ts_next += period_s
+        sweep = (1 - math.cos(2 * math.pi * (now - ts_start) / SWEEP_PERIOD_S)) / 2
+        mm = min(max(((sweep * Const.ACTUATOR_STROKE_MM) + random.uniform(-NOISE_MM, NOISE_MM)), 0), Const.ACTUATOR_STROKE_MM)
+        ts = time.perf_counter()
+        resp = ep_master.send_cmd_sync(ActuatorCmd(ActuatorCmd.Token.SET_TARGET_MM, (mm,)), Const.CMD_SYNC_TIMEOUT_MS)
+        lat.append((time.perf_counter() - ts) * 1000000)
+        if resp is None:
+            print('error: timeout')
+            break
+    # let the last target through, then read back where the device is
+    resp = ep_master.send_cmd_sync(ActuatorCmd(ActuatorCmd.Token.GET_TARGET_MM, ()), Const.CMD_SYNC_TIMEOUT_MS)
+    print('{:<28} {:>9} {:>9} {:>9} {:>9}'.format('', 'mean_us', 'p50_us', 'p90_us', 'p99_us'))
+    print_latencies('SET_TARGET_MM ack', lat)
+    print('controller targets: ' + str(controller.get_stats()))
+    print('device targets: ' + str(sim.num_targets - targets_before) + ', last target ' +
+        ('{:.2f}'.format(resp.params[0]) if (resp is not None) else '?') + ' mm, health ' + str(controller.jrkg2.get_health()))
+    ep_master.send_cmd_sync(ActuatorCmd(ActuatorCmd.Token.STOP_MOTOR, ()), Const.CMD_SYNC_TIMEOUT_MS)
+    ep_master.send_cmd_sync(ActuatorCmd(ActuatorCmd.Token.TERMINATE, ()), Const.CMD_SYNC_TIMEOUT_MS)
+    thread.join()
+    controller.deinit()
+
+
+if __name__ == '__main__':
+    appname = sys.argv[0]
+    main(sys.argv[1:])
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 # coding=utf-8
 
+from concurrent.futures import ProcessPoolExecutor
 import csv
 import getopt
+import multiprocessing
 import os
 import sys
 
@@ -75,11 +77,12 @@ def main(argv):
     try:
         (opts, args) = getopt.getopt(
             argv,
-            "hd:i:l:k:m:o:r:",
+            "hd:i:j:l:k:m:o:r:",
             [
                 "help",
                 "dthresh=",
                 "image=",
+                "jobs=",
                 "labelid=",
                 "mask=",
                 "model=",
@@ -91,6 +94,7 @@ def main(argv):
         usage(1)
     arg_dthresh = None
     arg_image   = None
+    arg_jobs    = None
     arg_labelid = None
     arg_mask    = None
     arg_model   = None
@@ -103,6 +107,8 @@ def main(argv):
             arg_dthresh = arg
         elif opt in ("-i", "--image"):
             arg_image = arg
+        elif opt in ("-j", "--jobs"):
+            arg_jobs = arg
         elif opt in ("-l", "--labelid"):
             arg_labelid = arg
         elif opt in ("-k", "--mask"):
@@ -134,6 +140,15 @@ def main(argv):
         usage(1)
     # parse path_img
     path_img = arg_image
+    # parse jobs
+    jobs = 1
+    if arg_jobs is not None:
+        try:
+            jobs = int(arg_jobs)
+        except ValueError:
+            usage(1)
+        if (jobs < 1):
+            usage(1)
     # parse label_id
     try:
         label_id = int(arg_labelid)
@@ -155,7 +170,7 @@ def main(argv):
             usage(1)
         value_ratios.append(r)
     # process
-    res = process(path_img, path_mask, path_model, label_id, value_ratios, detect_thresh, path_outdir)
+    res = process(path_img, path_mask, path_model, label_id, value_ratios, detect_thresh, path_outdir, jobs)
     if (res):
         print('[success]')
         sys.exit(0)
@@ -178,10 +193,11 @@ def usage(exit_code):
     print('')
     print('OPTIONAL PARAMS:')
     print('  -h, --help        show this usage synopsis')
+    print('  -j, --jobs=JOBS   number of worker processes for the filter sweeps (default 1)')
     print('')
     sys.exit(exit_code)
 
-def process(path_img, path_mask, path_model, label_id, value_ratios, detect_thresh, path_outdir):
+def process(path_img, path_mask, path_model, label_id, value_ratios, detect_thresh, path_outdir, jobs=1):
     try:
         os.mkdir(path_outdir)
     except PermissionError:
@@ -208,31 +224,60 @@ def process(path_img, path_mask, path_model, label_id, value_ratios, detect_thre
     if ((img_mask.width != IMG_DIM) or (img_mask.height != IMG_DIM)):
         print('error: invalid mask image dimensions')
         return False
-    # build crack point truth set
-    crack_pts = set()
-    for y in range(0, img_mask.height):
-        for x in range(0, img_mask.width):
-            coord = (x,y)
-            gp = img_mask.getpixel(coord)
-            if ((gp[0] == 0xFF) and (gp[1] == 0x00) and (gp[2] == 0x00)):
-                crack_pts.add(coord)
+    # build crack truth mask (True == crack pixel)
+    crack_mask = numpy.all((numpy.asarray(img_mask) == (0xFF, 0x00, 0x00)), axis=2)
+    # the worker pool comes from a forkserver (not fork), and is set up before the DetectionEngine is
+    # opened, so that workers never inherit the edgetpu device handle or runtime threads
+    executor = None
+    if (jobs > 1):
+        executor = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('forkserver'))
+    try:
+        return process_with(executor, img, img_mask, crack_mask, path_model, label_id, value_ratios, detect_thresh, path_outdir, jobs)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+def process_with(executor, img, img_mask, crack_mask, path_model, label_id, value_ratios, detect_thresh, path_outdir, jobs):
     # initialize DetectionEngine
     engine = DetectionEngine(path_model)
     # save mask image for reference purposes
     img_mask.save(os.path.join(path_outdir, 'mask.png'))
-    # process images
+    # build test images
+    img_stack = make_img_stack(img, value_ratios)
+    # detect (edgetpu, this process only)
+    boxes = []
+    for (i, vr) in enumerate(value_ratios):
+        print('detecting ' + str(vr) + '...')
+        box = detect_box(Image.fromarray(img_stack[i]).convert('RGB'), engine, label_id, detect_thresh)
+        if box is None:
+            return False
+        boxes.append(box)
+    # filter sweeps (CPU only; with jobs > 1 each ratio's adaptive grid is split by radius across worker processes)
+    adaptradii = list(range(ADAPTRADIUS_BEGIN, (ADAPTRADIUS_END + 1), ADAPTRADIUS_INC))
+    adaptthreshs = [(pct / 100) for pct in range(ADAPTTHRESH_PCT_BEGIN, (ADAPTTHRESH_PCT_END + 1), ADAPTTHRESH_PCT_INC)]
+    counts_adaptive = []
+    if executor is not None:
+        radii_chunks = [c.tolist() for c in numpy.array_split(adaptradii, min(jobs, len(adaptradii)))]
+        futures = []
+        for (i, (x0, y0, x1, y1)) in enumerate(boxes):
+            crop = img_stack[i][y0:(y1+1),x0:(x1+1)]
+            truth_mask = crack_mask[y0:(y1+1),x0:(x1+1)]
+            futures.append([
+                executor.submit(sweep_adaptive_chunk, crop, truth_mask, rc, adaptthreshs) for rc in radii_chunks
+            ])
+        # merge in (ratio, radius) order, independent of completion order
+        for fs in futures:
+            counts_adaptive.append(numpy.concatenate([f.result() for f in fs]))
+    else:
+        for (i, (x0, y0, x1, y1)) in enumerate(boxes):
+            counts_adaptive.append(sweep_adaptive_chunk(img_stack[i][y0:(y1+1),x0:(x1+1)], crack_mask[y0:(y1+1),x0:(x1+1)], adaptradii, adaptthreshs))
     map_simple = None
     map_adaptive = None
-    for vr in value_ratios:
+    for (i, vr) in enumerate(value_ratios):
         print('processing ' + str(vr) + '...')
-        # build test image
-        img_test = make_img(img, vr)
         name_test = 'img_' + '{:4.2f}'.format(vr)
         # process image
-        res = process_image(name_test, img_test, crack_pts, engine, label_id, detect_thresh, path_outdir)
-        if res is None:
-            return False
-        (ms, ma, img_s, img_a) = res
+        (ms, ma, img_s, img_a) = process_image(name_test, img_stack[i], crack_mask, boxes[i], counts_adaptive[i], path_outdir)
         img_s.save(os.path.join(path_outdir, name_test + '-simple.png'))
         img_a.save(os.path.join(path_outdir, name_test + '-adaptive.png'))
         ms_keys = set(ms.keys())
@@ -305,9 +350,9 @@ def process(path_img, path_mask, path_model, label_id, value_ratios, detect_thre
     return True
 
 # contract: width==height==IMG_DIM
-def process_image(name, img, crack_pts, engine, label_id, detect_thresh, path_outdir):
-    img_dim = img.width
-    img_rgb = img.convert('RGB')
+# returns the first crack bounding box (x0, y0, x1, y1), inclusive, or None
+def detect_box(img_rgb, engine, label_id, detect_thresh):
+    img_dim = img_rgb.width
     cands = engine.DetectWithImage(
         img_rgb,
         threshold=detect_thresh,
@@ -333,9 +378,23 @@ def process_image(name, img, crack_pts, engine, label_id, detect_thresh, path_ou
     if x0 is None:
         print('error: <1 crack detected')
         return None
-    imgarr = numpy.asarray(img)
+    return (x0, y0, x1, y1)
+
+# adaptive sweep over a subset of radii (picklable worker entry point)
+# returns an int64 (len(radii), len(threshs), 3) table of (#TP, #FP, #FN)
+def sweep_adaptive_chunk(crop, truth_mask, radii, threshs):
+    return crackthresh.sweep_adaptive(crop, crop.shape[1], crop.shape[0], radii, threshs, truth_mask)
+
+# writes the per-image CSVs from the sweep tables and renders the overlays
+# counts_a: adaptive table for the full ADAPTRADIUS x ADAPTTHRESH_PCT grid
+def process_image(name, imgarr, crack_mask, box, counts_a, path_outdir):
+    img_rgb = Image.fromarray(imgarr).convert('RGB')
+    (x0, y0, x1, y1) = box
     crop = imgarr[y0:(y1+1),x0:(x1+1)]
     imgbytes = crop.tobytes(order='C')
+    width = x1 - x0 + 1
+    height = y1 - y0 + 1
+    truth_mask = crack_mask[y0:(y1+1),x0:(x1+1)]
     map_simple = {}
     map_adaptive = {}
     img_s = img_rgb.copy()
@@ -357,23 +416,21 @@ def process_image(name, img, crack_pts, engine, label_id, detect_thresh, path_ou
             skipinitialspace=False
         )
         writer.writeheader()
-        simpthresh = SIMPTHRESH_BEGIN
-        while (simpthresh <= SIMPTHRESH_END):
-            width = x1 - x0 + 1
-            height = y1 - y0 + 1
-            (x_vals, y_vals, xy_vals) = crackthresh.filter_simple(imgbytes, width, height, x0, y0, simpthresh)
+        simpthreshs = list(range(SIMPTHRESH_BEGIN, (SIMPTHRESH_END + 1), SIMPTHRESH_INC))
+        counts = sweep_simple_hist(crop, truth_mask, simpthreshs)
+        for (i, simpthresh) in enumerate(simpthreshs):
             if (simpthresh == SIMPTHRESH_DRAW):
+                (x_vals, y_vals, xy_vals) = crackthresh.filter_simple(imgbytes, width, height, x0, y0, simpthresh)
                 draw_s.point(xy_vals, fill=COLOR_FILTERPT)
-            crack_pts_crop = crop_points(crack_pts, x0, y0, x1, y1)
-            (tp,fp,fn) = get_set_info(crack_pts_crop, x_vals, y_vals)
-            err = (len(fp) + len(fn)) / (width * height)
+            (tp, fp, fn) = [int(c) for c in counts[i]]
+            err = (fp + fn) / (width * height)
             map_simple[simpthresh] = err
             dict_row = {
                 'IMAGE'       : name,
                 'SIMP_THRESH' : str(simpthresh),
-                '#FN'         : str(len(fn)),
-                '#TP'         : str(len(tp)),
-                '#FP'         : str(len(fp)),
+                '#FN'         : str(fn),
+                '#TP'         : str(tp),
+                '#FP'         : str(fp),
                 'XC0'         : str(x0),
                 'YC0'         : str(y0),
                 'XC1'         : str(x1),
@@ -381,7 +438,6 @@ def process_image(name, img, crack_pts, engine, label_id, detect_thresh, path_ou
                 'ERR'         : str(err)
             }
             writer.writerow(dict_row)
-            simpthresh += SIMPTHRESH_INC
     # do adaptive
     fn_csv = name + '_' + 'adaptive' + '.csv'
     path_csv = os.path.join(path_outdir, fn_csv)
@@ -397,27 +453,26 @@ def process_image(name, img, crack_pts, engine, label_id, detect_thresh, path_ou
             skipinitialspace=False
         )
         writer.writeheader()
-        adaptradius = ADAPTRADIUS_BEGIN
-        while (adaptradius <= ADAPTRADIUS_END):
-            adaptthresh_pct = ADAPTTHRESH_PCT_BEGIN
-            while (adaptthresh_pct <= ADAPTTHRESH_PCT_END):
-                adaptthresh = adaptthresh_pct / 100
-                width = x1 - x0 + 1
-                height = y1 - y0 + 1
-                (x_vals, y_vals, xy_vals) = crackthresh.filter_adaptive(imgbytes, width, height, x0, y0, adaptthresh, adaptradius)
+        adaptradii = list(range(ADAPTRADIUS_BEGIN, (ADAPTRADIUS_END + 1), ADAPTRADIUS_INC))
+        adaptthresh_pcts = list(range(ADAPTTHRESH_PCT_BEGIN, (ADAPTTHRESH_PCT_END + 1), ADAPTTHRESH_PCT_INC))
+        adaptthreshs = [(pct / 100) for pct in adaptthresh_pcts]
+        counts = counts_a
+        for (i, adaptradius) in enumerate(adaptradii):
+            for (j, adaptthresh_pct) in enumerate(adaptthresh_pcts):
+                adaptthresh = adaptthreshs[j]
                 if ((adaptthresh_pct == ADAPTTHRESH_PCT_DRAW) and (adaptradius == ADAPTRADIUS_DRAW)):
+                    (x_vals, y_vals, xy_vals) = crackthresh.filter_adaptive(imgbytes, width, height, x0, y0, adaptthresh, adaptradius)
                     draw_a.point(xy_vals, fill=COLOR_FILTERPT)
-                crack_pts_crop = crop_points(crack_pts, x0, y0, x1, y1)
-                (tp,fp,fn) = get_set_info(crack_pts_crop, x_vals, y_vals)
-                err = (len(fp) + len(fn)) / (width * height)
+                (tp, fp, fn) = [int(c) for c in counts[i][j]]
+                err = (fp + fn) / (width * height)
                 map_adaptive[(adaptradius, adaptthresh)] = err
                 dict_row = {
                     'IMAGE'        : name,
                     'ADAPT_THRESH' : '{:4.2f}'.format(adaptthresh),
                     'ADAPT_RADIUS' : str(adaptradius),
-                    '#FN'          : str(len(fn)),
-                    '#TP'          : str(len(tp)),
-                    '#FP'          : str(len(fp)),
+                    '#FN'          : str(fn),
+                    '#TP'          : str(tp),
+                    '#FP'          : str(fp),
                     'XC0'          : str(x0),
                     'YC0'          : str(y0),
                     'XC1'          : str(x1),
@@ -425,43 +480,35 @@ def process_image(name, img, crack_pts, engine, label_id, detect_thresh, path_ou
                     'ERR'          : str(err)
                 }
                 writer.writerow(dict_row)
-                adaptthresh_pct += ADAPTTHRESH_PCT_INC
-            adaptradius += ADAPTRADIUS_INC
     draw_s.rectangle([x0, y0, x1+1, y1+1], outline=COLOR_BBOX)
     draw_a.rectangle([x0, y0, x1+1, y1+1], outline=COLOR_BBOX)
     return (map_simple, map_adaptive, img_s, img_a)
 
-def crop_points(pts, x0, y0, x1, y1):
-    cropped = set()
-    for p in pts:
-        (x, y) = p
-        if ((x >= x0) and (x <= x1) and (y >= y0) and (y <= y1)):
-            cropped.add(p)
-    return cropped
+# simple filter passes a pixel iff value <= thresh, so TP/FP at every threshold are cumulative
+# sums of two 256-bin histograms (crack pixels, non-crack pixels) built in one pass over the crop
+# returns an int64 (len(threshs), 3) table of (#TP, #FP, #FN), same layout as crackthresh.sweep_simple
+def sweep_simple_hist(crop, truth_mask, threshs):
+    crack = (truth_mask != 0)
+    hist_crack = numpy.bincount(crop[crack], minlength=256)
+    hist_other = numpy.bincount(crop[~crack], minlength=256)
+    cum_tp = numpy.cumsum(hist_crack, dtype=numpy.int64)
+    cum_fp = numpy.cumsum(hist_other, dtype=numpy.int64)
+    idx = numpy.asarray(threshs, dtype=numpy.intp)
+    counts = numpy.empty((len(idx), 3), dtype=numpy.int64)
+    counts[:, 0] = cum_tp[idx]
+    counts[:, 1] = cum_fp[idx]
+    counts[:, 2] = cum_tp[-1] - counts[:, 0]
+    return counts
 
-def get_set_info(crack_pts, x_vals, y_vals):
-    result_pts = set()
-    for i in range(0, len(x_vals)):
-        result_pts.add((x_vals[i], y_vals[i]))
-    tp = (crack_pts & result_pts)
-    fp = (result_pts - crack_pts)
-    fn = (crack_pts - result_pts)
-    return (tp,fp,fn)
+# 256-entry value LUT: v -> clamp(round(v * ratio))
+def make_lut(ratio):
+    return numpy.array([max(0, min(255, int(round(i * ratio)))) for i in range(0,255+1)], dtype=numpy.uint8)
 
-def make_img(img_src, ratio):
-    vmap = {}
-    for i in range(0,255+1):
-        vmap[i] = max(0, min(255, int(round(i * ratio))))
-    width = img_src.width
-    height = img_src.height
-    img_out = Image.new('L', (width, height))
-    draw = ImageDraw.Draw(img_out)
-    for y in range(0, height):
-        for x in range(0, width):
-            coord = (x,y)
-            val = img_src.getpixel(coord)
-            draw.point([coord], fill=vmap[val])
-    return img_out
+# applies every ratio's LUT to the source pixels in one gather
+# returns a uint8 (len(ratios), height, width) array
+def make_img_stack(img_src, ratios):
+    luts = numpy.stack([make_lut(r) for r in ratios])
+    return numpy.take(luts, numpy.asarray(img_src), axis=1)
 
 
 if __name__ == '__main__':